@@ -2,6 +2,7 @@
 from flask import Flask
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.cli import rows_imported
 from sqlalchemy.exc import SQLAlchemyError
 from dotenv import load_dotenv
 import time
@@ -11,6 +12,15 @@ from retrying import retry
 import pymysql.err
 import uuid
 from .urls import blueprints  # 実行時にurls.pyが同階層に必要
+from .votes import VoteAggregator
+from .dedup import create_dedup_store
+from .uploads import init_uploads
+from .evidence_store import EvidenceStore
+from .response_cache import ResponseCache
+from .live import VoteBroadcaster
+from .search import SearchService
+from .ranking import Rankings
+from .schema import ensure_schema, schema_version_table
 
 # 環境変数を読み込み
 load_dotenv()
@@ -25,19 +35,49 @@ logger = logging.getLogger(__name__)
 
 application = Flask(__name__, static_folder='static', template_folder='templates')
 
-# 環境変数のチェック
-required_env_vars = ['DB_USERNAME', 'DB_PASSWORD', 'DB_HOST', 'DB_NAME']
+# ワーカー間で共有する mmap ファイルの置き場所（/tmp のような誰でも書ける場所は使わない）
+SHARED_STATE_DIR = os.path.join(application.instance_path, 'shared')
+os.makedirs(SHARED_STATE_DIR, mode=0o700, exist_ok=True)
+os.chmod(SHARED_STATE_DIR, 0o700)
+
+# /api/bills などの固定パスのルーティング結果をキャッシュ
+application.url_map.match_cache_size = 256
+
+# 環境変数のチェック（FLASK_SQLALCHEMY_DATABASE_URI で接続先を差し替えるときは不要）
+database_uri_override = os.environ.get('FLASK_SQLALCHEMY_DATABASE_URI')
+required_env_vars = [] if database_uri_override else ['DB_USERNAME', 'DB_PASSWORD', 'DB_HOST', 'DB_NAME']
 missing_vars = [var for var in required_env_vars if not os.environ.get(var)]
 if missing_vars:
     logger.error(f"Missing environment variables: {missing_vars}")
     raise EnvironmentError(f"Missing environment variables: {missing_vars}")
 
 # データベース設定（Xserver VPSのローカルMySQL）
-application.config['SQLALCHEMY_DATABASE_URI'] = (
-    f"mysql+pymysql://{os.environ['DB_USERNAME']}:{os.environ['DB_PASSWORD']}"
-    f"@{os.environ['DB_HOST']}:3306/{os.environ['DB_NAME']}"
-)
-application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+if not database_uri_override:
+    application.config['SQLALCHEMY_DATABASE_URI'] = (
+        f"mysql+pymysql://{os.environ['DB_USERNAME']}:{os.environ['DB_PASSWORD']}"
+        f"@{os.environ['DB_HOST']}:3306/{os.environ['DB_NAME']}"
+    )
+# レスポンスキャッシュの無効化に models_committed シグナルを使う
+application.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = True
+# .cache() / execute(..., cache=True) で使うクエリ結果キャッシュ。
+# 全ワーカーで共有し、コミットされたテーブルのタグで無効化する
+# 結果は pickle で保存するので、ファイルは自分だけが書ける instance/shared に置く
+application.config['SQLALCHEMY_QUERY_CACHE_BACKEND'] = 'mmap'
+application.config['SQLALCHEMY_QUERY_CACHE_MMAP_PATH'] = os.path.join(SHARED_STATE_DIR, 'query-cache.bin')
+application.config['SQLALCHEMY_QUERY_CACHE_MAX_ENTRIES'] = 512
+application.config['SQLALCHEMY_QUERY_CACHE_TTL'] = 300
+# 本番でも常時オンにするクエリ統計（正規化した SQL ごとの回数・合計・p50/p99）。
+# 各ワーカーが定期的にディレクトリへ書き出し、`flask db queries` でまとめて見る
+application.config['SQLALCHEMY_RECORD_QUERIES'] = 'aggregate'
+application.config['SQLALCHEMY_RECORD_QUERIES_DIR'] = '/tmp/deathbill-queries'
+# N+1 クエリの検出（ステージングで N_PLUS_ONE=log または raise）。
+# 同じリレーションの遅延ロードが1リクエストで閾値を超えたら報告する。負荷下でも
+# 付けっぱなしにできるよう、数えるのは一部のリクエストだけ
+application.config['SQLALCHEMY_N_PLUS_ONE'] = os.environ.get('N_PLUS_ONE') or False
+application.config['SQLALCHEMY_N_PLUS_ONE_THRESHOLD'] = 10
+application.config['SQLALCHEMY_N_PLUS_ONE_SAMPLE'] = 0.1
+# fork 後の各ワーカーで最初のリクエスト前に開いておく接続数
+application.config['SQLALCHEMY_POOL_WARM'] = 2
 application.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
     'pool_size': 5,
     'max_overflow': 10,
@@ -47,9 +87,64 @@ application.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
     'connect_args': {'connect_timeout': 10}
 }
 
+# 読み取り専用レプリカ（DB_REPLICA_HOSTS=host1,host2）。設定すると一覧などの
+# SELECT はレプリカに振り分け、書き込みと同じリクエスト内の読み直しはプライマリ。
+# 遅延が SQLALCHEMY_REPLICA_MAX_LAG 秒を超えたレプリカは使わない
+replica_hosts = [h.strip() for h in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if h.strip()]
+if replica_hosts:
+    application.config['SQLALCHEMY_BINDS'] = {
+        f'replica{i}': {
+            'url': (
+                f"mysql+pymysql://{os.environ['DB_USERNAME']}:{os.environ['DB_PASSWORD']}"
+                f"@{host}:3306/{os.environ['DB_NAME']}"
+            ),
+            'replica_of': None,
+            **application.config['SQLALCHEMY_ENGINE_OPTIONS'],
+        }
+        for i, host in enumerate(replica_hosts, 1)
+    }
+    application.config['SQLALCHEMY_REPLICA_MAX_LAG'] = 2.0
+    # レプリカから読んだ結果を新しい世代のキャッシュとして保存しないよう、
+    # 世代が変わってからこの秒数はキャッシュを確定させない
+    application.config['RESPONSE_CACHE_SETTLE'] = 2.0
+
+# 未反映の票を追記ログに残し、落ちたワーカーの分を生きているワーカーが適用する
+application.config['VOTE_JOURNAL_DIR'] = os.path.join(SHARED_STATE_DIR, 'votes')
+
+# 一覧レスポンスのキャッシュの世代番号（全ワーカーで共有）
+application.config['RESPONSE_CACHE_MMAP_PATH'] = os.path.join(SHARED_STATE_DIR, 'generations.bin')
+
+# 検索インデックスに他のワーカーで更新・削除された行を伝える変更ログ
+application.config['SEARCH_CHANGES_MMAP_PATH'] = os.path.join(SHARED_STATE_DIR, 'search-changes.bin')
+
+# 投票・いいねの重複チェックは全ワーカーで共有する（memory だとワーカーごとに別々になる）
+application.config['DEDUP_BACKEND'] = 'mmap'
+application.config['DEDUP_MMAP_PATH'] = os.path.join(SHARED_STATE_DIR, 'dedup.bin')
+# 探索範囲が埋まったキーは DB に登録する（古いエントリを追い出すと二重投票になる）
+application.config['DEDUP_MMAP_OVERFLOW'] = 'sql'
+
+# FLASK_ で始まる環境変数で設定を上書きする（値は JSON として読む）。
+# ベンチマークやローカル確認で SQLite に向けるときなどに使う
+#   FLASK_SQLALCHEMY_DATABASE_URI=sqlite:////tmp/deathbill.db FLASK_SQLALCHEMY_ENGINE_OPTIONS='{}'
+application.config.from_prefixed_env()
+
 # CORS設定（開発用にワイルドカード、本番ではドメインに制限）
 CORS(application, resources={r"/api/*": {"origins": "*"}})
 
+# 本番のリクエストを一部だけ JSONL に記録し、bench.py でリプレイできるようにする。
+# CAPTURE_DIR を設定したときだけ有効。X-User-Token はハッシュに置き換えて残すので、
+# 同じユーザーの重複投票判定はリプレイでも再現される
+capture_dir = os.environ.get('CAPTURE_DIR')
+if capture_dir:
+    from werkzeug.middleware.capture import CaptureMiddleware
+    application.wsgi_app = CaptureMiddleware(
+        application.wsgi_app,
+        capture_dir,
+        sample_rate=float(os.environ.get('CAPTURE_SAMPLE_RATE', '0.01')),
+        headers=('Accept', 'Accept-Encoding', 'Content-Type', 'User-Agent', 'X-User-Token'),
+        redact_headers=('X-User-Token',),
+    )
+
 db = SQLAlchemy(application)
 
 # アップロードフォルダ設定
@@ -58,6 +153,10 @@ application.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif'}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 
+# アップロードは公開されない一時フォルダに受信し、UPLOAD_FOLDERへ rename で確定する。サイズ・拡張子は受信中に検査する
+application.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE + 1024 * 1024  # 本文などの他フィールド分
+init_uploads(application, MAX_FILE_SIZE, ALLOWED_EXTENSIONS)
+
 # データベースモデル
 class Bill(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -77,6 +176,7 @@ class Comment(db.Model):
     good_count = db.Column(db.Integer, default=0)
     replies = db.relationship('Reply', backref='comment', lazy=True)
     file_id = db.Column(db.Integer, db.ForeignKey('evidence.id'), nullable=True)
+    file = db.relationship('Evidence', foreign_keys=[file_id], lazy=True)
 
 class Reply(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -100,6 +200,7 @@ class Tweet(db.Model):
     good_count = db.Column(db.Integer, default=0)
     file_id = db.Column(db.Integer, db.ForeignKey('evidence.id'), nullable=True)
     comments = db.relationship('TweetComment', backref='tweet', lazy=True)
+    file = db.relationship('Evidence', foreign_keys=[file_id], lazy=True)
 
 class TweetComment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -107,20 +208,71 @@ class TweetComment(db.Model):
     content = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.Integer, nullable=False)
 
+# 投票は行ロックを避けるためプロセス内で集約してまとめてUPDATEする
+votes = VoteAggregator(application, db, Bill)
+
+# 投票・いいね・リツイート済みの記録（全ワーカーで共有、TTLで自動削除）
+dedup = create_dedup_store(application, db)
+
+# 一覧レスポンスのキャッシュ（コミットされたテーブルの世代で無効化）
+response_cache = ResponseCache(application)
+
+# 集約した票がDBに反映されたら法案一覧のキャッシュを無効化する
+@votes.on_flush
+def _invalidate_bills(bill_ids):
+    response_cache.bump(Bill.__table__.name)
+    # 集計スレッドの UPDATE はセッションを通らないので手動で無効化する
+    with application.app_context():
+        db.query_cache.invalidate(Bill.__table__.name)
+
+# 投票数のライブ配信（ワーカーごとに1本のポーラーが全クライアントに配る）
+live = VoteBroadcaster(application, db, Bill, response_cache.generations)
+
+# 検索用の転置インデックス（各ワーカーの最初の検索で構築し、コミットごとに差分を反映）
+search = SearchService(application, db, {
+    'bill': (Bill, ('title', 'description')),
+    'tweet': (Tweet, ('content',)),
+}, response_cache.generations)
+
+# 人気順ランキング（上位K件だけをメモリで差分更新）
+rankings = Rankings(application, db, Tweet, Bill)
+
+# 証拠ファイルは内容のハッシュで1つだけ保存し、参照数で管理する
+evidence_store = EvidenceStore(db, UPLOAD_FOLDER, f"/{UPLOAD_FOLDER}")
+# Evidence を消したら参照を外す（最後の参照ならファイルも消える）
+evidence_store.release_on_delete(Evidence)
+
 # ファイル拡張子チェック
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-# データベース初期化
-@retry(
-    stop_max_attempt_number=5,
-    wait_fixed=10000,
+# スキーマのフィンガープリントを保存するテーブル
+schema_version = schema_version_table(db)
+
+# DBに接続できるまで指数バックオフ（0.5秒から最大10秒、ジッター付き）で再試行
+db_retry = retry(
+    stop_max_attempt_number=6,
+    wait_exponential_multiplier=500,
+    wait_exponential_max=10000,
+    wait_jitter_max=1000,
     retry_on_exception=lambda e: isinstance(e, (SQLAlchemyError, pymysql.err.OperationalError))
 )
-def initialize_database():
+
+# 起動時のスキーマ確認（フィンガープリントが一致すれば1クエリで終わる）
+@db_retry
+def prepare_database():
+    try:
+        ensure_schema(db, schema_version)
+    except (SQLAlchemyError, pymysql.err.OperationalError) as e:
+        logger.error(f"Database preparation failed: {str(e)}")
+        raise
+
+# 初期データの投入（起動時ではなく `flask --app application seed` で1回だけ実行する）
+@db_retry
+def seed_database():
     try:
-        logger.info("Initializing database...")
-        db.create_all()
+        logger.info("Seeding database...")
+        ensure_schema(db, schema_version)
         with db.session.no_autoflush:
             if not Bill.query.first():
                 bills = [
@@ -150,16 +302,32 @@ def initialize_database():
                 logger.info("Inserted initial tweets and comments")
 
             db.session.commit()
-        logger.info("Database initialized successfully")
+        # bulk_save_objects は models_committed を飛ばさないので、キャッシュと
+        # 検索インデックスが新しい行に気づくよう世代を上げておく
+        response_cache.bump(Bill.__table__.name, Tweet.__table__.name, TweetComment.__table__.name)
+        logger.info("Database seeded successfully")
     except (SQLAlchemyError, pymysql.err.OperationalError) as e:
-        logger.error(f"Database initialization failed: {str(e)}")
+        logger.error(f"Database seeding failed: {str(e)}")
         db.session.rollback()
         raise
 
-# 初回起動時に初期化
+@application.cli.command('seed')
+def seed_command():
+    """初期データを投入する。"""
+    seed_database()
+
+# flask db import もセッションを通らない（クエリキャッシュは flask_sqlalchemy 側で無効化される）。
+# レスポンスキャッシュと検索インデックスが取り込んだ行に気づくよう世代を上げる
+@rows_imported.connect_via(application)
+def on_rows_imported(sender, table, rows):
+    response_cache.bump(table.name)
+
+# 起動時にスキーマを確認
 with application.app_context():
     try:
-        initialize_database()
+        started = time.perf_counter()
+        prepare_database()
+        logger.info(f"Startup database work finished in {(time.perf_counter() - started) * 1000:.1f} ms")
     except Exception as e:
         logger.exception(f"Initialization error: {str(e)}")
         raise
@@ -169,14 +337,369 @@ def get_user_token():
     from flask import request
     return request.headers.get('X-User-Token', str(uuid.uuid4()))
 
-user_voted_bills = {}
-user_liked_comments = {}
-user_liked_tweets = {}
-user_retweeted_tweets = {}
+# 重複チェックの種類（dedup.add の kind）
+DEDUP_BILL_VOTE = 'bill_vote'
+DEDUP_TWEET_GOOD = 'tweet_good'
+DEDUP_TWEET_RETWEET = 'tweet_retweet'
+
+# 投票（DBへの反映はVoteAggregatorがまとめて行う）
+@application.route('/api/bills/<int:bill_id>/vote', methods=['POST'])
+def vote_bill(bill_id):
+    from flask import request, jsonify
+    data = request.get_json(silent=True) or {}
+    vote_type = data.get('type')
+    if vote_type not in ('support', 'against'):
+        return jsonify({"error": "Invalid vote type"}), 400
+
+    bill = db.session.get(Bill, bill_id)
+    if bill is None:
+        return jsonify({"error": "Bill not found"}), 404
+
+    token = get_user_token()
+    if not dedup.add(token, DEDUP_BILL_VOTE, bill_id):
+        return jsonify({"error": "Already voted"}), 409
+
+    votes.record(bill_id, vote_type)
+    # 一覧は未反映の票も含めて返すので、このワーカーの分はここで無効化する
+    response_cache.bump(Bill.__table__.name)
+    data = serialize_bill(bill)
+    rankings.bill_voted(bill_id, data['support'], data['against'])
+    return jsonify(data)
+
+# --- 読み取り用クエリとシリアライズ ---------------------------------------
+# 関連はどれも lazy=True なので、そのまま辿るとコメント数に比例してクエリが
+# 増える。一覧・詳細は selectin で関連をまとめて読み、件数によらず固定回数の
+# クエリで済ませる（法案詳細は bill / evidence / comments / replies / file の5回）。
+
+def bill_detail_query(bill_id):
+    from sqlalchemy.orm import selectinload
+    return (
+        db.select(Bill)
+        .where(Bill.id == bill_id)
+        .options(
+            selectinload(Bill.evidence),
+            selectinload(Bill.comments).options(
+                selectinload(Comment.replies),
+                selectinload(Comment.file),
+            ),
+        )
+    )
+
+def bill_list_query():
+    return db.select(Bill).order_by(Bill.timestamp.desc(), Bill.id.desc())
+
+def tweet_list_query():
+    from sqlalchemy.orm import selectinload
+    return (
+        db.select(Tweet)
+        .options(selectinload(Tweet.comments), selectinload(Tweet.file))
+        .order_by(Tweet.timestamp.desc(), Tweet.id.desc())
+    )
+
+# DBは秒で持っているが、フロントは Date.now() と比べるのでミリ秒で返す
+def serialize_file(evidence):
+    if evidence is None:
+        return None
+    return {"name": evidence.name, "type": evidence.type, "url": evidence.file_url}
+
+def serialize_comment(comment):
+    return {
+        "id": comment.id,
+        "content": comment.content,
+        "file": serialize_file(comment.file),
+        "replies": [
+            {"id": reply.id, "content": reply.content, "timestamp": reply.timestamp * 1000}
+            for reply in sorted(comment.replies, key=lambda r: r.id)
+        ],
+        "goodCount": comment.good_count or 0,
+        "timestamp": comment.timestamp * 1000,
+    }
+
+def serialize_bill(bill):
+    pending = votes.pending(bill.id)
+    return {
+        "id": bill.id,
+        "title": bill.title,
+        "support": (bill.support or 0) + pending['support'],
+        "against": (bill.against or 0) + pending['against'],
+        "description": bill.description,
+        "timestamp": bill.timestamp * 1000,
+    }
+
+def serialize_bill_detail(bill):
+    data = serialize_bill(bill)
+    data["evidence"] = [serialize_file(e) for e in sorted(bill.evidence, key=lambda e: e.id)]
+    data["comments"] = [serialize_comment(c) for c in sorted(bill.comments, key=lambda c: c.id)]
+    return data
+
+def serialize_tweet(tweet):
+    return {
+        "id": tweet.id,
+        "username": tweet.username,
+        "content": tweet.content,
+        "file": serialize_file(tweet.file),
+        "comments": [
+            {"id": c.id, "content": c.content, "timestamp": c.timestamp * 1000}
+            for c in sorted(tweet.comments, key=lambda c: c.id)
+        ],
+        "goodCount": tweet.good_count or 0,
+        "retweetCount": tweet.retweet_count or 0,
+        "timestamp": tweet.timestamp * 1000,
+    }
+
+# ランキング順の一覧はキャッシュしない。ランキングはワーカーごとのメモリにあり、
+# 他のワーカーの票や時間の経過（hot の減衰）ではテーブルの世代が変わらないので
+# キャッシュすると古い順位を返し続ける。ランキングから読むので作り直しも安い
+def _ranking_sort(name):
+    from flask import request
+    return request.args.get('sort') == name
+
+# 法案一覧
+@application.route('/api/bills', methods=['GET'])
+@response_cache.cached('bill', unless=lambda: _ranking_sort('contested'))
+def list_bills():
+    from flask import request, jsonify
+    # ?sort=contested は賛否が拮抗している順（ランキングから読む）
+    if request.args.get('sort') == 'contested':
+        ids = rankings.top_contested_bills(request.args.get('limit', 20, type=int))
+        bills = {b.id: b for b in db.session.execute(db.select(Bill).where(Bill.id.in_(ids))).scalars()}
+        return jsonify([serialize_bill(bills[i]) for i in ids if i in bills])
+
+    bills = db.session.execute(bill_list_query()).scalars()
+    return jsonify([serialize_bill(bill) for bill in bills])
+
+# 法案詳細（証拠・コメント・返信込み）
+@application.route('/api/bills/<int:bill_id>', methods=['GET'])
+def get_bill(bill_id):
+    from flask import jsonify
+    # 証拠・コメント・返信込みの5クエリをまとめてキャッシュ（いずれかの更新で無効化）
+    bill = db.session.execute(bill_detail_query(bill_id), cache=True).scalar_one_or_none()
+    if bill is None:
+        return jsonify({"error": "Bill not found"}), 404
+    return jsonify(serialize_bill_detail(bill))
+
+# 投票数のライブ配信（SSE）
+@application.route('/api/bills/stream', methods=['GET'])
+def stream_bills():
+    from flask import Response, jsonify, stream_with_context
+    subscriber = live.subscribe()
+    if subscriber is None:
+        # このワーカーの同時ストリーム数が上限。EventSource は retry に従って再接続する
+        response = jsonify({"error": "Too many live streams"})
+        response.status_code = 503
+        response.headers['Retry-After'] = '10'
+        return response
+    response = Response(
+        stream_with_context(live.events(subscriber)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+    # 本文を読み始める前に切断されても枠を返す（unsubscribe は何度呼んでもよい）
+    response.call_on_close(lambda: live.unsubscribe(subscriber))
+    return response
+
+# 検索（?q=&type=bills|tweets&page=&per_page=）
+@application.route('/api/search', methods=['GET'])
+def search_content():
+    from flask import request, jsonify
+    query = request.args.get('q', '').strip()
+    kinds = {'bills': {'bill'}, 'tweets': {'tweet'}}.get(request.args.get('type'))
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+
+    hits = search.search(query, kinds)
+    hits_page = hits[(page - 1) * per_page:page * per_page]
+
+    # ヒットした分だけ主キーで読む
+    bill_ids = [key[1] for key, _ in hits_page if key[0] == 'bill']
+    tweet_ids = [key[1] for key, _ in hits_page if key[0] == 'tweet']
+    bills = {}
+    tweets = {}
+    if bill_ids:
+        bills = {b.id: b for b in db.session.execute(db.select(Bill).where(Bill.id.in_(bill_ids))).scalars()}
+    if tweet_ids:
+        stmt = tweet_list_query().where(Tweet.id.in_(tweet_ids))
+        tweets = {t.id: t for t in db.session.execute(stmt).scalars()}
+
+    return jsonify({
+        "query": query,
+        "total": len(hits),
+        "page": page,
+        "perPage": per_page,
+        "bills": [serialize_bill(bills[i]) for i in bill_ids if i in bills],
+        "tweets": [serialize_tweet(tweets[i]) for i in tweet_ids if i in tweets],
+    })
+
+# ツイートのタイムライン順（カーソルページングのキーにも使う）
+TWEET_KEYSET = (Tweet.timestamp.desc(), Tweet.id.desc())
+
+# ツイート一覧（コメント込み）
+# OFFSETは深いページほど遅くなるので ?cursor= のキーセットページングにする。
+# 次ページのカーソルは X-Next-Cursor ヘッダーで返す。
+@application.route('/api/tweets', methods=['GET'])
+@response_cache.cached('tweet', 'tweet_comment', 'evidence', unless=lambda: _ranking_sort('hot'))
+def list_tweets():
+    from flask import request, jsonify
+    # ?sort=hot は人気順（ランキングから読むので全件の並べ替えは不要）
+    if request.args.get('sort') == 'hot':
+        ids = rankings.top_tweets(request.args.get('limit', 20, type=int))
+        stmt = tweet_list_query().where(Tweet.id.in_(ids))
+        tweets = {t.id: t for t in db.session.execute(stmt).scalars()}
+        return jsonify([serialize_tweet(tweets[i]) for i in ids if i in tweets])
+
+    page = db.paginate(tweet_list_query(), keyset=TWEET_KEYSET, count=False, max_per_page=100)
+    response = jsonify([serialize_tweet(tweet) for tweet in page])
+    if page.next_cursor:
+        response.headers['X-Next-Cursor'] = page.next_cursor
+    return response
+
+# ツイート投稿（multipart: content, file）
+@application.route('/api/tweets', methods=['POST'])
+def add_tweet():
+    from flask import request, jsonify
+    content = request.form.get('content', '').strip()
+    file = request.files.get('file')
+    if not content and (file is None or not file.filename):
+        return jsonify({"error": "Content or file is required"}), 400
+
+    try:
+        evidence = save_upload(file)
+        db.session.flush()
+        tweet = Tweet(
+            username="👤",
+            content=content,
+            timestamp=int(time.time()),
+            retweet_count=0,
+            good_count=0,
+            file_id=evidence.id if evidence else None,
+        )
+        db.session.add(tweet)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        logger.error(f"Failed to add tweet: {str(e)}")
+        db.session.rollback()
+        return jsonify({"error": "Database error"}), 500
+
+    rankings.tweet_posted(tweet.id, tweet.timestamp)
+    return jsonify(serialize_tweet(tweet)), 201
+
+# いいね・リツイート（カウンタは行を読まずに UPDATE で加算する）
+def _increment_tweet(tweet_id, column, dedup_kind):
+    from flask import jsonify
+    if db.session.get(Tweet, tweet_id) is None:
+        return None, (jsonify({"error": "Tweet not found"}), 404)
+
+    if not dedup.add(get_user_token(), dedup_kind, tweet_id):
+        return None, (jsonify({"error": "Already done"}), 409)
+
+    try:
+        db.session.execute(
+            db.update(Tweet)
+            .where(Tweet.id == tweet_id)
+            .values({column: column + 1})
+        )
+        db.session.commit()
+    except SQLAlchemyError as e:
+        logger.error(f"Failed to update tweet: {str(e)}")
+        db.session.rollback()
+        return None, (jsonify({"error": "Database error"}), 500)
+
+    # セッションを通らない UPDATE なのでキャッシュは明示的に無効化する
+    response_cache.bump(Tweet.__table__.name)
+    return db.session.get(Tweet, tweet_id), None
+
+@application.route('/api/tweets/<int:tweet_id>/good', methods=['POST'])
+def good_tweet(tweet_id):
+    from flask import jsonify
+    tweet, error = _increment_tweet(tweet_id, Tweet.good_count, DEDUP_TWEET_GOOD)
+    if error is not None:
+        return error
+    rankings.tweet_good(tweet_id)
+    return jsonify({"id": tweet.id, "goodCount": tweet.good_count})
+
+@application.route('/api/tweets/<int:tweet_id>/retweet', methods=['POST'])
+def retweet_tweet(tweet_id):
+    from flask import jsonify
+    tweet, error = _increment_tweet(tweet_id, Tweet.retweet_count, DEDUP_TWEET_RETWEET)
+    if error is not None:
+        return error
+    rankings.tweet_retweeted(tweet_id)
+    return jsonify({"id": tweet.id, "retweetCount": tweet.retweet_count})
+
+# アップロードファイルを確定してEvidenceを作る（ファイルなしならNone）
+def save_upload(file, bill_id=None):
+    from werkzeug.utils import secure_filename
+    if file is None or not file.filename:
+        return None
+
+    name = secure_filename(file.filename)
+    evidence = Evidence(
+        bill_id=bill_id,
+        name=name,
+        type=file.mimetype,
+        file_url=evidence_store.store(file.stream, name),
+    )
+    db.session.add(evidence)
+    return evidence
+
+# コメント投稿（multipart: content, file）
+@application.route('/api/bills/<int:bill_id>/comments', methods=['POST'])
+def add_comment(bill_id):
+    from flask import request, jsonify
+    if db.session.get(Bill, bill_id, execution_options={'cache': True}) is None:
+        return jsonify({"error": "Bill not found"}), 404
+
+    content = request.form.get('content', '').strip()
+    file = request.files.get('file')
+    if not content and (file is None or not file.filename):
+        return jsonify({"error": "Content or file is required"}), 400
+
+    try:
+        evidence = save_upload(file, bill_id)
+        db.session.flush()
+        comment = Comment(
+            bill_id=bill_id,
+            content=content,
+            timestamp=int(time.time()),
+            good_count=0,
+            file_id=evidence.id if evidence else None,
+        )
+        db.session.add(comment)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        logger.error(f"Failed to add comment: {str(e)}")
+        db.session.rollback()
+        return jsonify({"error": "Database error"}), 500
+
+    return jsonify(serialize_comment(comment)), 201
 
 # Blueprintを登録
 for blueprint, prefix in blueprints:
     application.register_blueprint(blueprint, url_prefix=prefix)
 
+# --- pre-fork 準備 -------------------------------------------------------
+# uwsgi はマスターでアプリを読み込んでから fork する（lazy-apps = false）。
+# テンプレートとルーティング表をここでコンパイルしておけば全ワーカーで
+# copy-on-write で共有され、ワーカーごとに作り直さずに済む。
+def preload_for_fork():
+    application.url_map.update()
+    for name in application.jinja_env.list_templates():
+        application.jinja_env.get_template(name)
+    # 起動処理で開いたDB接続をワーカーに引き継がないよう閉じておく
+    db.before_fork()
+
+preload_for_fork()
+
+# fork 後に各ワーカーで接続プールを作り直し、最初のリクエスト前に温めておく
+try:
+    from uwsgidecorators import postfork
+except ImportError:
+    postfork = None
+
+if postfork is not None:
+    @postfork
+    def _after_fork():
+        db.after_fork(application)
+
 if __name__ == '__main__':
     application.run(debug=False, host='0.0.0.0', port=8000)
@@ -0,0 +1,293 @@
+# リクエストのリプレイによるベンチマーク
+#
+# 記録した JSONL のリクエストを application の WSGI オブジェクトにプロセス内で
+# 直接流し、エンドポイントごとのスループット・レイテンシ（p50/p95/p99）・
+# 1リクエストあたりのクエリ数を出す。MySQL もネットワークも不要で、
+# DB は SQLite に差し替える。
+#
+#   python -m DEATHBILL.bench traffic.jsonl --threads 4 --processes 2 --requests 20000 --seed
+#
+# 1行1リクエストの形式（capture ミドルウェアが書き出すものと同じ）:
+#   {"method": "GET", "path": "/api/bills", "query": "sort=contested",
+#    "headers": {"X-User-Token": "..."}, "body": "...", "body_encoding": "base64"}
+# method 以外は省略できる。body_encoding が base64 なら body をデコードして送る。
+# status / duration_ms / time など他のキーは無視する。body_truncated のものは飛ばす。
+# SSE など終わらないレスポンスを返すエンドポイント（STREAMING_ENDPOINTS）も飛ばし、
+# 件数だけ報告する。
+import argparse
+import base64
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 本文が終わらないので1リクエストの時間を計れない
+STREAMING_ENDPOINTS = {'stream_bills'}
+
+
+def load_records(path):
+    records = []
+    skipped = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            # 本文が大きすぎて記録されなかったリクエストは同じ形で再現できない
+            if record.get('body_truncated'):
+                skipped += 1
+                continue
+            body = record.get('body')
+            if body is not None and record.get('body_encoding') == 'base64':
+                body = base64.b64decode(body)
+            elif isinstance(body, str):
+                body = body.encode('utf-8')
+            records.append((
+                record.get('method', 'GET').upper(),
+                record['path'],
+                record.get('query', ''),
+                record.get('headers') or {},
+                body,
+            ))
+    if skipped:
+        logger.warning('Skipped %d requests whose body was not captured', skipped)
+    return records
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class Replayer:
+    """1プロセス分。スレッドごとに werkzeug の test.Client を持って記録を順に流す。"""
+
+    def __init__(self, application, db, records):
+        self.application = application
+        self.db = db
+        endpoints = [self._endpoint(method, path) for method, path, *_ in records]
+        self.skipped_streams = sum(1 for endpoint in endpoints if endpoint in STREAMING_ENDPOINTS)
+        self.records = [r for r, e in zip(records, endpoints) if e not in STREAMING_ENDPOINTS]
+        self.endpoints = [e for e in endpoints if e not in STREAMING_ENDPOINTS]
+        if self.skipped_streams:
+            logger.warning('Skipped %d requests to streaming endpoints', self.skipped_streams)
+        # records・endpoints・requests は同じ添字で引くので、必ず絞り込んだ後の records から作る
+        self.requests = [self._prepare(*record) for record in self.records]
+        self._local = threading.local()
+
+        # このスレッドのリクエスト中に実行された SQL だけを数える
+        # （集計スレッドなどのバックグラウンドの SQL は数えない）
+        import sqlalchemy as sa
+        with application.app_context():
+            for engine in db.engines.values():
+                sa.event.listen(engine, 'before_cursor_execute', self._count_query)
+
+    def _count_query(self, *args):
+        self._local.queries = getattr(self._local, 'queries', 0) + 1
+
+    def _prepare(self, method, path, query, headers, body):
+        # environ はここで1回だけ組み立て、リクエストごとにはコピーするだけにする。
+        # 計測したいのはアプリで、EnvironBuilder ではない
+        from werkzeug.test import PreparedRequest
+        return PreparedRequest(path, method=method, query_string=query, headers=headers, data=body)
+
+    def _endpoint(self, method, path):
+        from werkzeug.exceptions import HTTPException
+        adapter = self.application.url_map.bind('localhost')
+        try:
+            endpoint, _ = adapter.match(path, method)
+        except HTTPException as e:
+            return f'<{e.code}>'
+        return endpoint
+
+    def run_thread(self, start, count, step, warmup, results):
+        from werkzeug.test import Client
+        client = Client(self.application)
+        n = len(self.records)
+
+        for i in range(-warmup, count):
+            index = (start + max(i, 0) * step) % n
+            prepared = self.requests[index]
+            self._local.queries = 0
+
+            started = time.perf_counter()
+            response = client.open(prepared)
+            if response.mimetype == 'text/event-stream':
+                # STREAMING_ENDPOINTS に無いストリームでも読み切ろうとして止まらないようにする
+                logger.warning('Not reading streaming response from %s', self.endpoints[index])
+            else:
+                response.get_data()
+            response.close()
+            elapsed = time.perf_counter() - started
+
+            if i >= 0:
+                results.append((self.endpoints[index], elapsed, self._local.queries, response.status_code, started))
+
+    def run(self, offset, threads, count, step, warmup):
+        results = []
+        per_thread = [count // threads + (1 if t < count % threads else 0) for t in range(threads)]
+        workers = [
+            threading.Thread(
+                target=self.run_thread,
+                args=(offset + t * step, per_thread[t], step * threads, warmup, results),
+            )
+            for t in range(threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return results
+
+
+def _run_process(replayer, offset, threads, count, step, warmup, queue):
+    # fork 後は各ワーカーと同じく接続プールを作り直す
+    replayer.db.after_fork(replayer.application)
+    queue.put(replayer.run(offset, threads, count, step, warmup))
+
+
+def summarize(results):
+    # ウォームアップを除いた、最初の計測開始から最後の完了までを経過時間とする
+    wall = max(started + elapsed for _, elapsed, _, _, started in results) - min(started for *_, started in results)
+    by_endpoint = {}
+    for endpoint, elapsed, queries, status, _ in results:
+        by_endpoint.setdefault(endpoint, []).append((elapsed, queries, status))
+
+    rows = []
+    for endpoint, items in sorted(by_endpoint.items(), key=lambda item: -len(item[1])):
+        latencies = sorted(elapsed for elapsed, _, _ in items)
+        rows.append({
+            'endpoint': endpoint,
+            'requests': len(items),
+            'rps': len(items) / wall if wall else 0.0,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'queries': sum(queries for _, queries, _ in items) / len(items),
+            'errors': sum(1 for _, _, status in items if status >= 500),
+        })
+
+    latencies = sorted(elapsed for _, elapsed, *_ in results)
+    total = {
+        'endpoint': 'TOTAL',
+        'requests': len(results),
+        'rps': len(results) / wall if wall else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'queries': sum(queries for _, _, queries, *_ in results) / len(results),
+        'errors': sum(1 for _, _, _, status, _ in results if status >= 500),
+    }
+    return rows + [total], wall
+
+
+def print_report(rows, out=sys.stdout):
+    header = f"{'endpoint':<28} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'5xx':>5}"
+    print(header, file=out)
+    print('-' * len(header), file=out)
+    for row in rows:
+        print(
+            f"{row['endpoint'][:28]:<28} {row['requests']:>9} {row['rps']:>9.1f}"
+            f" {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f}"
+            f" {row['queries']:>8.2f} {row['errors']:>5}",
+            file=out,
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='記録したリクエストを application にリプレイする')
+    parser.add_argument('records', help='リクエストの JSONL ファイル')
+    parser.add_argument('--requests', type=int, default=10000, help='全体のリクエスト数')
+    parser.add_argument('--threads', type=int, default=2, help='プロセスあたりのスレッド数')
+    parser.add_argument('--processes', type=int, default=1, help='プロセス数（fork）')
+    parser.add_argument('--warmup', type=int, default=50, help='スレッドごとの計測しない先行リクエスト数')
+    parser.add_argument('--db', default=None, help='SQLAlchemy の URI（省略時は一時ディレクトリの SQLite）')
+    parser.add_argument('--seed', action='store_true', help='初期データを投入してから始める')
+    parser.add_argument('--json', dest='json_path', help='結果を JSON でも書き出す')
+    args = parser.parse_args(argv)
+    if args.requests < 1:
+        parser.error('--requests must be at least 1')
+
+    logging.basicConfig(level=logging.WARNING)
+    workdir = tempfile.mkdtemp(prefix='deathbill-bench-')
+
+    # application を読み込む前に設定を差し替える（本番の共有ファイルとも分ける）
+    overrides = {
+        'SQLALCHEMY_DATABASE_URI': args.db or f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'SQLALCHEMY_ENGINE_OPTIONS': '{}',
+        'SQLALCHEMY_POOL_WARM': '0',
+        'SQLALCHEMY_RECORD_QUERIES_DIR': 'null',
+        'SQLALCHEMY_QUERY_CACHE_MMAP_PATH': os.path.join(workdir, 'query-cache.bin'),
+        'RESPONSE_CACHE_MMAP_PATH': os.path.join(workdir, 'generations.bin'),
+        'DEDUP_MMAP_PATH': os.path.join(workdir, 'dedup.bin'),
+        'SEARCH_CHANGES_MMAP_PATH': os.path.join(workdir, 'search-changes.bin'),
+        'VOTE_JOURNAL_DIR': os.path.join(workdir, 'votes'),
+    }
+    for key, value in overrides.items():
+        os.environ.setdefault(f'FLASK_{key}', value)
+
+    from .application import application, db, seed_database
+
+    if args.seed:
+        with application.app_context():
+            seed_database()
+
+    records = load_records(args.records)
+    if not records:
+        parser.error('no requests in ' + args.records)
+
+    replayer = Replayer(application, db, records)
+    if not replayer.records:
+        parser.error('only streaming requests in ' + args.records)
+    processes = max(args.processes, 1)
+    threads = max(args.threads, 1)
+    per_process = [args.requests // processes + (1 if p < args.requests % processes else 0) for p in range(processes)]
+
+    if processes == 1:
+        results = replayer.run(0, threads, per_process[0], 1, args.warmup)
+    else:
+        db.before_fork()
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        children = [
+            context.Process(
+                target=_run_process,
+                args=(replayer, p, threads, per_process[p], processes, args.warmup, queue),
+            )
+            for p in range(processes)
+        ]
+        for child in children:
+            child.start()
+        results = []
+        for _ in children:
+            results.extend(queue.get())
+        for child in children:
+            child.join()
+
+    rows, wall = summarize(results)
+    print_report(rows)
+    print(f"\n{len(results)} requests in {wall:.2f}s with {processes} process(es) x {threads} thread(s)")
+    if replayer.skipped_streams:
+        print(f"{replayer.skipped_streams} requests to streaming endpoints ({', '.join(sorted(STREAMING_ENDPOINTS))}) were not replayed")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({
+                'processes': processes,
+                'threads': threads,
+                'wall_seconds': wall,
+                'skipped_streams': replayer.skipped_streams,
+                'endpoints': rows,
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# Headers のマイクロベンチマーク
+#
+# ヘッダー数の多いレスポンス（CORS・キャッシュ系ヘッダーが並ぶもの）を想定し、
+# werkzeug.datastructures.Headers の get / set / contains / remove を
+# ヘッダー数ごとに計る。キーの索引が効いていれば、1操作あたりの時間は
+# ヘッダー数が増えてもほぼ一定になる。
+#
+#   python -m DEATHBILL.bench_headers --widths 10 50 200 1000
+import argparse
+import json
+import timeit
+
+from werkzeug.datastructures import Headers
+
+
+def make_headers(width):
+    # 同じキーの複数値（Set-Cookie など）も混ぜる
+    items = [(f'X-Custom-Header-{i}', f'value-{i}') for i in range(width)]
+    items += [('Set-Cookie', f'c{i}=1') for i in range(max(1, width // 10))]
+    return items
+
+
+def bench_width(width, number):
+    items = make_headers(width)
+    keys = [key for key, _ in items[:width]]
+    # 大文字小文字を変えて引き、索引が小文字化したキーで引けているかも見る
+    lookup = [key.lower() if i % 2 else key.upper() for i, key in enumerate(keys)]
+    missing = [f'X-Missing-{i}' for i in range(width)]
+    headers = Headers(items)
+
+    def get():
+        for key in lookup:
+            headers.get(key)
+
+    def contains():
+        for key in lookup:
+            key in headers
+        for key in missing:
+            key in headers
+
+    def set_():
+        for key in lookup:
+            headers.set(key, 'updated')
+
+    def remove():
+        # 削除のたびに元に戻すので、計るのは remove + add の組
+        for key in keys:
+            headers.remove(key)
+            headers.add(key, 'restored')
+
+    results = {}
+    for name, func, ops in (
+        ('get', get, len(lookup)),
+        ('contains', contains, len(lookup) + len(missing)),
+        ('set', set_, len(lookup)),
+        ('remove+add', remove, len(keys)),
+    ):
+        seconds = min(timeit.repeat(func, number=number, repeat=5))
+        results[name] = seconds / (number * ops) * 1e9
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Headers の操作ごとの時間を計る')
+    parser.add_argument('--widths', type=int, nargs='+', default=[10, 50, 200, 1000], help='ヘッダー数')
+    parser.add_argument('--number', type=int, default=20, help='1回の計測で繰り返す回数')
+    parser.add_argument('--json', dest='json_path', help='結果を JSON でも書き出す')
+    args = parser.parse_args(argv)
+
+    rows = {}
+    print(f"{'headers':>8} {'get ns':>10} {'contains ns':>12} {'set ns':>10} {'remove+add ns':>14}")
+    for width in args.widths:
+        result = rows[width] = bench_width(width, args.number)
+        print(
+            f"{width:>8} {result['get']:>10.0f} {result['contains']:>12.0f}"
+            f" {result['set']:>10.0f} {result['remove+add']:>14.0f}"
+        )
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+# multipart パーサーのスループットベンチマーク
+#
+# アップロード（ファイル1つ + テキスト項目）の multipart 本文を一時ファイルに作り、
+# werkzeug.formparser.MultiPartParser の通常のデコーダーと zero_copy=True の
+# デコーダーで読んで MB/s とピーク RSS（ru_maxrss）を出す。
+# ru_maxrss はプロセスの最大値なので、パーサーごとに別プロセスで計る。
+#
+#   python -m DEATHBILL.bench_multipart --size 64 --repeat 5
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BOUNDARY = b'----DeathbillBenchBoundary7MA4YWxkTrZu0gW'
+PARSERS = ('default', 'zero_copy')
+
+
+def write_body(path, size):
+    # ランダムなバイト列の中に境界の一部に似た並びを混ぜ、境界探索にも仕事をさせる
+    chunk = os.urandom(1024 * 1024 - 64) + b'\r\n--' + BOUNDARY[:20] + b'\r\n' + os.urandom(64 - 26 - 20)
+    with open(path, 'wb') as f:
+        f.write(b'--' + BOUNDARY + b'\r\n')
+        f.write(b'Content-Disposition: form-data; name="content"\r\n\r\n')
+        f.write('証拠の説明'.encode('utf-8') * 100)
+        f.write(b'\r\n--' + BOUNDARY + b'\r\n')
+        f.write(b'Content-Disposition: form-data; name="file"; filename="evidence.bin"\r\n')
+        f.write(b'Content-Type: application/octet-stream\r\n\r\n')
+        written = 0
+        while written < size:
+            part = chunk[:size - written]
+            f.write(part)
+            written += len(part)
+        f.write(b'\r\n--' + BOUNDARY + b'--\r\n')
+    return os.path.getsize(path)
+
+
+class DiscardSink:
+    # 保存先の速さを計らないよう、書き込まれたバイト数だけ数えて捨てる
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        return len(data)
+
+    def seek(self, *args):
+        return 0
+
+    def read(self, *args):
+        return b''
+
+    def close(self):
+        pass
+
+
+def run_child(parser_name, path, buffer_size, repeat):
+    from werkzeug.formparser import MultiPartParser
+
+    sinks = []
+
+    def stream_factory(**kwargs):
+        sink = DiscardSink()
+        sinks.append(sink)
+        return sink
+
+    parser = MultiPartParser(
+        stream_factory=stream_factory,
+        buffer_size=buffer_size,
+        zero_copy=parser_name == 'zero_copy',
+    )
+    length = os.path.getsize(path)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = []
+
+    for _ in range(repeat):
+        with open(path, 'rb', buffering=0) as f:
+            started = time.perf_counter()
+            fields, files = parser.parse(f, BOUNDARY, length)
+            timings.append(time.perf_counter() - started)
+        # 読み違いがないか、ファイル部分のバイト数で確認する
+        assert sinks[-1].size == length - _overhead(path), (sinks[-1].size, length)
+        assert fields['content'].startswith('証拠の説明')
+
+    # ru_maxrss は import 時の山に隠れやすいので、計測外の1回で Python の確保量のピークも見る
+    tracemalloc.start()
+    with open(path, 'rb', buffering=0) as f:
+        parser.parse(f, BOUNDARY, length)
+    peak_alloc = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'parser': parser_name,
+        'bytes': length,
+        'best_mb_s': length / min(timings) / 1e6,
+        'mean_mb_s': length / (sum(timings) / len(timings)) / 1e6,
+        'ru_maxrss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'ru_maxrss_before_kib': rss_before,
+        'peak_alloc_kib': peak_alloc // 1024,
+    }
+
+
+def _overhead(path):
+    # 本文からファイル部分のデータ以外（ヘッダー・テキスト項目・境界）を引いた長さ
+    with open(path, 'rb') as f:
+        head = f.read(64 * 1024)
+    start = head.index(b'application/octet-stream\r\n\r\n') + len(b'application/octet-stream\r\n\r\n')
+    return start + len(b'\r\n--' + BOUNDARY + b'--\r\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='multipart パーサーの MB/s とピーク RSS を計る')
+    parser.add_argument('--size', type=int, default=64, help='アップロードするファイルの大きさ（MiB）')
+    parser.add_argument('--buffer-size', type=int, default=64 * 1024, help='1回に読むバイト数')
+    parser.add_argument('--repeat', type=int, default=5, help='パーサーごとの繰り返し回数')
+    parser.add_argument('--parsers', nargs='+', choices=PARSERS, default=list(PARSERS))
+    parser.add_argument('--json', dest='json_path', help='結果を JSON でも書き出す')
+    parser.add_argument('--child', choices=PARSERS, help=argparse.SUPPRESS)
+    parser.add_argument('--body', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.body, args.buffer_size, args.repeat)))
+        return
+
+    workdir = tempfile.mkdtemp(prefix='deathbill-multipart-')
+    body = os.path.join(workdir, 'body.bin')
+    try:
+        write_body(body, args.size * 1024 * 1024)
+        rows = []
+        for name in args.parsers:
+            out = subprocess.run(
+                [
+                    sys.executable, '-m', __spec__.name if __spec__ else 'bench_multipart',
+                    '--child', name, '--body', body,
+                    '--buffer-size', str(args.buffer_size), '--repeat', str(args.repeat),
+                ],
+                check=True, capture_output=True, text=True,
+            )
+            rows.append(json.loads(out.stdout))
+    finally:
+        if os.path.exists(body):
+            os.unlink(body)
+        os.rmdir(workdir)
+
+    print(f"{'parser':<10} {'best MB/s':>10} {'mean MB/s':>10} {'maxrss KiB':>11} {'+ parsing':>10} {'peak alloc KiB':>15}")
+    for row in rows:
+        print(
+            f"{row['parser']:<10} {row['best_mb_s']:>10.1f} {row['mean_mb_s']:>10.1f}"
+            f" {row['ru_maxrss_kib']:>11} {row['ru_maxrss_kib'] - row['ru_maxrss_before_kib']:>10}"
+            f" {row['peak_alloc_kib']:>15}"
+        )
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
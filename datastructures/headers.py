@@ -41,6 +41,10 @@ class Headers:
 
     :param defaults: The list of default values for the :class:`Headers`.
 
+    Lookups by key use an index from the lowercased key to the
+    positions of its items, so getting, checking, and setting a header
+    does not scan the whole list.
+
     .. versionchanged:: 3.1
         Implement ``|`` and ``|=`` operators.
 
@@ -68,10 +72,30 @@ class Headers:
         ) = None,
     ) -> None:
         self._list: list[tuple[str, str]] = []
+        self._index_cache: dict[str, list[int]] | None = {}
 
         if defaults is not None:
             self.extend(defaults)
 
+    @property
+    def _index(self) -> dict[str, list[int]]:
+        """Map each lowercased key to the positions of its items. Rebuilt
+        on first use after items were removed or replaced by position, so
+        a run of removals only pays for it once.
+        """
+        index = self._index_cache
+
+        if index is None:
+            index = self._index_cache = {}
+
+            for idx, (k, _) in enumerate(self._list):
+                index.setdefault(k.lower(), []).append(idx)
+
+        return index
+
+    def _reindex(self) -> None:
+        self._index_cache = None
+
     @t.overload
     def __getitem__(self, key: str) -> str: ...
     @t.overload
@@ -88,11 +112,15 @@ class Headers:
         return self.__class__(self._list[key])
 
     def _get_key(self, key: str) -> str:
-        ikey = key.lower()
+        index = self._index_cache
+
+        if index is None:
+            index = self._index
 
-        for k, v in self._list:
-            if k.lower() == ikey:
-                return v
+        positions = index.get(key.lower())
+
+        if positions:
+            return self._list[positions[0]][1]
 
         raise BadRequestKeyError(key)
 
@@ -184,21 +212,20 @@ class Headers:
         .. versionchanged:: 0.9
             The ``as_bytes`` parameter was added.
         """
-        ikey = key.lower()
+        positions = self._index.get(key.lower(), ())
 
         if type is not None:
             result = []
 
-            for k, v in self:
-                if k.lower() == ikey:
-                    try:
-                        result.append(type(v))
-                    except ValueError:
-                        continue
+            for idx in positions:
+                try:
+                    result.append(type(self._list[idx][1]))
+                except ValueError:
+                    continue
 
             return result
 
-        return [v for k, v in self if k.lower() == ikey]
+        return [self._list[idx][1] for idx in positions]
 
     def get_all(self, name: str) -> list[str]:
         """Return a list of all the values for the named field.
@@ -260,16 +287,20 @@ class Headers:
             return
 
         del self._list[key]
+        self._reindex()
 
     def _del_key(self, key: str) -> None:
         key = key.lower()
-        new = []
+        index = self._index_cache
 
-        for k, v in self._list:
-            if k.lower() != key:
-                new.append((k, v))
+        if index is not None and key not in index:
+            return
+
+        new = [item for item in self._list if item[0].lower() != key]
 
-        self._list[:] = new
+        if len(new) != len(self._list):
+            self._list[:] = new
+            self._reindex()
 
     def remove(self, key: str) -> None:
         """Remove a key.
@@ -302,10 +333,12 @@ class Headers:
         :return: an item.
         """
         if key is None:
-            return self._list.pop()
+            return self.popitem()
 
         if isinstance(key, int):
-            return self._list.pop(key)
+            rv = self._list.pop(key)
+            self._reindex()
+            return rv
 
         try:
             rv = self._get_key(key)
@@ -320,10 +353,30 @@ class Headers:
 
     def popitem(self) -> tuple[str, str]:
         """Removes a key or index and returns a (key, value) item."""
-        return self._list.pop()
+        rv = self._list.pop()
+        index = self._index_cache
+
+        if index is not None:
+            ikey = rv[0].lower()
+            positions = index[ikey]
+            positions.pop()
+
+            if not positions:
+                del index[ikey]
+
+        return rv
 
     def __contains__(self, key: str) -> bool:
         """Check if a key is present."""
+        if type(self)._get_key is Headers._get_key:
+            # Avoid raising and catching a KeyError for a missing key.
+            index = self._index_cache
+
+            if index is None:
+                index = self._index
+
+            return isinstance(key, str) and key.lower() in index
+
         try:
             self._get_key(key)
         except KeyError:
@@ -358,6 +411,10 @@ class Headers:
             value = _options_header_vkw(value, kwargs)
 
         value_str = _str_header_value(value)
+
+        if self._index_cache is not None:
+            self._index_cache.setdefault(key.lower(), []).append(len(self._list))
+
         self._list.append((key, value_str))
 
     def add_header(self, key: str, value: t.Any, /, **kwargs: t.Any) -> None:
@@ -371,6 +428,7 @@ class Headers:
     def clear(self) -> None:
         """Clears all headers."""
         self._list.clear()
+        self._index_cache = {}
 
     def set(self, key: str, value: t.Any, /, **kwargs: t.Any) -> None:
         """Remove all header tuples for `key` and add a new one.  The newly
@@ -391,26 +449,25 @@ class Headers:
             value = _options_header_vkw(value, kwargs)
 
         value_str = _str_header_value(value)
-
-        if not self._list:
-            self._list.append((key, value_str))
-            return
-
-        iter_list = iter(self._list)
         ikey = key.lower()
+        positions = self._index.get(ikey)
 
-        for idx, (old_key, _) in enumerate(iter_list):
-            if old_key.lower() == ikey:
-                # replace first occurrence
-                self._list[idx] = (key, value_str)
-                break
-        else:
+        if not positions:
             # no existing occurrences
+            self._index[ikey] = [len(self._list)]
             self._list.append((key, value_str))
             return
 
-        # remove remaining occurrences
-        self._list[idx + 1 :] = [t for t in iter_list if t[0].lower() != ikey]
+        # replace first occurrence
+        idx = positions[0]
+        self._list[idx] = (key, value_str)
+
+        if len(positions) > 1:
+            # remove remaining occurrences
+            self._list[idx + 1 :] = [
+                t for t in self._list[idx + 1 :] if t[0].lower() != ikey
+            ]
+            self._reindex()
 
     def setlist(self, key: str, values: cabc.Iterable[t.Any]) -> None:
         """Remove any existing values for a header and add new ones.
@@ -483,8 +540,10 @@ class Headers:
             self.set(key, value)
         elif isinstance(key, int):
             self._list[key] = value[0], _str_header_value(value[1])  # type: ignore[index]
+            self._reindex()
         else:
             self._list[key] = [(k, _str_header_value(v)) for k, v in value]  # type: ignore[misc]
+            self._reindex()
 
     def update(
         self,
@@ -638,6 +697,26 @@ class EnvironHeaders(ImmutableHeadersMixin, Headers):  # type: ignore[misc]
 
         return self.environ[f"HTTP_{key}"]  # type: ignore[no-any-return]
 
+    def getlist(  # type: ignore[override]
+        self, key: str, type: cabc.Callable[[str], T] | None = None
+    ) -> list[str] | list[T]:
+        # The values live in the environ, not in the indexed list.
+        ikey = key.lower()
+
+        if type is not None:
+            result = []
+
+            for k, v in self:
+                if k.lower() == ikey:
+                    try:
+                        result.append(type(v))
+                    except ValueError:
+                        continue
+
+            return result
+
+        return [v for k, v in self if k.lower() == ikey]
+
     def __len__(self) -> int:
         return sum(1 for _ in self)
 
@@ -0,0 +1,323 @@
+# 「このユーザーはもう投票した／いいねした」の重複チェック用ストア
+#
+# 以前はモジュール変数の dict で持っていたが、uwsgi の各ワーカーが別々に
+# コピーを持つうえに際限なく増える。ここではバックエンドを差し替え可能にし、
+# どれも TTL で古いエントリを捨てるので使用メモリは一定に保たれる。
+#
+#   memory : プロセス内 dict（開発・テスト用）
+#   mmap   : 共有メモリ上の固定サイズのハッシュテーブル（全ワーカーで共有）
+#   sql    : DB のテーブル（複数ホストで共有）
+import abc
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+import sqlalchemy as sa
+from sqlalchemy.exc import IntegrityError
+
+from .response_cache import open_private
+
+logger = logging.getLogger(__name__)
+
+
+def _entry_key(token, kind, obj_id):
+    return f"{kind}:{obj_id}:{token}"
+
+
+class DedupStore(abc.ABC):
+    def __init__(self, ttl):
+        self.ttl = ttl
+
+    # 未登録なら登録して True、登録済みなら False
+    @abc.abstractmethod
+    def add(self, token, kind, obj_id):
+        pass
+
+    @abc.abstractmethod
+    def contains(self, token, kind, obj_id):
+        pass
+
+
+class MemoryDedupStore(DedupStore):
+    def __init__(self, ttl, max_entries=100000):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def add(self, token, kind, obj_id):
+        key = _entry_key(token, kind, obj_id)
+        now = time.time()
+
+        with self._lock:
+            expires = self._entries.get(key)
+            if expires is not None and expires > now:
+                return False
+
+            # dict は挿入順なので先頭から古いものを捨てる
+            self._entries.pop(key, None)
+            while len(self._entries) >= self.max_entries:
+                del self._entries[next(iter(self._entries))]
+
+            self._entries[key] = now + self.ttl
+            return True
+
+    def contains(self, token, kind, obj_id):
+        expires = self._entries.get(_entry_key(token, kind, obj_id))
+        return expires is not None and expires > time.time()
+
+
+class MmapDedupStore(DedupStore):
+    """全ワーカーで共有する固定サイズのハッシュテーブル。
+
+    キーのハッシュから max_probe スロットを線形探索する。探索範囲がすべて有効な
+    エントリで埋まっているときは古いエントリを追い出さない（追い出すと同じ人が
+    もう一度投票できてしまう）。overflow のストアがあればそちらに登録し、なければ
+    登録済みとして扱って拒否する。どちらの場合も overflows を数える。
+
+    overflow に登録したキーは、同じ探索範囲にあとで空きができても mmap 側では
+    見つからない。探索の開始位置ごとのバケットに overflow へ書いたエントリの
+    最も遅い有効期限を残し、期限内のバケットでは overflow も確かめる。
+
+    ファイル名にスロット数を付ける（{path}.{slots}）。スロット数を変えたデプロイでも
+    動いているワーカーがマップ中のファイルを縮めず、新しいファイルを使う。
+    ファイルはモード 0600 で作り、他のユーザーのもの・シンボリックリンクは使わない。
+    """
+
+    # 1スロット = 8バイトのキーハッシュ + 4バイトの有効期限（UNIX秒）
+    _slot = struct.Struct('<QI')
+    # ヘッダー = overflow した回数
+    _header = struct.Struct('<Q')
+    # overflow バケット = そのバケットで overflow したエントリの最も遅い有効期限
+    _bucket = struct.Struct('<I')
+    max_probe = 32
+    slots_per_bucket = 64
+
+    def __init__(self, ttl, path, slots=1 << 20, overflow=None):
+        super().__init__(ttl)
+        self.slots = slots
+        self.path = f"{path}.{slots}"
+        self.overflow = overflow
+        self.buckets = max(1, slots // self.slots_per_bucket)
+        self._slots_offset = self._header.size
+        self._buckets_offset = self._slots_offset + slots * self._slot.size
+        self._size = self._buckets_offset + self.buckets * self._bucket.size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._map = None
+
+        fd = open_private(self.path, create=True)
+        try:
+            # 新しいファイルを空から1回だけ広げる。広げる前にマップするプロセスはない
+            # （どのプロセスもロックを取ってから大きさを確かめる）
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                current = os.fstat(fd).st_size
+                if current == 0:
+                    os.ftruncate(fd, self._size)
+                elif current != self._size:
+                    raise RuntimeError(f"{self.path} is {current} bytes, expected {self._size}")
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def _open(self):
+        # flock は open したファイル記述ごとなので fork 後は開き直す
+        pid = os.getpid()
+        if self._pid != pid:
+            self._fd = open_private(self.path)
+            self._map = mmap.mmap(self._fd, self._size)
+            self._pid = pid
+        return self._fd, self._map
+
+    @property
+    def overflows(self):
+        """探索範囲が埋まっていて mmap に入らなかった回数（全ワーカーの合計）。"""
+        _, buf = self._open()
+        return self._header.unpack_from(buf, 0)[0]
+
+    def _hash(self, token, kind, obj_id):
+        digest = hashlib.blake2b(
+            _entry_key(token, kind, obj_id).encode('utf-8'), digest_size=8
+        ).digest()
+        # 0 は空きスロットを表すので使わない
+        return int.from_bytes(digest, 'little') or 1
+
+    def _bucket_offset(self, key):
+        bucket = (key % self.slots) // self.slots_per_bucket % self.buckets
+        return self._buckets_offset + bucket * self._bucket.size
+
+    def _probe(self, buf, key, now):
+        """(登録済みか, 空きスロットの位置) を返す。空きがなければ位置は None。"""
+        slot = self._slot
+        start = key % self.slots
+        free = None
+
+        for i in range(self.max_probe):
+            offset = self._slots_offset + ((start + i) % self.slots) * slot.size
+            stored, expires = slot.unpack_from(buf, offset)
+
+            if stored == key and expires > now:
+                return True, None
+            if stored == 0 or expires <= now:
+                if free is None:
+                    free = offset
+                if stored == 0:
+                    break
+
+        return False, free
+
+    def _overflowed(self, buf, key, now):
+        return self._bucket.unpack_from(buf, self._bucket_offset(key))[0] > now
+
+    def add(self, token, kind, obj_id):
+        key = self._hash(token, kind, obj_id)
+        now = int(time.time())
+
+        with self._lock:
+            fd, buf = self._open()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                found, free = self._probe(buf, key, now)
+                if found:
+                    return False
+
+                # overflow を確かめる・書く間もロックを持つ。離すとほかのワーカーが
+                # 空いたスロットに同じキーを登録できてしまう。overflow を使うのは
+                # 探索範囲が埋まったバケットだけなので、普段は DB に触れない
+                if self.overflow is not None and self._overflowed(buf, key, now):
+                    if self.overflow.contains(token, kind, obj_id):
+                        return False
+
+                if free is not None:
+                    self._slot.pack_into(buf, free, key, now + self.ttl)
+                    return True
+
+                count, = self._header.unpack_from(buf, 0)
+                self._header.pack_into(buf, 0, count + 1)
+                logger.warning("dedup table is full around slot %d", key % self.slots)
+
+                if self.overflow is None:
+                    # 追い出すと二重投票になるので、登録済みとして断る
+                    return False
+
+                added = self.overflow.add(token, kind, obj_id)
+                bucket = self._bucket_offset(key)
+                expires, = self._bucket.unpack_from(buf, bucket)
+                self._bucket.pack_into(buf, bucket, max(expires, now + self.ttl))
+                return added
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def contains(self, token, kind, obj_id):
+        key = self._hash(token, kind, obj_id)
+        now = int(time.time())
+
+        with self._lock:
+            fd, buf = self._open()
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            try:
+                found, _ = self._probe(buf, key, now)
+                overflowed = self.overflow is not None and self._overflowed(buf, key, now)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+        if found:
+            return True
+        return overflowed and self.overflow.contains(token, kind, obj_id)
+
+
+class SqlDedupStore(DedupStore):
+    # 期限切れ行の掃除は add のたびではなく数百回に1回
+    purge_every = 500
+
+    def __init__(self, ttl, db):
+        super().__init__(ttl)
+        self.db = db
+        self.table = db.Table(
+            'dedup_entry',
+            sa.Column('key', sa.String(255), primary_key=True),
+            sa.Column('expires_at', sa.Integer, nullable=False, index=True),
+        )
+        self._adds = 0
+        self._lock = threading.Lock()
+
+    def add(self, token, kind, obj_id):
+        table = self.table
+        key = _entry_key(token, kind, obj_id)
+        now = int(time.time())
+        expires = now + self.ttl
+
+        with self._lock:
+            self._adds += 1
+            purge = self._adds % self.purge_every == 0
+        if purge:
+            self.purge(now)
+
+        try:
+            with self.db.engine.begin() as conn:
+                conn.execute(sa.insert(table).values(key=key, expires_at=expires))
+            return True
+        except IntegrityError:
+            pass
+
+        # 期限切れの行だけを上書きする（1文なので競合しても1人しか勝たない）
+        with self.db.engine.begin() as conn:
+            result = conn.execute(
+                sa.update(table)
+                .where(table.c.key == key, table.c.expires_at <= now)
+                .values(expires_at=expires)
+            )
+        return result.rowcount == 1
+
+    def contains(self, token, kind, obj_id):
+        table = self.table
+        with self.db.engine.connect() as conn:
+            expires = conn.execute(
+                sa.select(table.c.expires_at).where(
+                    table.c.key == _entry_key(token, kind, obj_id)
+                )
+            ).scalar()
+        return expires is not None and expires > time.time()
+
+    def purge(self, now=None):
+        if now is None:
+            now = int(time.time())
+        with self.db.engine.begin() as conn:
+            conn.execute(sa.delete(self.table).where(self.table.c.expires_at <= now))
+
+
+def create_dedup_store(app, db):
+    app.config.setdefault('DEDUP_BACKEND', 'memory')
+    app.config.setdefault('DEDUP_TTL', 30 * 24 * 3600)
+    app.config.setdefault('DEDUP_MMAP_PATH', os.path.join(app.instance_path, 'dedup.bin'))
+    app.config.setdefault('DEDUP_MMAP_SLOTS', 1 << 20)
+    # mmap の探索範囲が埋まったときの登録先（'sql' か None。None なら断る）
+    app.config.setdefault('DEDUP_MMAP_OVERFLOW', None)
+
+    backend = app.config['DEDUP_BACKEND']
+    ttl = app.config['DEDUP_TTL']
+
+    if backend == 'memory':
+        return MemoryDedupStore(ttl)
+    if backend == 'mmap':
+        overflow = app.config['DEDUP_MMAP_OVERFLOW']
+        if overflow not in (None, 'sql'):
+            raise ValueError(f"Unknown DEDUP_MMAP_OVERFLOW: {overflow!r}")
+        return MmapDedupStore(
+            ttl,
+            app.config['DEDUP_MMAP_PATH'],
+            app.config['DEDUP_MMAP_SLOTS'],
+            overflow=SqlDedupStore(ttl, db) if overflow == 'sql' else None,
+        )
+    if backend == 'sql':
+        return SqlDedupStore(ttl, db)
+
+    raise ValueError(f"Unknown DEDUP_BACKEND: {backend!r}")
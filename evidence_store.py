@@ -0,0 +1,160 @@
+# 証拠ファイルの内容アドレス保存（重複排除）
+#
+# 同じスクリーンショットが多くの法案・ツイートに貼られるので、アップロード
+# ごとに別ファイルを作ると同じ中身がディスクに何個も並ぶ。ここでは受信中に
+# 計算した SHA-256 をファイル名にして1つだけ保存し、evidence_blob テーブルで
+# 参照数を数える。
+#
+# ファイルがあるかどうかは evidence_blob の行で決める（ディスクは見ない）。
+# 先に行を UPDATE して行ロックを取り、行があれば一時ファイルを捨てて既存の
+# file_url を使う（拡張子が違っても同じ行・同じファイル）。行がなければ INSERT
+# してからファイルを確定する。最後の参照を外す release() も同じ行をロックして
+# 消すので、「行はあるのにファイルがない」状態は他のセッションからは見えない。
+import logging
+import os
+import uuid
+
+import sqlalchemy as sa
+import sqlalchemy.orm
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+# コミット後に消すファイル（release で退避したもの）
+_UNLINK_KEY = 'evidence_store_unlink'
+# ロールバックされたら消すファイル（store で新しく確定したもの）
+_CREATED_KEY = 'evidence_store_created'
+
+
+class EvidenceStore:
+    def __init__(self, db, folder, url_prefix):
+        self.db = db
+        self.folder = folder
+        self.url_prefix = url_prefix.rstrip('/')
+        self.table = db.Table(
+            'evidence_blob',
+            sa.Column('hash', sa.String(64), primary_key=True),
+            sa.Column('file_url', sa.String(200), nullable=False),
+            sa.Column('size', sa.Integer, nullable=False),
+            sa.Column('refcount', sa.Integer, nullable=False, default=1),
+        )
+
+    # UploadPart を保存して file_url を返す（参照数は現在のセッションで +1）
+    def store(self, part, filename):
+        digest = part.hexdigest()
+        session = self.db.session
+
+        file_url = self._acquire(session, digest)
+        if file_url is not None:
+            part.close()
+            return file_url
+
+        ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        name = f"{digest}.{ext}" if ext else digest
+        file_url = f"{self.url_prefix}/{name}"
+        try:
+            # 同時に同じ内容が初めて届いた場合は INSERT が1つだけ成功する
+            with session.begin_nested():
+                session.execute(
+                    sa.insert(self.table).values(
+                        hash=digest, file_url=file_url, size=part.size, refcount=1
+                    )
+                )
+        except IntegrityError:
+            part.close()
+            file_url = self._acquire(session, digest)
+            if file_url is None:
+                raise
+            return file_url
+
+        session.info.setdefault(_CREATED_KEY, []).append(part.commit(name))
+        return file_url
+
+    # 参照を1つ外し、誰も使わなくなったらファイルごと消す
+    def release(self, file_url, session=None):
+        table = self.table
+        if session is None:
+            session = self.db.session
+        row = session.execute(
+            sa.select(table.c.hash, table.c.refcount)
+            .where(table.c.file_url == file_url)
+            .with_for_update()
+        ).first()
+        if row is None:
+            return
+
+        if row.refcount > 1:
+            session.execute(
+                sa.update(table)
+                .where(table.c.hash == row.hash)
+                .values(refcount=table.c.refcount - 1)
+            )
+            return
+
+        session.execute(sa.delete(table).where(table.c.hash == row.hash))
+        # 行ロックを持っている間に退避しておく。コミット後に同じ内容が新しく
+        # 保存されても、消すのは退避した方なので新しいファイルは消えない
+        path = os.path.join(self.folder, file_url.rsplit('/', 1)[1])
+        trash = os.path.join(self.folder, f".released-{uuid.uuid4().hex}")
+        try:
+            os.replace(path, trash)
+        except FileNotFoundError:
+            return
+        session.info.setdefault(_UNLINK_KEY, []).append((path, trash))
+
+    def release_on_delete(self, model):
+        """model（file_url を持つ）の行が ORM で削除されたら release する。"""
+
+        def before_flush(session, flush_context, instances):
+            for obj in list(session.deleted):
+                if isinstance(obj, model) and obj.file_url:
+                    self.release(obj.file_url, session)
+
+        sa.event.listen(self.db.session, 'before_flush', before_flush)
+
+    # 行があれば参照数を +1 して file_url を返す（UPDATE でロックを取る）
+    def _acquire(self, session, digest):
+        table = self.table
+        increment = (
+            sa.update(table)
+            .where(table.c.hash == digest)
+            .values(refcount=table.c.refcount + 1)
+        )
+        if session.execute(increment).rowcount == 0:
+            return None
+
+        return session.execute(
+            sa.select(table.c.file_url).where(table.c.hash == digest)
+        ).scalar_one()
+
+
+@sa.event.listens_for(sa.orm.Session, 'after_commit')
+def _unlink_released(session):
+    session.info.pop(_CREATED_KEY, None)
+    for _, trash in session.info.pop(_UNLINK_KEY, ()):
+        _remove(trash)
+
+
+@sa.event.listens_for(sa.orm.Session, 'after_rollback')
+def _keep_released(session):
+    # SAVEPOINT のロールバック（store の INSERT 競合など）でも呼ばれるが、外側の
+    # トランザクションはまだ続いているので何もしない
+    if session.in_nested_transaction():
+        return
+    # 行の削除が取り消されたのでファイルを戻し、取り消された INSERT のファイルは消す
+    for path, trash in session.info.pop(_UNLINK_KEY, ()):
+        try:
+            os.replace(trash, path)
+        except OSError:
+            logger.exception("Failed to restore evidence blob %s", path)
+    for path in session.info.pop(_CREATED_KEY, ()):
+        _remove(path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        logger.exception("Failed to remove evidence blob %s", path)
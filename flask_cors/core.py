@@ -1,7 +1,9 @@
 import logging
 import re
+from collections import OrderedDict
 from collections.abc import Iterable
 from datetime import timedelta
+from threading import Lock
 
 from flask import current_app, request
 from werkzeug.datastructures import Headers, MultiDict
@@ -43,9 +45,18 @@ CONFIG_OPTIONS = [
 # to a view.
 FLASK_CORS_EVALUATED = "_FLASK_CORS_EVALUATED"
 
+# Maximum number of computed header sets kept per resource, keyed by the
+# request headers they depend on.
+HEADER_CACHE_SIZE = 256
+
 # Strange, but this gets the type of a compiled regex, which is otherwise not
 # exposed in a public API.
 RegexObject = type(re.compile(""))
+
+# Numbered backreferences (\1) in a resource regex would point at the wrong
+# group once the resources are wrapped into one combined alternation.
+_BACKREF_RE = re.compile(r"\\[1-9]")
+
 DEFAULT_OPTIONS = dict(
     origins="*",
     methods=ALL_METHODS,
@@ -111,7 +122,7 @@ def get_regexp_pattern(regexp):
         return str(regexp)
 
 
-def get_cors_origins(options, request_origin):
+def get_cors_origins(options, request_origin, match_origin=None):
     origins = options.get("origins")
     wildcard = r".*" in origins
 
@@ -127,7 +138,11 @@ def get_cors_origins(options, request_origin):
         # If the value of the Origin header is a case-insensitive match
         # for any of the values in list of origins.
         # NOTE: Per RFC 1035 and RFC 4343 schemes and hostnames are case insensitive.
-        elif try_match_any_pattern(request_origin, origins, caseSensitive=False):
+        elif (
+            match_origin(request_origin)
+            if match_origin is not None
+            else try_match_any_pattern(request_origin, origins, caseSensitive=False)
+        ):
             LOG.debug(
                 "The request's Origin header matches. Sending CORS headers.",
             )
@@ -163,20 +178,23 @@ def get_cors_origins(options, request_origin):
         return None
 
 
-def get_allow_headers(options, acl_request_headers):
+def get_allow_headers(options, acl_request_headers, match_header=None):
     if acl_request_headers:
         request_headers = [h.strip() for h in acl_request_headers.split(",")]
 
         # any header that matches in the allow_headers
-        matching_headers = filter(lambda h: try_match_any_pattern(h, options.get("allow_headers"), caseSensitive=False), request_headers)
+        if match_header is None:
+            matching_headers = filter(lambda h: try_match_any_pattern(h, options.get("allow_headers"), caseSensitive=False), request_headers)
+        else:
+            matching_headers = filter(match_header, request_headers)
 
         return ", ".join(sorted(matching_headers))
 
     return None
 
 
-def get_cors_headers(options, request_headers, request_method):
-    origins_to_set = get_cors_origins(options, request_headers.get("Origin"))
+def get_cors_headers(options, request_headers, request_method, match_origin=None, match_header=None):
+    origins_to_set = get_cors_origins(options, request_headers.get("Origin"), match_origin)
     headers = MultiDict()
 
     if not origins_to_set:  # CORS is not enabled for this route
@@ -208,7 +226,7 @@ def get_cors_headers(options, request_headers, request_method):
             # If method is not a case-sensitive match for any of the values in
             # list of methods do not set any additional headers and terminate
             # this set of steps.
-            headers[ACL_ALLOW_HEADERS] = get_allow_headers(options, request_headers.get(ACL_REQUEST_HEADERS))
+            headers[ACL_ALLOW_HEADERS] = get_allow_headers(options, request_headers.get(ACL_REQUEST_HEADERS), match_header)
             headers[ACL_MAX_AGE] = options.get("max_age")
             headers[ACL_METHODS] = options.get("methods")
         else:
@@ -233,13 +251,14 @@ def get_cors_headers(options, request_headers, request_method):
     return MultiDict((k, v) for k, v in headers.items() if v)
 
 
-def set_cors_headers(resp, options):
+def set_cors_headers(resp, options, resource=None):
     """
     Performs the actual evaluation of Flask-CORS options and actually
     modifies the response object.
 
     This function is used both in the decorator and the after_request
-    callback
+    callback. The after_request callback passes the precompiled
+    `CompiledResource` so the header set can be reused between requests.
     """
 
     # If CORS has already been evaluated via the decorator, skip
@@ -253,11 +272,14 @@ def set_cors_headers(resp, options):
     if not isinstance(resp.headers, Headers) and not isinstance(resp.headers, MultiDict):
         resp.headers = MultiDict(resp.headers)
 
-    headers_to_set = get_cors_headers(options, request.headers, request.method)
+    if resource is not None:
+        headers_to_set = resource.get_headers(request.headers, request.method)
+    else:
+        headers_to_set = tuple(get_cors_headers(options, request.headers, request.method).items())
 
     LOG.debug("Settings CORS headers: %s", str(headers_to_set))
 
-    for k, v in headers_to_set.items():
+    for k, v in headers_to_set:
         resp.headers.add(k, v)
 
     return resp
@@ -307,6 +329,161 @@ def try_match_pattern(value, pattern, caseSensitive=True):
     except Exception:
         return value == pattern
 
+def compile_pattern(pattern, caseSensitive=True):
+    """
+    Compiles a pattern once into a predicate that behaves like
+    `try_match_pattern` for that pattern.
+    """
+    if isinstance(pattern, RegexObject):
+        return lambda value: pattern.match(value) is not None
+    if probably_regex(pattern):
+        try:
+            regex = re.compile(pattern, 0 if caseSensitive else re.IGNORECASE)
+        except re.error:
+            return lambda value: False
+        return lambda value: regex.match(value) is not None
+
+    literal = str(pattern)
+    if caseSensitive:
+        return lambda value: str(value) == literal
+    literal = literal.casefold()
+    return lambda value: str(value).casefold() == literal
+
+
+def compile_patterns(patterns, caseSensitive=True):
+    """
+    Compiles a list of patterns into a single predicate that behaves like
+    `try_match_any_pattern`. Literal strings are looked up in a set and
+    string regexes are merged into one alternation.
+    """
+    literals = set()
+    sources = []
+    predicates = []
+
+    for pattern in patterns:
+        if isinstance(pattern, RegexObject):
+            predicates.append(compile_pattern(pattern, caseSensitive))
+        elif probably_regex(pattern):
+            sources.append(pattern)
+        else:
+            literals.add(str(pattern) if caseSensitive else str(pattern).casefold())
+
+    if sources:
+        try:
+            combined = re.compile(
+                "|".join(f"(?:{source})" for source in sources),
+                0 if caseSensitive else re.IGNORECASE,
+            )
+        except re.error:
+            # e.g. inline flags, keep the patterns separate
+            predicates.extend(compile_pattern(source, caseSensitive) for source in sources)
+        else:
+            predicates.append(lambda value: combined.match(value) is not None)
+
+    def match(value):
+        if literals:
+            key = str(value) if caseSensitive else str(value).casefold()
+            if key in literals:
+                return True
+        return any(predicate(value) for predicate in predicates)
+
+    return match
+
+
+class CompiledResource:
+    """
+    A resource with its origin and allowed header patterns compiled once,
+    and a bounded cache of the CORS headers computed for each distinct
+    combination of the request headers they depend on.
+    """
+
+    def __init__(self, pattern, options, cache_size=HEADER_CACHE_SIZE):
+        self.pattern = pattern
+        self.options = options
+        self.match_origin = compile_patterns(options.get("origins"), caseSensitive=False)
+        self.match_header = compile_patterns(options.get("allow_headers"), caseSensitive=False)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = Lock()
+
+    def get_headers(self, request_headers, request_method):
+        key = (
+            request_headers.get("Origin"),
+            request_method,
+            request_headers.get(ACL_REQUEST_METHOD),
+            request_headers.get(ACL_REQUEST_HEADERS),
+            request_headers.get(ACL_REQUEST_HEADER_PRIVATE_NETWORK),
+        )
+
+        with self._lock:
+            headers = self._cache.get(key)
+            if headers is not None:
+                self._cache.move_to_end(key)
+                return headers
+
+        headers = tuple(
+            get_cors_headers(
+                self.options, request_headers, request_method, self.match_origin, self.match_header
+            ).items()
+        )
+
+        with self._lock:
+            self._cache[key] = headers
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return headers
+
+
+class ResourceMatcher:
+    """
+    Matches a request path against all resources with one combined regex,
+    returning the first `CompiledResource` in resource order that matches.
+    """
+
+    def __init__(self, resources):
+        self.resources = [CompiledResource(pattern, options) for pattern, options in resources]
+        self._combined = None
+        self._index = {}
+
+        alternatives = []
+        for resource in self.resources:
+            pattern = resource.pattern
+            if isinstance(pattern, RegexObject):
+                if pattern.flags & ~re.UNICODE or _BACKREF_RE.search(pattern.pattern):
+                    return
+                alternatives.append(pattern.pattern)
+            elif probably_regex(pattern):
+                if _BACKREF_RE.search(pattern):
+                    return
+                alternatives.append(pattern)
+            else:
+                alternatives.append(re.escape(str(pattern)) + r"\Z")
+
+        try:
+            self._combined = re.compile("|".join(f"({alternative})" for alternative in alternatives))
+            group = 1
+            for i, alternative in enumerate(alternatives):
+                self._index[group] = i
+                group += 1 + re.compile(alternative).groups
+        except re.error:
+            # Invalid or conflicting patterns (duplicate group names, inline
+            # flags), fall back to trying each resource in order.
+            self._combined = None
+
+    def match(self, path):
+        if self._combined is not None:
+            match = self._combined.match(path)
+            if match is None:
+                return None
+            return self.resources[self._index[match.lastindex]]
+
+        for resource in self.resources:
+            if try_match_pattern(path, resource.pattern, caseSensitive=True):
+                return resource
+        return None
+
+
 def get_cors_options(appInstance, *dicts):
     """
     Compute CORS options for an application by combining the DEFAULT_OPTIONS,
@@ -3,7 +3,7 @@ from urllib.parse import unquote
 
 from flask import request
 
-from .core import ACL_ORIGIN, get_cors_options, get_regexp_pattern, parse_resources, set_cors_headers, try_match_pattern
+from .core import ACL_ORIGIN, ResourceMatcher, get_cors_options, get_regexp_pattern, parse_resources, set_cors_headers
 
 LOG = logging.getLogger(__name__)
 
@@ -183,22 +183,24 @@ class CORS:
 
 
 def make_after_request_function(resources):
+    # Compile every resource and origin pattern once, not per request
+    matcher = ResourceMatcher(resources)
+
     def cors_after_request(resp):
         # If CORS headers are set in a view decorator, pass
         if resp.headers is not None and resp.headers.get(ACL_ORIGIN):
             LOG.debug("CORS have been already evaluated, skipping")
             return resp
         normalized_path = unquote(request.path)
-        for res_regex, res_options in resources:
-            if try_match_pattern(normalized_path, res_regex, caseSensitive=True):
-                LOG.debug(
-                    "Request to '%r' matches CORS resource '%s'. Using options: %s",
-                    request.path,
-                    get_regexp_pattern(res_regex),
-                    res_options,
-                )
-                set_cors_headers(resp, res_options)
-                break
+        resource = matcher.match(normalized_path)
+        if resource is not None:
+            LOG.debug(
+                "Request to '%r' matches CORS resource '%s'. Using options: %s",
+                request.path,
+                get_regexp_pattern(resource.pattern),
+                resource.options,
+            )
+            set_cors_headers(resp, resource.options, resource)
         else:
             LOG.debug("No CORS rule matches")
         return resp
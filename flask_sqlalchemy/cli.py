@@ -1,8 +1,14 @@
 from __future__ import annotations
 
+import os
+import time
 import typing as t
 
+import click
+import sqlalchemy as sa
 from flask import current_app
+from flask.cli import AppGroup
+from flask.signals import Namespace  # type: ignore[attr-defined]
 
 
 def add_models_to_shell() -> dict[str, t.Any]:
@@ -14,3 +20,230 @@ def add_models_to_shell() -> dict[str, t.Any]:
     out = {m.class_.__name__: m.class_ for m in db.Model._sa_registry.mappers}
     out["db"] = db
     return out
+
+
+db_cli = AppGroup("db", help="Database commands from Flask-SQLAlchemy.")
+"""The ``flask db`` command group, added to the app by :meth:`.SQLAlchemy.init_app`
+unless the app already has a ``db`` command.
+
+.. versionadded:: 3.2
+"""
+
+
+def _format_duration(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+
+    if seconds >= 0.001:
+        return f"{seconds * 1000:.1f}ms"
+
+    return f"{seconds * 1_000_000:.0f}µs"
+
+
+@db_cli.command("queries")
+@click.option(
+    "--sort",
+    type=click.Choice(["total", "count", "mean", "p99", "max"]),
+    default="total",
+    show_default=True,
+    help="Order queries by this column.",
+)
+@click.option("--limit", type=int, default=20, show_default=True)
+@click.option("--locations/--no-locations", default=True, show_default=True)
+@click.option("--reset", is_flag=True, help="Delete the collected statistics.")
+def queries_command(sort: str, limit: int, locations: bool, reset: bool) -> None:
+    """Show the most expensive queries recorded by every worker process.
+
+    Requires SQLALCHEMY_RECORD_QUERIES = "aggregate" and SQLALCHEMY_RECORD_QUERIES_DIR.
+    Each worker writes its statistics there periodically.
+    """
+    from .record_queries import load_query_stats
+
+    directory = current_app.config.get("SQLALCHEMY_RECORD_QUERIES_DIR")
+
+    record = current_app.config.get("SQLALCHEMY_RECORD_QUERIES")
+
+    if record != "aggregate" or not directory:
+        raise click.UsageError(
+            "Set SQLALCHEMY_RECORD_QUERIES = 'aggregate' and"
+            " SQLALCHEMY_RECORD_QUERIES_DIR to collect query statistics."
+        )
+
+    if reset:
+        for name in os.listdir(directory):
+            if name.startswith("queries-") and name.endswith(".json"):
+                os.unlink(os.path.join(directory, name))
+
+        click.echo(f"Deleted query statistics in {directory}.")
+        return
+
+    rows = load_query_stats(directory)
+    rows.sort(key=lambda row: row[sort], reverse=True)
+
+    if not rows:
+        click.echo("No queries recorded yet.")
+        return
+
+    for row in rows[:limit]:
+        click.echo(
+            f"{row['count']:>9} calls  total {_format_duration(row['total']):>9}"
+            f"  mean {_format_duration(row['mean']):>8}"
+            f"  p50 {_format_duration(row['p50']):>8}"
+            f"  p99 {_format_duration(row['p99']):>8}"
+            f"  max {_format_duration(row['max']):>8}"
+        )
+        click.echo(f"    {row['fingerprint']}")
+
+        if locations:
+            by_count = sorted(row["locations"].items(), key=lambda item: -item[1])
+
+            for location, n in by_count:
+                click.echo(f"      {n:>6} × {location}")
+
+        click.echo()
+
+
+_signals = Namespace()
+
+rows_imported = _signals.signal("rows-imported")
+"""This Blinker signal is sent by ``flask db import`` after each batch is committed.
+Rows inserted this way don't go through the session, so :data:`.models_committed`
+is not sent for them. Connect to this to invalidate anything else derived from the
+table.
+
+The sender is the application. The receiver is passed the ``table`` that was
+inserted into and the number of ``rows`` in the batch.
+
+.. versionadded:: 3.2
+"""
+
+
+def _find_table(db: t.Any, name: str) -> sa.Table:
+    """Find a table by its name or by the name of its model class."""
+    for mapper in db.Model._sa_registry.mappers:
+        if mapper.class_.__name__ == name:
+            return mapper.local_table  # type: ignore[no-any-return]
+
+    for metadata in db.metadatas.values():
+        if name in metadata.tables:
+            return metadata.tables[name]  # type: ignore[no-any-return]
+
+    raise click.BadParameter(f"No model or table named '{name}'.", param_hint="TABLE")
+
+
+@db_cli.command("import")
+@click.argument("table")
+@click.argument("file", type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option("--batch-size", default=1000, show_default=True, help="Rows per INSERT.")
+@click.option(
+    "--checkpoint",
+    type=click.Path(dir_okay=False),
+    help="Where to record progress. Defaults to FILE.checkpoint.",
+)
+@click.option("--resume", is_flag=True, help="Continue from the checkpoint.")
+@click.option("--strict", is_flag=True, help="Stop at the first invalid row.")
+def import_command(
+    table: str,
+    file: str,
+    batch_size: int,
+    checkpoint: str | None,
+    resume: bool,
+    strict: bool,
+) -> None:
+    """Insert rows from a JSON Lines FILE into TABLE, a model or table name.
+
+    Each line is a JSON object with column names as keys. Rows are validated against
+    the columns and inserted in batches, each in its own transaction. Progress is
+    recorded after each batch, use --resume to continue an interrupted import. The
+    batch that was being committed when the import stopped may be inserted again.
+    Invalid rows are reported and skipped.
+    """
+    from .jsonl_import import import_jsonl
+    from .jsonl_import import read_checkpoint
+
+    db = current_app.extensions["sqlalchemy"]
+    target = _find_table(db, table)
+    engine = db.engines[target.metadata.info.get("bind_key")]
+
+    if file == "-":
+        if resume:
+            raise click.UsageError("Can't resume reading from stdin.")
+
+        stream: t.BinaryIO = click.get_binary_stream("stdin")
+        checkpoint = None
+        offset = line = 0
+    else:
+        if checkpoint is None:
+            checkpoint = f"{file}.checkpoint"
+
+        if resume and not os.path.exists(checkpoint):
+            raise click.UsageError(f"No checkpoint at '{checkpoint}' to resume from.")
+
+        offset, line = read_checkpoint(checkpoint) if resume else (0, 0)
+        stream = open(file, "rb")
+        stream.seek(offset)
+
+        if offset:
+            click.echo(f"Resuming after line {line}.")
+
+    reported = 0
+    last = time.monotonic()
+
+    def on_invalid(error: Exception) -> None:
+        nonlocal reported
+
+        if reported < 20:
+            click.echo(f"Skipped {error}", err=True)
+        elif reported == 20:
+            click.echo("Not reporting further invalid rows.", err=True)
+
+        reported += 1
+
+    def on_progress(progress: t.Any) -> None:
+        nonlocal last
+
+        if time.monotonic() - last >= 1:
+            last = time.monotonic()
+            click.echo(
+                f"{progress.inserted} rows ({progress.rate:,.0f} rows/s),"
+                f" line {progress.line}, {progress.invalid} invalid"
+            )
+
+    app = current_app._get_current_object()  # type: ignore[attr-defined]
+
+    def on_commit(rows: int) -> None:
+        db.query_cache.invalidate(target.name)
+        rows_imported.send(app, table=target, rows=rows)
+
+    try:
+        with stream:
+            progress = import_jsonl(
+                engine,
+                target,
+                stream,
+                batch_size=batch_size,
+                checkpoint=checkpoint,
+                offset=offset,
+                line=line,
+                strict=strict,
+                on_invalid=on_invalid,
+                on_progress=on_progress,
+                on_commit=on_commit,
+            )
+    except (Exception, KeyboardInterrupt) as e:
+        if checkpoint is not None:
+            click.echo(f"Stopped, continue with --resume from {checkpoint}.", err=True)
+
+        if isinstance(e, KeyboardInterrupt):
+            raise click.Abort() from None
+
+        raise click.ClickException(str(e)) from e
+
+    if checkpoint is not None:
+        os.unlink(checkpoint)
+
+    click.echo(
+        f"Inserted {progress.inserted} rows into '{target.name}' in"
+        f" {progress.elapsed:.1f}s ({progress.rate:,.0f} rows/s),"
+        f" skipped {progress.invalid} invalid rows."
+    )
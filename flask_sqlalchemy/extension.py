@@ -5,6 +5,7 @@ import types
 import typing as t
 import warnings
 from weakref import WeakKeyDictionary
+from weakref import ref as weakref
 
 import sqlalchemy as sa
 import sqlalchemy.event as sa_event
@@ -22,9 +23,16 @@ from .model import DefaultMetaNoName
 from .model import Model
 from .model import NameMixin
 from .pagination import Pagination
+from .pagination import SelectKeysetPagination
 from .pagination import SelectPagination
 from .query import Query
+from . import query_cache
+from .query_cache import MemoryCacheBackend
+from .query_cache import MmapCacheBackend
+from .query_cache import QueryCache
+from .replicas import ReplicaSet
 from .session import _app_ctx_id
+from .session import _ScopedSession
 from .session import Session
 from .table import _Table
 
@@ -200,6 +208,8 @@ class SQLAlchemy:
             The session is scoped to the current app context.
         """
 
+        query_cache._listen(self.session)
+
         self.metadatas: dict[str | None, sa.MetaData] = {}
         """Map of bind keys to :class:`sqlalchemy.schema.MetaData` instances. The
         ``None`` key refers to the default metadata, and is available as
@@ -272,7 +282,18 @@ class SQLAlchemy:
         self._engine_options = engine_options
         self._app_engines: WeakKeyDictionary[Flask, dict[str | None, sa.engine.Engine]]
         self._app_engines = WeakKeyDictionary()
+        self._app_replicas: WeakKeyDictionary[
+            Flask, dict[sa.engine.Engine, ReplicaSet]
+        ] = WeakKeyDictionary()
+        self._app_query_caches: WeakKeyDictionary[Flask, QueryCache]
+        self._app_query_caches = WeakKeyDictionary()
+        self._app_query_stats: WeakKeyDictionary[Flask, t.Any] = WeakKeyDictionary()
+        # Offline cache key strings by statement structure, see
+        # CacheKey.to_offline_string.
+        self._query_cache_strings: sa.util.LRUCache[t.Any, str]
+        self._query_cache_strings = sa.util.LRUCache(1000)
         self._add_models_to_shell = add_models_to_shell
+        self._fork_hook_registered = False
 
         if app is not None:
             self.init_app(app)
@@ -304,9 +325,41 @@ class SQLAlchemy:
         - :data:`.SQLALCHEMY_ECHO`
         - :data:`.SQLALCHEMY_BINDS`
         - :data:`.SQLALCHEMY_RECORD_QUERIES`
+        - :data:`.SQLALCHEMY_RECORD_QUERIES_SAMPLE`
+        - :data:`.SQLALCHEMY_RECORD_QUERIES_MAX_FINGERPRINTS`
+        - :data:`.SQLALCHEMY_RECORD_QUERIES_DIR`
+        - :data:`.SQLALCHEMY_N_PLUS_ONE`
+        - :data:`.SQLALCHEMY_N_PLUS_ONE_THRESHOLD`
+        - :data:`.SQLALCHEMY_N_PLUS_ONE_SAMPLE`
         - :data:`.SQLALCHEMY_TRACK_MODIFICATIONS`
+        - :data:`.SQLALCHEMY_DISPOSE_ON_FORK`
+        - :data:`.SQLALCHEMY_POOL_WARM`
+        - :data:`.SQLALCHEMY_REPLICA_MAX_LAG`
+        - :data:`.SQLALCHEMY_REPLICA_CHECK_INTERVAL`
+        - :data:`.SQLALCHEMY_QUERY_CACHE_BACKEND`
+        - :data:`.SQLALCHEMY_QUERY_CACHE_MAX_ENTRIES`
+        - :data:`.SQLALCHEMY_QUERY_CACHE_MMAP_PATH`
+        - :data:`.SQLALCHEMY_QUERY_CACHE_TTL`
 
         :param app: The Flask application to initialize.
+
+        .. versionchanged:: 3.2
+            ``SQLALCHEMY_N_PLUS_ONE`` detects relationships lazy loaded in a loop.
+
+        .. versionchanged:: 3.2
+            ``SQLALCHEMY_RECORD_QUERIES = "aggregate"`` collects :class:`.QueryStats`.
+
+        .. versionchanged:: 3.2
+            Add the ``flask db`` command group.
+
+        .. versionchanged:: 3.2
+            Create the :attr:`query_cache`.
+
+        .. versionchanged:: 3.2
+            Binds with a ``replica_of`` key are read replicas of another bind.
+
+        .. versionchanged:: 3.2
+            Inherited connection pools are discarded in forked child processes.
         """
         if "sqlalchemy" in app.extensions:
             raise RuntimeError(
@@ -322,6 +375,11 @@ class SQLAlchemy:
 
             app.shell_context_processor(add_models_to_shell)
 
+        from .cli import db_cli
+
+        if "db" not in app.cli.commands:
+            app.cli.add_command(db_cli)
+
         basic_uri: str | sa.engine.URL | None = app.config.setdefault(
             "SQLALCHEMY_DATABASE_URI", None
         )
@@ -334,6 +392,7 @@ class SQLAlchemy:
             str | None, str | sa.engine.URL | dict[str, t.Any]
         ] = app.config.setdefault("SQLALCHEMY_BINDS", {})
         engine_options: dict[str | None, dict[str, t.Any]] = {}
+        replica_of: dict[str | None, str | None] = {}
 
         # Build the engine config for each bind key.
         for key, value in config_binds.items():
@@ -344,6 +403,9 @@ class SQLAlchemy:
             else:
                 engine_options[key].update(value)
 
+                if "replica_of" in engine_options[key]:
+                    replica_of[key] = engine_options[key].pop("replica_of")
+
         # Build the engine config for the default bind key.
         if basic_uri is not None:
             basic_engine_options["url"] = basic_uri
@@ -365,25 +427,216 @@ class SQLAlchemy:
 
             engines.clear()
 
-        # Create the metadata and engine for each bind key.
+        # Create the metadata and engine for each bind key. Replicas share the
+        # metadata of their primary.
         for key, options in engine_options.items():
-            self._make_metadata(key)
+            if key not in replica_of:
+                self._make_metadata(key)
+
             options.setdefault("echo", echo)
             options.setdefault("echo_pool", echo)
             self._apply_driver_defaults(options, app)
             engines[key] = self._make_engine(key, options, app)
 
-        if app.config.setdefault("SQLALCHEMY_RECORD_QUERIES", False):
+        replica_max_lag: float = app.config.setdefault(
+            "SQLALCHEMY_REPLICA_MAX_LAG", 5.0
+        )
+        replica_check_interval: float = app.config.setdefault(
+            "SQLALCHEMY_REPLICA_CHECK_INTERVAL", 5.0
+        )
+        replica_sets = self._app_replicas.setdefault(app, {})
+        replica_sets.clear()
+
+        for primary_key in set(replica_of.values()):
+            if primary_key not in engines or primary_key in replica_of:
+                raise RuntimeError(
+                    f"Bind key '{primary_key}' used by 'replica_of' is not a primary"
+                    " bind in 'SQLALCHEMY_BINDS' or 'SQLALCHEMY_DATABASE_URI'."
+                )
+
+            primary = engines[primary_key]
+            replica_sets[primary] = ReplicaSet(
+                primary,
+                [engines[k] for k, v in replica_of.items() if v == primary_key],
+                max_lag=replica_max_lag,
+                check_interval=replica_check_interval,
+            )
+
+        record: bool | str = app.config.setdefault("SQLALCHEMY_RECORD_QUERIES", False)
+        sample: int = app.config.setdefault("SQLALCHEMY_RECORD_QUERIES_SAMPLE", 100)
+        max_fingerprints: int = app.config.setdefault(
+            "SQLALCHEMY_RECORD_QUERIES_MAX_FINGERPRINTS", 500
+        )
+        dump_dir: str | None = app.config.setdefault(
+            "SQLALCHEMY_RECORD_QUERIES_DIR", None
+        )
+
+        if record == "aggregate":
+            from .record_queries import QueryStats
+
+            stats = self._app_query_stats[app] = QueryStats(
+                app.import_name,
+                max_fingerprints=max_fingerprints,
+                sample=sample,
+                dump_dir=dump_dir,
+            )
+
+            for engine in engines.values():
+                stats._listen(engine)
+        elif record:
             from . import record_queries
 
             for engine in engines.values():
                 record_queries._listen(engine)
 
+        app.config.setdefault("SQLALCHEMY_N_PLUS_ONE_THRESHOLD", 10)
+        app.config.setdefault("SQLALCHEMY_N_PLUS_ONE_SAMPLE", 1.0)
+        n_plus_one: bool | str = app.config.setdefault("SQLALCHEMY_N_PLUS_ONE", False)
+
+        if n_plus_one not in {False, None, "log", "raise"}:
+            raise RuntimeError(
+                "'SQLALCHEMY_N_PLUS_ONE' must be False, 'log', or 'raise', not"
+                f" {n_plus_one!r}."
+            )
+
+        if n_plus_one:
+            from . import n_plus_one as n_plus_one_detector
+
+            n_plus_one_detector._listen(self.session, engines.values())
+
         if app.config.setdefault("SQLALCHEMY_TRACK_MODIFICATIONS", False):
             from . import track_modifications
 
             track_modifications._listen(self.session)
 
+        app.config.setdefault("SQLALCHEMY_POOL_WARM", 0)
+        self._app_query_caches[app] = self._make_query_cache(app)
+
+        if app.config.setdefault("SQLALCHEMY_DISPOSE_ON_FORK", True):
+            self._register_fork_hook()
+
+    def _make_query_cache(self, app: Flask) -> QueryCache:
+        """Create the :attr:`query_cache` for an app from its config.
+
+        :meta private:
+
+        .. versionadded:: 3.2
+        """
+        backend: t.Any = app.config.setdefault(
+            "SQLALCHEMY_QUERY_CACHE_BACKEND", "memory"
+        )
+        max_entries: int = app.config.setdefault(
+            "SQLALCHEMY_QUERY_CACHE_MAX_ENTRIES", 1024
+        )
+        path: str | None = app.config.setdefault(
+            "SQLALCHEMY_QUERY_CACHE_MMAP_PATH", None
+        )
+        ttl: float = app.config.setdefault("SQLALCHEMY_QUERY_CACHE_TTL", 60)
+
+        if backend == "memory":
+            backend = MemoryCacheBackend(max_entries)
+        elif backend == "mmap":
+            if path is None:
+                raise RuntimeError(
+                    "'SQLALCHEMY_QUERY_CACHE_MMAP_PATH' must be set to use the 'mmap'"
+                    " query cache backend."
+                )
+
+            backend = MmapCacheBackend(path, slots=max_entries)
+        elif isinstance(backend, str):
+            raise RuntimeError(
+                f"Unknown 'SQLALCHEMY_QUERY_CACHE_BACKEND' value '{backend}'."
+            )
+
+        return QueryCache(backend, ttl=ttl)
+
+    def before_fork(self, app: Flask | None = None) -> None:
+        """Close every pooled connection before the process forks.
+
+        Call this in a pre-fork server's master process once the app has done its
+        startup work, for example right before uWSGI or Gunicorn forks the workers.
+        Otherwise each worker would inherit the master's open sockets, and several
+        processes would talk over the same database connection. Any session should
+        be removed first, which happens when the app context ends.
+
+        :param app: Only dispose the engines for this app. Defaults to every app
+            registered with this extension.
+
+        .. versionadded:: 3.2
+        """
+        for engine in self._iter_engines(app):
+            engine.dispose()
+
+    def after_fork(self, app: Flask | None = None, warm: int | None = None) -> None:
+        """Give a forked child process its own fresh connection pools, and optionally
+        open some connections ahead of the first request.
+
+        The inherited pools are discarded without closing their connections, since
+        those sockets still belong to the parent. This already happens
+        automatically right after a fork unless :data:`.SQLALCHEMY_DISPOSE_ON_FORK`
+        is disabled, so calling this from a server's post-fork hook is mainly useful
+        to warm the pool.
+
+        :param app: Only reset the engines for this app. Defaults to every app
+            registered with this extension.
+        :param warm: How many connections to open in each pool. Defaults to
+            :data:`.SQLALCHEMY_POOL_WARM` for each app.
+
+        .. versionadded:: 3.2
+        """
+        apps = list(self._app_engines) if app is None else [app]
+
+        for current in apps:
+            count = current.config["SQLALCHEMY_POOL_WARM"] if warm is None else warm
+
+            for engine in self._iter_engines(current):
+                engine.dispose(close=False)
+
+                if count > 0:
+                    connections = [engine.connect() for _ in range(count)]
+
+                    for connection in connections:
+                        connection.close()
+
+    def _iter_engines(self, app: Flask | None) -> t.Iterator[sa.engine.Engine]:
+        """Iterate over the engines of one app, or of every registered app.
+
+        :meta private:
+
+        .. versionadded:: 3.2
+        """
+        if app is not None:
+            yield from self._app_engines.get(app, {}).values()
+            return
+
+        for engines in list(self._app_engines.values()):
+            yield from engines.values()
+
+    def _register_fork_hook(self) -> None:
+        """Discard inherited pools in the child after every fork. The hook holds a
+        weak reference so it does not keep the extension alive.
+
+        :meta private:
+
+        .. versionadded:: 3.2
+        """
+        if self._fork_hook_registered or not hasattr(os, "register_at_fork"):
+            return
+
+        ref = weakref(self)
+
+        def dispose_inherited() -> None:
+            ext = ref()
+
+            if ext is None:
+                return
+
+            for engine in ext._iter_engines(None):
+                engine.dispose(close=False)
+
+        os.register_at_fork(after_in_child=dispose_inherited)
+        self._fork_hook_registered = True
+
     def _make_scoped_session(
         self, options: dict[str, t.Any]
     ) -> sa_orm.scoped_session[Session]:
@@ -401,6 +654,9 @@ class SQLAlchemy:
         :param options: The ``session_options`` parameter from ``__init__``. Keyword
             arguments passed to the session factory. A ``scopefunc`` key is popped.
 
+        .. versionchanged:: 3.2
+            ``execute`` accepts the ``cache`` argument.
+
         .. versionchanged:: 3.0
             The session is scoped to the current app context.
 
@@ -409,7 +665,7 @@ class SQLAlchemy:
         """
         scope = options.pop("scopefunc", _app_ctx_id)
         factory = self._make_session_factory(options)
-        return sa_orm.scoped_session(factory, scope)
+        return _ScopedSession(factory, scope)
 
     def _make_session_factory(
         self, options: dict[str, t.Any]
@@ -695,6 +951,34 @@ class SQLAlchemy:
 
         return self._app_engines[app]
 
+    @property
+    def replicas(self) -> t.Mapping[sa.engine.Engine, ReplicaSet]:
+        """Map of primary engines to the :class:`.ReplicaSet` of read replicas
+        configured for them, for the current application. Engines without replicas are
+        not included.
+
+        This requires that a Flask application context is active.
+
+        .. versionadded:: 3.2
+        """
+        app = current_app._get_current_object()  # type: ignore[attr-defined]
+        return self._app_replicas.get(app, {})
+
+    @property
+    def query_cache(self) -> QueryCache:
+        """The :class:`.QueryCache` for the current application, which stores the
+        results of queries that opt in with :meth:`.Query.cache` or the ``cache``
+        argument to :meth:`.Session.execute`.
+
+        To customize, set the :data:`.SQLALCHEMY_QUERY_CACHE_BACKEND` config.
+
+        This requires that a Flask application context is active.
+
+        .. versionadded:: 3.2
+        """
+        app = current_app._get_current_object()  # type: ignore[attr-defined]
+        return self._app_query_caches[app]
+
     @property
     def engine(self) -> sa.engine.Engine:
         """The default :class:`~sqlalchemy.engine.Engine` for the current application,
@@ -808,6 +1092,8 @@ class SQLAlchemy:
         max_per_page: int | None = None,
         error_out: bool = True,
         count: bool = True,
+        keyset: t.Sequence[t.Any] | None = None,
+        cursor: str | None = None,
     ) -> Pagination:
         """Apply an offset and limit to a select statment based on the current page and
         number of items per page, returning a :class:`.Pagination` object.
@@ -830,12 +1116,33 @@ class SQLAlchemy:
         :param count: Calculate the total number of values by issuing an extra count
             query. For very complex queries this may be inaccurate or slow, so it can be
             disabled and set manually if necessary.
+        :param keyset: Paginate by comparing these ordering columns with a cursor
+            instead of using an offset, returning a :class:`.KeysetPagination` object.
+            The columns must uniquely order the rows, like
+            ``(Post.created.desc(), Post.id.desc())``. ``page`` is ignored.
+        :param cursor: The cursor to start after when using ``keyset``. Defaults to the
+            ``cursor`` query arg during a request.
+
+        .. versionchanged:: 3.2
+            Added the ``keyset`` and ``cursor`` parameters.
 
         .. versionchanged:: 3.0
             The ``count`` query is more efficient.
 
         .. versionadded:: 3.0
         """
+        if keyset is not None:
+            return SelectKeysetPagination(
+                select=select,
+                session=self.session(),
+                keyset=tuple(keyset),
+                cursor=cursor,
+                per_page=per_page,
+                max_per_page=max_per_page,
+                error_out=error_out,
+                count=count,
+            )
+
         return SelectPagination(
             select=select,
             session=self.session(),
@@ -0,0 +1,346 @@
+from __future__ import annotations
+
+import dataclasses
+import datetime
+import json
+import os
+import tempfile
+import time
+import typing as t
+
+import sqlalchemy as sa
+
+
+class InvalidRow(ValueError):
+    """A line of the import file that can't be inserted.
+
+    .. versionadded:: 3.2
+    """
+
+    def __init__(self, line: int, message: str) -> None:
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+@dataclasses.dataclass
+class ImportProgress:
+    """Counters reported while :func:`import_jsonl` runs, and returned at the end.
+
+    .. versionadded:: 3.2
+    """
+
+    inserted: int = 0
+    invalid: int = 0
+    line: int = 0
+    offset: int = 0
+    started: float = dataclasses.field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self) -> float:
+        """Inserted rows per second."""
+        elapsed = self.elapsed
+        return self.inserted / elapsed if elapsed > 0 else 0.0
+
+
+def iter_jsonl(
+    file: t.BinaryIO, offset: int = 0, line: int = 0
+) -> t.Iterator[tuple[int, int, t.Any]]:
+    """Read JSON objects from a JSON Lines file one at a time. Yields the line number,
+    the byte offset just after the line, and the decoded value. Blank lines are
+    skipped.
+
+    :param file: A file opened in binary mode.
+    :param offset: The byte offset to start at, if the file was seeked there.
+    :param line: The number of lines before ``offset``.
+
+    .. versionadded:: 3.2
+    """
+    for raw in file:
+        line += 1
+        offset += len(raw)
+
+        if not raw.strip():
+            continue
+
+        try:
+            value = json.loads(raw)
+        except ValueError as e:
+            yield line, offset, InvalidRow(line, f"invalid JSON: {e}")
+            continue
+
+        yield line, offset, value
+
+
+def _check_int(value: t.Any) -> t.Any:
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise TypeError("expected an integer")
+
+    return value
+
+
+def _check_float(value: t.Any) -> t.Any:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TypeError("expected a number")
+
+    return value
+
+
+def _check_bool(value: t.Any) -> t.Any:
+    if not isinstance(value, bool):
+        raise TypeError("expected true or false")
+
+    return value
+
+
+def _check_datetime(value: t.Any) -> t.Any:
+    if not isinstance(value, str):
+        raise TypeError("expected an ISO 8601 string")
+
+    return datetime.datetime.fromisoformat(value)
+
+
+def _check_date(value: t.Any) -> t.Any:
+    if not isinstance(value, str):
+        raise TypeError("expected an ISO 8601 string")
+
+    return datetime.date.fromisoformat(value)
+
+
+def _make_check(column: sa.Column[t.Any]) -> t.Callable[[t.Any], t.Any]:
+    """Build the function that validates and converts one JSON value for a column.
+
+    :meta private:
+    """
+    type_ = column.type
+
+    if isinstance(type_, sa.Boolean):
+        return _check_bool
+
+    if isinstance(type_, sa.Integer):
+        return _check_int
+
+    if isinstance(type_, (sa.Float, sa.Numeric)):
+        return _check_float
+
+    if isinstance(type_, sa.DateTime):
+        return _check_datetime
+
+    if isinstance(type_, sa.Date):
+        return _check_date
+
+    if isinstance(type_, sa.String):
+        length = type_.length
+
+        def check_string(value: t.Any) -> t.Any:
+            if not isinstance(value, str):
+                raise TypeError("expected a string")
+
+            if length is not None and len(value) > length:
+                raise ValueError(f"longer than {length} characters")
+
+            return value
+
+        return check_string
+
+    return lambda value: value
+
+
+class RowValidator:
+    """Check that a decoded JSON object can be inserted into a table, and convert its
+    values to what the columns expect.
+
+    Every key must be a column. Columns that are not nullable and have no default
+    must be present. Values must match the column type, strings must fit the column
+    length, and ISO 8601 strings are parsed for date and datetime columns.
+
+    :param table: The table rows will be inserted into.
+
+    .. versionadded:: 3.2
+    """
+
+    def __init__(self, table: sa.Table) -> None:
+        self.table = table
+        self.checks = {column.key: _make_check(column) for column in table.columns}
+        self.nullable = {column.key for column in table.columns if column.nullable}
+        self.required = {
+            column.key
+            for column in table.columns
+            if not column.nullable
+            and column.default is None
+            and column.server_default is None
+            and column is not table.autoincrement_column
+        }
+
+    def __call__(self, line: int, value: t.Any) -> dict[str, t.Any]:
+        if isinstance(value, InvalidRow):
+            raise value
+
+        if not isinstance(value, dict):
+            raise InvalidRow(line, "expected a JSON object")
+
+        unknown = value.keys() - self.checks.keys()
+
+        if unknown:
+            raise InvalidRow(line, f"unknown columns {sorted(unknown)}")
+
+        missing = self.required - value.keys()
+
+        if missing:
+            raise InvalidRow(line, f"missing required columns {sorted(missing)}")
+
+        row = {}
+
+        for key, item in value.items():
+            if item is None:
+                if key not in self.nullable:
+                    raise InvalidRow(line, f"'{key}' can't be null")
+
+                row[key] = None
+                continue
+
+            try:
+                row[key] = self.checks[key](item)
+            except (TypeError, ValueError) as e:
+                raise InvalidRow(line, f"'{key}': {e}") from None
+
+        return row
+
+
+def read_checkpoint(path: str | os.PathLike[str]) -> tuple[int, int]:
+    """Return the byte offset and line number saved by :func:`import_jsonl`, or
+    ``(0, 0)`` if there is no checkpoint.
+
+    .. versionadded:: 3.2
+    """
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return 0, 0
+
+    return data["offset"], data["line"]
+
+
+def _write_checkpoint(path: str | os.PathLike[str], offset: int, line: int) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump({"offset": offset, "line": line}, f)
+
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _insert_batch(
+    conn: sa.engine.Connection, table: sa.Table, batch: list[dict[str, t.Any]]
+) -> None:
+    # One executemany per set of keys, since every parameter set in an executemany
+    # must bind the same columns. Drivers such as PyMySQL turn it into multi-row
+    # INSERTs.
+    groups: dict[frozenset[str], list[dict[str, t.Any]]] = {}
+
+    for row in batch:
+        groups.setdefault(frozenset(row), []).append(row)
+
+    for rows in groups.values():
+        conn.execute(table.insert(), rows)
+
+
+def import_jsonl(
+    engine: sa.engine.Engine,
+    table: sa.Table,
+    file: t.BinaryIO,
+    *,
+    batch_size: int = 1000,
+    checkpoint: str | os.PathLike[str] | None = None,
+    offset: int = 0,
+    line: int = 0,
+    strict: bool = False,
+    on_invalid: t.Callable[[InvalidRow], None] | None = None,
+    on_progress: t.Callable[[ImportProgress], None] | None = None,
+    on_commit: t.Callable[[int], None] | None = None,
+) -> ImportProgress:
+    """Insert the rows of a JSON Lines file into a table in batches, holding at most
+    one batch in memory.
+
+    Each batch is inserted with ``executemany`` and committed in its own
+    transaction. After each commit, the position in the file is written to
+    ``checkpoint``, so an interrupted import can continue from there by passing the
+    saved ``offset`` and ``line``, see :func:`read_checkpoint`. The file must
+    already be seeked to ``offset``.
+
+    The checkpoint is a file, not part of the transaction, so resuming is
+    at-least-once: if the import stops after a batch commits but before the
+    checkpoint is written, that batch is inserted again on resume. Tables with a
+    unique key in the file will fail on the duplicate batch instead.
+
+    The rows are inserted with the engine, not a session, so
+    :data:`.models_committed` is not sent and :attr:`.SQLAlchemy.query_cache` is
+    not invalidated. Use ``on_commit`` to do that, and anything else that would
+    otherwise react to commits.
+
+    :param engine: The engine to insert with.
+    :param table: The table to insert into.
+    :param file: The file to read, opened in binary mode.
+    :param batch_size: How many rows to insert in each transaction.
+    :param checkpoint: A file to record progress in after each batch.
+    :param offset: The byte offset the file is at.
+    :param line: The number of lines before ``offset``.
+    :param strict: Raise :exc:`InvalidRow` for the first invalid row instead of
+        skipping it.
+    :param on_invalid: Called with each skipped row's error.
+    :param on_progress: Called with the counters after each batch.
+    :param on_commit: Called with the number of rows after each batch is committed.
+
+    .. versionadded:: 3.2
+    """
+    validate = RowValidator(table)
+    progress = ImportProgress(line=line, offset=offset)
+    batch: list[dict[str, t.Any]] = []
+
+    def flush() -> None:
+        if batch:
+            with engine.begin() as conn:
+                _insert_batch(conn, table, batch)
+
+            progress.inserted += len(batch)
+
+            if on_commit is not None:
+                on_commit(len(batch))
+
+            batch.clear()
+
+        if checkpoint is not None:
+            _write_checkpoint(checkpoint, progress.offset, progress.line)
+
+        if on_progress is not None:
+            on_progress(progress)
+
+    for line_no, end, value in iter_jsonl(file, offset, line):
+        try:
+            batch.append(validate(line_no, value))
+        except InvalidRow as e:
+            if strict:
+                raise
+
+            progress.invalid += 1
+
+            if on_invalid is not None:
+                on_invalid(e)
+
+        progress.line = line_no
+        progress.offset = end
+
+        if len(batch) >= batch_size:
+            flush()
+
+    flush()
+    return progress
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import logging
+import random
+import typing as t
+
+import sqlalchemy as sa
+import sqlalchemy.event as sa_event
+import sqlalchemy.orm as sa_orm
+from flask import current_app
+from flask import g
+from flask import has_app_context
+from flask import has_request_context
+from flask import request
+
+from .record_queries import fingerprint
+
+if t.TYPE_CHECKING:
+    from .session import Session
+
+logger = logging.getLogger(__name__)
+
+# Execution option the ORM hook uses to tell the cursor hook which relationship a
+# statement lazy loads.
+_LAZY_LOAD_OPTION = "_fsa_lazy_load"
+
+
+class NPlusOneError(Exception):
+    """Raised when :data:`.SQLALCHEMY_N_PLUS_ONE` is ``"raise"`` and a relationship
+    is lazy loaded more times than allowed while handling one request.
+
+    .. versionadded:: 3.2
+    """
+
+    def __init__(
+        self, relationship: str, count: int, endpoint: str | None, statement: str
+    ) -> None:
+        super().__init__(
+            f"N+1 query: '{relationship}' was lazy loaded {count} times in"
+            f" '{endpoint or '<no request>'}'. Load it with selectinload() or"
+            f" joinedload() instead. Statement: {statement}"
+        )
+        self.relationship = relationship
+        self.count = count
+        self.endpoint = endpoint
+        self.statement = statement
+
+
+class _RequestCounts:
+    """Statement counts for the current app context.
+
+    :meta private:
+    """
+
+    __slots__ = ("counts", "flagged")
+
+    def __init__(self) -> None:
+        self.counts: dict[str, int] = {}
+        self.flagged: set[str] = set()
+
+
+def _listen(
+    session: sa_orm.scoped_session[Session], engines: t.Iterable[sa.engine.Engine]
+) -> None:
+    sa_event.listen(session, "do_orm_execute", _mark_lazy_load)
+
+    for engine in engines:
+        sa_event.listen(engine, "before_cursor_execute", _count_statement)
+
+
+def _mark_lazy_load(state: sa_orm.ORMExecuteState) -> None:
+    # Eager loads run once per query, only lazy loads run once per parent object.
+    if not state.is_relationship_load or state.lazy_loaded_from is None:
+        return
+
+    path = state.loader_strategy_path
+
+    if path is not None and len(path):
+        state.update_execution_options(**{_LAZY_LOAD_OPTION: str(path[-1])})
+
+
+def _current_counts() -> _RequestCounts | None:
+    """Get the counts for this app context, deciding whether to sample it the first
+    time.
+
+    :meta private:
+    """
+    counts = g.get("_sqlalchemy_n_plus_one", ...)
+
+    if counts is ...:
+        if random.random() < current_app.config["SQLALCHEMY_N_PLUS_ONE_SAMPLE"]:
+            counts = _RequestCounts()
+        else:
+            counts = None
+
+        g._sqlalchemy_n_plus_one = counts
+
+    return counts  # type: ignore[no-any-return]
+
+
+def _count_statement(
+    conn: t.Any,
+    cursor: t.Any,
+    statement: str,
+    parameters: t.Any,
+    context: t.Any,
+    executemany: bool,
+) -> None:
+    if context is None or not has_app_context():
+        return
+
+    relationship = context.execution_options.get(_LAZY_LOAD_OPTION)
+
+    if relationship is None:
+        return
+
+    counts = _current_counts()
+
+    if counts is None:
+        return
+
+    key = fingerprint(statement)
+    count = counts.counts[key] = counts.counts.get(key, 0) + 1
+
+    if count <= current_app.config["SQLALCHEMY_N_PLUS_ONE_THRESHOLD"]:
+        return
+
+    if key in counts.flagged:
+        return
+
+    counts.flagged.add(key)
+    endpoint = request.endpoint if has_request_context() else None
+
+    if current_app.config["SQLALCHEMY_N_PLUS_ONE"] == "raise":
+        raise NPlusOneError(relationship, count, endpoint, key)
+
+    logger.warning(
+        "N+1 query: '%s' was lazy loaded %d times in '%s'%s. Statement: %s",
+        relationship,
+        count,
+        endpoint or "<no request>",
+        f" ({request.method} {request.path})" if has_request_context() else "",
+        key,
+    )
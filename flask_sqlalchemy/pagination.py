@@ -1,11 +1,20 @@
 from __future__ import annotations
 
+import base64
+import datetime
+import decimal
+import hashlib
+import hmac
+import json
 import typing as t
+import uuid
 from math import ceil
 
 import sqlalchemy as sa
 import sqlalchemy.orm as sa_orm
 from flask import abort
+from flask import current_app
+from flask import has_app_context
 from flask import request
 
 
@@ -362,3 +371,454 @@ class QueryPagination(Pagination):
         # Query.count automatically disables eager loads
         out = self._query_args["query"].order_by(None).count()
         return out  # type: ignore[no-any-return]
+
+
+class KeysetPagination(Pagination):
+    """Select the items after (or before) a cursor by comparing the ordering columns,
+    instead of applying an offset.
+
+    With an offset, the database has to read and discard every row before the
+    current page, so deep pages get slower and slower. A keyset page is found through
+    the index on the ordering columns no matter how deep it is. ``per_page + 1`` rows
+    are fetched to find out if there is another page, so no count query is needed.
+
+    Don't create pagination objects manually. They are created by
+    :meth:`.SQLAlchemy.paginate` and :meth:`.Query.paginate` when ``keyset`` is given.
+
+    The ``keyset`` columns must uniquely order the rows, for example
+    ``(Post.created, Post.id)``. Use ``.desc()`` to order a column in descending order,
+    ``(Post.created.desc(), Post.id.desc())`` lists the newest first. Each column must
+    be a mapped attribute of the selected model. Its values are stored in the cursor
+    as JSON. Dates, times, decimals and UUIDs are stored as strings and converted back
+    according to the column's type. A cursor value that doesn't match its column's
+    type makes the cursor invalid.
+
+    Pages are not numbered, :attr:`page` is always ``None``. Use :attr:`next_cursor`
+    and :attr:`prev_cursor` to link to other pages.
+
+    :param cursor: An opaque cursor from :attr:`next_cursor` or :attr:`prev_cursor`.
+        Defaults to the ``cursor`` query arg during a request. The first page is
+        returned if it is ``None``.
+    :param per_page: The maximum number of items on a page. Defaults to the
+        ``per_page`` query arg during a request, or 20 otherwise.
+    :param max_per_page: The maximum allowed value for ``per_page``, to limit a
+        user-provided value. Use ``None`` for no limit. Defaults to 100.
+    :param error_out: Abort with a ``404 Not Found`` error if the cursor is invalid, if
+        no items are returned for a cursor, or if ``per_page`` is not a positive int.
+    :param count: Calculate the total number of values by issuing an extra count query.
+        The count is only run for the first page, the total is stored in the cursors
+        and reused for the following pages. The stored total is signed with the app's
+        :attr:`~flask.Flask.secret_key`. Without a secret key, or if the signature
+        doesn't match, the following pages count again.
+    :param kwargs: Information about the query to paginate. Different subclasses will
+        require different arguments, and all require ``keyset``.
+
+    .. versionadded:: 3.2
+    """
+
+    def __init__(
+        self,
+        cursor: str | None = None,
+        per_page: int | None = None,
+        max_per_page: int | None = 100,
+        error_out: bool = True,
+        count: bool = True,
+        **kwargs: t.Any,
+    ) -> None:
+        self._query_args = kwargs
+        _, per_page = self._prepare_page_args(
+            page=1,
+            per_page=per_page,
+            max_per_page=max_per_page,
+            error_out=error_out,
+        )
+
+        if cursor is None and request:
+            cursor = request.args.get("cursor") or None
+
+        self.cursor: str | None = cursor
+        """The cursor this page was queried with, or ``None`` for the first page."""
+
+        self.page: int | None = None  # type: ignore[assignment]
+        """Always ``None``, keyset pages are not numbered."""
+
+        self.per_page: int = per_page
+        """The maximum number of items on a page."""
+
+        self.max_per_page: int | None = max_per_page
+        """The maximum allowed value for ``per_page``."""
+
+        self._key_values, self._backwards, total = self._decode_cursor(
+            cursor, error_out
+        )
+        rows = self._query_items()
+        more = len(rows) > per_page
+        items = rows[:per_page]
+
+        if self._backwards:
+            items.reverse()
+
+        if not items and self._key_values is not None and error_out:
+            abort(404)
+
+        self.items: list[t.Any] = items
+        """The items on the current page. Iterating over the pagination object is
+        equivalent to iterating over the items.
+        """
+
+        # Going forward, a cursor means there was at least one item before it. Going
+        # backward, the cursor came from the page after this one.
+        if self._backwards:
+            self._has_prev = more
+            self._has_next = True
+        else:
+            self._has_prev = self._key_values is not None
+            self._has_next = more
+
+        if total is None and count:
+            total = self._query_count()
+
+        self.total: int | None = total
+        """The total number of items across all pages. It is only counted on the
+        first page and carried along in the cursors.
+        """
+
+    @staticmethod
+    def _keyset_columns(
+        keyset: t.Sequence[t.Any],
+    ) -> list[tuple[sa.ColumnElement[t.Any], bool]]:
+        """Split the ``keyset`` expressions into ``(column, descending)`` pairs.
+
+        :meta private:
+        """
+        out = []
+
+        for key in keyset:
+            if isinstance(key, sa.UnaryExpression) and key.modifier in (
+                sa.sql.operators.desc_op,
+                sa.sql.operators.asc_op,
+            ):
+                out.append((key.element, key.modifier is sa.sql.operators.desc_op))
+            else:
+                out.append((key, False))
+
+        return out
+
+    def _keyset_clauses(
+        self,
+    ) -> tuple[sa.ColumnElement[bool] | None, list[sa.ColumnElement[t.Any]]]:
+        """Build the condition that selects rows past the cursor, and the order to
+        select them in. Both are reversed when going backward.
+
+        The condition is expanded to ``a > :a OR (a = :a AND b > :b)`` rather than using
+        a row value comparison, so that the columns can be ordered in different
+        directions and it works on every database.
+
+        :meta private:
+        """
+        columns = self._keyset_columns(self._query_args["keyset"])
+        order_by = []
+
+        for column, descending in columns:
+            if descending != self._backwards:
+                order_by.append(column.desc())
+            else:
+                order_by.append(column.asc())
+
+        if self._key_values is None:
+            return None, order_by
+
+        alternatives = []
+
+        for i, (column, descending) in enumerate(columns):
+            value = self._key_values[i]
+            after = column < value if descending != self._backwards else column > value
+            equal = [c == v for (c, _), v in zip(columns[:i], self._key_values)]
+            alternatives.append(sa.and_(*equal, after))
+
+        return sa.or_(*alternatives), order_by
+
+    def _encode_cursor(self, item: t.Any, backwards: bool) -> str:
+        """Create a cursor pointing at ``item``.
+
+        :meta private:
+        """
+        columns = self._keyset_columns(self._query_args["keyset"])
+        data: dict[str, t.Any] = {
+            "k": [_encode_key_value(getattr(item, column.key)) for column, _ in columns]
+        }
+
+        if backwards:
+            data["b"] = 1
+
+        if self.total is not None:
+            signature = _sign_cursor(data, self.total)
+
+            if signature is not None:
+                data["t"] = self.total
+                data["s"] = signature
+
+        raw = json.dumps(data, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+    def _decode_cursor(
+        self, cursor: str | None, error_out: bool
+    ) -> tuple[list[t.Any] | None, bool, int | None]:
+        """Get the key values, direction, and stored total from a cursor. Each value is
+        checked against and converted to its column's type. A stored total without a
+        valid signature is dropped.
+
+        :meta private:
+        """
+        if cursor is None:
+            return None, False, None
+
+        columns = self._keyset_columns(self._query_args["keyset"])
+
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            data = json.loads(raw)
+            values = data["k"]
+
+            if not isinstance(values, list) or len(values) != len(columns):
+                raise ValueError
+
+            values = [
+                _decode_key_value(column, value)
+                for (column, _), value in zip(columns, values)
+            ]
+        except (ValueError, TypeError, KeyError, AttributeError):
+            if error_out:
+                abort(404)
+
+            return None, False, None
+
+        total = data.get("t")
+        signature = data.get("s")
+
+        if (
+            not isinstance(total, int)
+            or isinstance(total, bool)
+            or not isinstance(signature, str)
+            or not hmac.compare_digest(signature, _sign_cursor(data, total) or "")
+        ):
+            total = None
+
+        return values, bool(data.get("b")), total
+
+    @property
+    def next_cursor(self) -> str | None:
+        """The cursor for the next page, or ``None`` if this is the last page."""
+        if not self.has_next or not self.items:
+            return None
+
+        return self._encode_cursor(self.items[-1], backwards=False)
+
+    @property
+    def prev_cursor(self) -> str | None:
+        """The cursor for the previous page, or ``None`` if this is the first page."""
+        if not self.has_prev or not self.items:
+            return None
+
+        return self._encode_cursor(self.items[0], backwards=True)
+
+    @property
+    def first(self) -> int:
+        """Not known for keyset pages, always ``0``."""
+        return 0
+
+    @property
+    def last(self) -> int:
+        """Not known for keyset pages, always ``0``."""
+        return 0
+
+    @property
+    def has_prev(self) -> bool:
+        """``True`` if there may be items before this page."""
+        return self._has_prev
+
+    @property
+    def prev_num(self) -> int | None:
+        """Always ``None``, keyset pages are not numbered."""
+        return None
+
+    def prev(self, *, error_out: bool = False) -> KeysetPagination:
+        """Query the :class:`KeysetPagination` object for the previous page.
+
+        :param error_out: Abort with a ``404 Not Found`` error if no items are returned.
+        """
+        return type(self)(
+            cursor=self.prev_cursor,
+            per_page=self.per_page,
+            max_per_page=self.max_per_page,
+            error_out=error_out,
+            count=self.total is not None,
+            **self._query_args,
+        )
+
+    @property
+    def has_next(self) -> bool:
+        """``True`` if there are items after this page."""
+        return self._has_next
+
+    @property
+    def next_num(self) -> int | None:
+        """Always ``None``, keyset pages are not numbered."""
+        return None
+
+    def next(self, *, error_out: bool = False) -> KeysetPagination:
+        """Query the :class:`KeysetPagination` object for the next page.
+
+        :param error_out: Abort with a ``404 Not Found`` error if no items are returned.
+        """
+        return type(self)(
+            cursor=self.next_cursor,
+            per_page=self.per_page,
+            max_per_page=self.max_per_page,
+            error_out=error_out,
+            count=self.total is not None,
+            **self._query_args,
+        )
+
+    def iter_pages(self, **kwargs: t.Any) -> t.Iterator[int | None]:
+        """Keyset pages are not numbered, this yields nothing."""
+        return iter(())
+
+
+class SelectKeysetPagination(KeysetPagination, SelectPagination):
+    """Returned by :meth:`.SQLAlchemy.paginate` when ``keyset`` is given. Takes
+    ``select``, ``session``, and ``keyset`` arguments in addition to the
+    :class:`KeysetPagination` arguments.
+
+    .. versionadded:: 3.2
+    """
+
+    def _query_items(self) -> list[t.Any]:
+        condition, order_by = self._keyset_clauses()
+        select = self._query_args["select"].order_by(None).order_by(*order_by)
+
+        if condition is not None:
+            select = select.where(condition)
+
+        session = self._query_args["session"]
+        select = select.limit(self.per_page + 1)
+        return list(session.execute(select).unique().scalars())
+
+
+class QueryKeysetPagination(KeysetPagination, QueryPagination):
+    """Returned by :meth:`.Query.paginate` when ``keyset`` is given. Takes ``query``
+    and ``keyset`` arguments in addition to the :class:`KeysetPagination` arguments.
+
+    .. versionadded:: 3.2
+    """
+
+    def _query_items(self) -> list[t.Any]:
+        condition, order_by = self._keyset_clauses()
+        query = self._query_args["query"].order_by(None).order_by(*order_by)
+
+        if condition is not None:
+            query = query.filter(condition)
+
+        out = query.limit(self.per_page + 1).all()
+        return out  # type: ignore[no-any-return]
+
+
+def _sign_cursor(data: dict[str, t.Any], total: int) -> str | None:
+    """Sign the total stored in a cursor together with the cursor's position, using
+    the app's secret key. Returns ``None`` if there is no secret key.
+
+    :meta private:
+    """
+    key = current_app.secret_key if has_app_context() else None
+
+    if not key:
+        return None
+
+    if isinstance(key, str):
+        key = key.encode()
+
+    message = json.dumps(
+        ["flask_sqlalchemy.cursor", data["k"], data.get("b", 0), total],
+        separators=(",", ":"),
+    )
+    return hmac.new(key, message.encode(), hashlib.sha256).hexdigest()
+
+
+def _encode_key_value(value: t.Any) -> t.Any:
+    """Convert a keyset column value to something JSON can store.
+
+    :meta private:
+    """
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+
+    return value
+
+
+def _decode_key_value(column: t.Any, value: t.Any) -> t.Any:
+    """Check a value from a cursor against the column's type and convert it back.
+    Raises ``ValueError`` or ``TypeError`` if it doesn't match.
+
+    :meta private:
+    """
+    if value is None:
+        return None
+
+    type_ = getattr(column, "type", None)
+
+    if isinstance(type_, (sa.DateTime, sa.Date, sa.Time)):
+        if not isinstance(value, str):
+            raise TypeError
+
+        if isinstance(type_, sa.DateTime):
+            return datetime.datetime.fromisoformat(value)
+
+        if isinstance(type_, sa.Date):
+            return datetime.date.fromisoformat(value)
+
+        return datetime.time.fromisoformat(value)
+
+    if isinstance(type_, sa.Uuid):
+        if not isinstance(value, str):
+            raise TypeError
+
+        out = uuid.UUID(value)
+        return out if type_.as_uuid else str(out)
+
+    if isinstance(type_, sa.Boolean):
+        if not isinstance(value, bool):
+            raise TypeError
+
+        return value
+
+    if isinstance(type_, sa.Integer):
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise TypeError
+
+        return value
+
+    if isinstance(type_, sa.Numeric):
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise TypeError
+
+        number = decimal.Decimal(str(value))
+
+        if not number.is_finite():
+            raise ValueError
+
+        return number if type_.asdecimal else float(number)
+
+    if isinstance(type_, sa.String):
+        if not isinstance(value, str):
+            raise TypeError
+
+        return value
+
+    # Other types only accept plain JSON scalars, never lists or objects.
+    if not isinstance(value, (str, int, float, bool)):
+        raise TypeError
+
+    return value
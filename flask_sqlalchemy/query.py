@@ -7,7 +7,9 @@ import sqlalchemy.orm as sa_orm
 from flask import abort
 
 from .pagination import Pagination
+from .pagination import QueryKeysetPagination
 from .pagination import QueryPagination
+from .query_cache import CacheOptions
 
 
 class Query(sa_orm.Query):  # type: ignore[type-arg]
@@ -60,6 +62,26 @@ class Query(sa_orm.Query):  # type: ignore[type-arg]
         except (sa_exc.NoResultFound, sa_exc.MultipleResultsFound):
             abort(404, description=description)
 
+    def cache(self, ttl: float | None = None, tags: t.Iterable[str] = ()) -> Query:
+        """Serve the results of this query from :attr:`.SQLAlchemy.query_cache`. The
+        cached rows are invalidated when a session commits a change to one of the
+        tables the query read from, or to one of ``tags``.
+
+        .. code-block:: python
+
+            bill = Bill.query.cache(ttl=30).get(bill_id)
+
+        :param ttl: Seconds to keep the result. Defaults to
+            :data:`.SQLALCHEMY_QUERY_CACHE_TTL`.
+        :param tags: Extra tags that invalidate the result, for use with
+            :meth:`.QueryCache.invalidate`.
+
+        .. versionadded:: 3.2
+        """
+        return self.execution_options(  # type: ignore[no-any-return]
+            cache=CacheOptions(ttl, tuple(tags))
+        )
+
     def paginate(
         self,
         *,
@@ -68,6 +90,8 @@ class Query(sa_orm.Query):  # type: ignore[type-arg]
         max_per_page: int | None = None,
         error_out: bool = True,
         count: bool = True,
+        keyset: t.Sequence[t.Any] | None = None,
+        cursor: str | None = None,
     ) -> Pagination:
         """Apply an offset and limit to the query based on the current page and number
         of items per page, returning a :class:`.Pagination` object.
@@ -85,6 +109,15 @@ class Query(sa_orm.Query):  # type: ignore[type-arg]
         :param count: Calculate the total number of values by issuing an extra count
             query. For very complex queries this may be inaccurate or slow, so it can be
             disabled and set manually if necessary.
+        :param keyset: Paginate by comparing these ordering columns with a cursor
+            instead of using an offset, returning a :class:`.KeysetPagination` object.
+            The columns must uniquely order the rows, like
+            ``(Post.created.desc(), Post.id.desc())``. ``page`` is ignored.
+        :param cursor: The cursor to start after when using ``keyset``. Defaults to the
+            ``cursor`` query arg during a request.
+
+        .. versionchanged:: 3.2
+            Added the ``keyset`` and ``cursor`` parameters.
 
         .. versionchanged:: 3.0
             All parameters are keyword-only.
@@ -95,6 +128,17 @@ class Query(sa_orm.Query):  # type: ignore[type-arg]
         .. versionchanged:: 3.0
             ``max_per_page`` defaults to 100.
         """
+        if keyset is not None:
+            return QueryKeysetPagination(
+                query=self,
+                keyset=tuple(keyset),
+                cursor=cursor,
+                per_page=per_page,
+                max_per_page=max_per_page,
+                error_out=error_out,
+                count=count,
+            )
+
         return QueryPagination(
             query=self,
             page=page,
@@ -0,0 +1,589 @@
+from __future__ import annotations
+
+import contextvars
+import dataclasses
+import fcntl
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+import typing as t
+import zlib
+from collections import OrderedDict
+
+import sqlalchemy as sa
+import sqlalchemy.event as sa_event
+import sqlalchemy.orm as sa_orm
+from flask import current_app
+from flask import has_app_context
+from sqlalchemy.orm.loading import merge_frozen_result
+from sqlalchemy.sql.util import find_tables
+
+if t.TYPE_CHECKING:
+    from .session import Session
+
+
+@dataclasses.dataclass(frozen=True)
+class CacheOptions:
+    """How to cache the result of one statement. Created by :meth:`.Query.cache` or
+    the ``cache`` argument to :meth:`.Session.execute`.
+
+    :param ttl: Seconds to keep the result. Defaults to
+        :data:`.SQLALCHEMY_QUERY_CACHE_TTL`.
+    :param tags: Extra tags that invalidate the result. The names of the tables the
+        statement and its relationship loads read from are always added.
+
+    .. versionadded:: 3.2
+    """
+
+    ttl: float | None = None
+    tags: tuple[str, ...] = ()
+
+    @classmethod
+    def coerce(cls, value: t.Any) -> CacheOptions | None:
+        """Convert the value of the ``cache`` execution option. ``True`` uses the
+        defaults, a dict is passed as keyword arguments.
+
+        :meta private:
+        """
+        if value is None or value is False:
+            return None
+
+        if value is True:
+            return cls()
+
+        if isinstance(value, cls):
+            return value
+
+        if isinstance(value, dict):
+            return cls(ttl=value.get("ttl"), tags=tuple(value.get("tags", ())))
+
+        raise TypeError(f"Invalid 'cache' execution option: {value!r}")
+
+
+class MemoryCacheBackend:
+    """Keep results in an LRU dict in this process. Invalidating a tag only affects
+    this process, so with several worker processes the other workers keep their
+    copy until its TTL expires. Use :class:`MmapCacheBackend` to share results and
+    invalidations between processes.
+
+    :param max_entries: How many results to keep.
+
+    .. versionadded:: 3.2
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, dict[str, int], t.Any]]
+        self._entries = OrderedDict()
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def versions(self, tags: t.Iterable[str]) -> dict[str, int]:
+        return {tag: self._versions.get(tag, 0) for tag in tags}
+
+    def get(self, key: str) -> t.Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return None
+
+            expires, versions, value = entry
+
+            if expires <= time.monotonic() or any(
+                self._versions.get(tag, 0) != version
+                for tag, version in versions.items()
+            ):
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: t.Any, ttl: float, versions: dict[str, int]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, versions, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tags: t.Iterable[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class MmapCacheBackend:
+    """Keep pickled results in a memory mapped file shared by every process on the
+    host, such as the workers of a pre-fork server. Tag versions live in the same
+    file, so a commit in one worker invalidates the result for all of them.
+
+    The file is a fixed number of slots of a fixed size. A key always maps to the same
+    slot and replaces whatever was there, and results that do not fit in a slot are
+    not cached. Tags are also hashed into a fixed number of counters. A collision only
+    invalidates more than needed.
+
+    The layout is part of the file name, ``{path}.{slots}x{slot_size}.{tag_slots}``,
+    so a backend with other sizes, such as a new release during a rolling deploy,
+    uses a new file instead of resizing one that running workers still map.
+
+    Results are unpickled, so anyone who can write the file can run code in every
+    worker. The file is created with mode ``0600``, and is refused if it is a
+    symlink, is owned by another user, or is accessible by group or others. Keep
+    it in a directory only the app's user can write to.
+
+    :param path: The file to map, without the layout suffix. It is created if
+        needed.
+    :param slots: How many results to keep.
+    :param slot_size: The size of each slot in bytes, including a 256 byte header.
+    :param tag_slots: How many tag version counters to keep.
+
+    .. versionadded:: 3.2
+    """
+
+    _header = struct.Struct("<16sdIH")
+    _tag = struct.Struct("<IQ")
+    _counter = struct.Struct("<Q")
+    _header_size = 256
+    _max_tags = (_header_size - _header.size) // _tag.size
+
+    def __init__(
+        self,
+        path: str,
+        slots: int = 1024,
+        slot_size: int = 64 * 1024,
+        tag_slots: int = 1024,
+    ) -> None:
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self.tag_slots = tag_slots
+        self._size = tag_slots * self._counter.size + slots * slot_size
+        #: The file that is actually mapped, ``path`` with the layout appended.
+        self.file_path = f"{path}.{slots}x{slot_size}.{tag_slots}"
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+        self._fd = -1
+        self._map: mmap.mmap | None = None
+
+        fd = _open_private(self.file_path, create=True)
+
+        try:
+            # A new file is grown once from empty. Nothing maps it before that,
+            # since every process takes the lock to check the size first.
+            fcntl.flock(fd, fcntl.LOCK_EX)
+
+            try:
+                size = os.fstat(fd).st_size
+
+                if size == 0:
+                    os.ftruncate(fd, self._size)
+                elif size != self._size:
+                    raise RuntimeError(
+                        f"Query cache file '{self.file_path}' is {size} bytes,"
+                        f" expected {self._size}."
+                    )
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def _open(self) -> tuple[int, mmap.mmap]:
+        # flock belongs to the open file description, reopen after a fork.
+        pid = os.getpid()
+
+        if self._pid != pid or self._map is None:
+            self._fd = _open_private(self.file_path)
+            self._map = mmap.mmap(self._fd, self._size)
+            self._pid = pid
+
+        return self._fd, self._map
+
+    def _tag_slot(self, tag: str) -> int:
+        return zlib.crc32(tag.encode()) % self.tag_slots
+
+    def _slot_offset(self, digest: bytes) -> int:
+        index = int.from_bytes(digest[:8], "little") % self.slots
+        return self.tag_slots * self._counter.size + index * self.slot_size
+
+    def versions(self, tags: t.Iterable[str]) -> dict[str, int]:
+        _, buf = self._open()
+        return {
+            tag: self._counter.unpack_from(
+                buf, self._tag_slot(tag) * self._counter.size
+            )[0]
+            for tag in tags
+        }
+
+    def get(self, key: str) -> t.Any | None:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        offset = self._slot_offset(digest)
+
+        with self._lock:
+            fd, buf = self._open()
+            fcntl.flock(fd, fcntl.LOCK_SH)
+
+            try:
+                stored, expires, length, count = self._header.unpack_from(buf, offset)
+
+                if stored != digest or expires <= time.time():
+                    return None
+
+                for i in range(count):
+                    slot, version = self._tag.unpack_from(
+                        buf, offset + self._header.size + i * self._tag.size
+                    )
+                    current = self._counter.unpack_from(
+                        buf, slot * self._counter.size
+                    )[0]
+
+                    if current != version:
+                        return None
+
+                start = offset + self._header_size
+                data = buf[start : start + length]
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+        return pickle.loads(data)
+
+    def set(self, key: str, value: t.Any, ttl: float, versions: dict[str, int]) -> None:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        slots = {self._tag_slot(tag): version for tag, version in versions.items()}
+
+        if (
+            len(data) > self.slot_size - self._header_size
+            or len(slots) > self._max_tags
+        ):
+            return
+
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        offset = self._slot_offset(digest)
+
+        with self._lock:
+            fd, buf = self._open()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+
+            try:
+                self._header.pack_into(
+                    buf, offset, digest, time.time() + ttl, len(data), len(slots)
+                )
+
+                for i, (slot, version) in enumerate(slots.items()):
+                    self._tag.pack_into(
+                        buf,
+                        offset + self._header.size + i * self._tag.size,
+                        slot,
+                        version,
+                    )
+
+                start = offset + self._header_size
+                buf[start : start + len(data)] = data
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def invalidate(self, tags: t.Iterable[str]) -> None:
+        with self._lock:
+            fd, buf = self._open()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+
+            try:
+                for slot in {self._tag_slot(tag) for tag in tags}:
+                    offset = slot * self._counter.size
+                    (value,) = self._counter.unpack_from(buf, offset)
+                    self._counter.pack_into(buf, offset, value + 1)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def clear(self) -> None:
+        with self._lock:
+            fd, buf = self._open()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+
+            try:
+                start = self.tag_slots * self._counter.size
+
+                for index in range(self.slots):
+                    self._header.pack_into(
+                        buf, start + index * self.slot_size, b"\0" * 16, 0.0, 0, 0
+                    )
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def _open_private(path: str, create: bool = False) -> int:
+    """Open a file that only the current user can have written to.
+
+    :meta private:
+    """
+    flags = os.O_RDWR | os.O_NOFOLLOW | os.O_CLOEXEC
+
+    if create:
+        flags |= os.O_CREAT
+
+    fd = os.open(path, flags, 0o600)
+    st = os.fstat(fd)
+
+    if st.st_uid != os.getuid() or st.st_mode & 0o077:
+        os.close(fd)
+        raise PermissionError(
+            f"Refusing to use '{path}', it must be owned by the current user and"
+            " not be accessible by group or others."
+        )
+
+    return fd
+
+
+class _Fill:
+    """Collects the tags, and their versions before reading, for a result that is
+    being loaded from the database.
+
+    :meta private:
+    """
+
+    def __init__(self, backend: t.Any, tags: t.Iterable[str]) -> None:
+        self.backend = backend
+        self.versions: dict[str, int] = backend.versions(tags)
+
+    def add(self, tags: t.Iterable[str]) -> None:
+        new = [tag for tag in tags if tag not in self.versions]
+
+        if new:
+            self.versions.update(self.backend.versions(new))
+
+
+_filling: contextvars.ContextVar[_Fill | None] = contextvars.ContextVar(
+    "flask_sqlalchemy_query_cache_fill", default=None
+)
+
+
+class QueryCache:
+    """Cache the results of statements that opt in with :meth:`.Query.cache`, the
+    ``cache`` argument to :meth:`.Session.execute`, or the ``cache`` execution option.
+    Available as :attr:`.SQLAlchemy.query_cache` for the current app.
+
+    Results are tagged with the names of the tables they were read from. When a
+    session commits, the tables it inserted into, updated or deleted from, whether
+    through the unit of work or with ``insert()``, ``update()`` or ``delete()``
+    statements, are invalidated. A result read while another session commits a change
+    to one of its tables is never served, since tag versions are taken before reading.
+
+    A session that has pending or uncommitted changes bypasses the cache, so it always
+    reads its own writes.
+
+    When several threads miss on the same statement at once, only one queries the
+    database and the others wait for its result. This is per process.
+
+    :param backend: Where results are stored. :class:`MemoryCacheBackend` or
+        :class:`MmapCacheBackend`, or any object with the same methods.
+    :param ttl: Seconds to keep results that don't set their own TTL.
+    :param lock_timeout: Seconds to wait for another thread loading the same result
+        before querying anyway.
+
+    .. versionadded:: 3.2
+    """
+
+    def __init__(
+        self, backend: t.Any, ttl: float = 60, lock_timeout: float = 5
+    ) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.hits = 0
+        self.misses = 0
+        self._inflight: dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, *tags: str) -> None:
+        """Drop every result tagged with one of these tags. Call this after changing
+        tables outside of a session, for example with ``engine.begin()``.
+        """
+        if tags:
+            self.backend.invalidate(tags)
+
+    def clear(self) -> None:
+        """Drop every cached result."""
+        self.backend.clear()
+
+    def get_or_load(
+        self,
+        key: str,
+        tags: t.Iterable[str],
+        ttl: float | None,
+        load: t.Callable[[], t.Any],
+    ) -> t.Any:
+        """Return the cached value for ``key``, or call ``load`` once to get it.
+
+        While ``load`` runs, :func:`_filling` refers to the pending entry, so more tags
+        can be added to it.
+
+        :meta private:
+        """
+        value = self.backend.get(key)
+
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+
+        with self._lock:
+            event = self._inflight.get(key)
+            leader = event is None
+
+            if leader:
+                event = self._inflight[key] = threading.Event()
+
+        if not leader:
+            event.wait(self.lock_timeout)  # type: ignore[union-attr]
+            value = self.backend.get(key)
+
+            if value is not None:
+                return value
+
+            return load()
+
+        try:
+            fill = _Fill(self.backend, tags)
+            token = _filling.set(fill)
+
+            try:
+                value = load()
+            finally:
+                _filling.reset(token)
+
+            self.backend.set(
+                key, value, self.ttl if ttl is None else ttl, fill.versions
+            )
+            return value
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+            event.set()  # type: ignore[union-attr]
+
+
+def _statement_tables(
+    statement: t.Any, mappers: t.Iterable[sa_orm.Mapper[t.Any]]
+) -> set[str]:
+    """The names of the tables a statement reads from.
+
+    :meta private:
+    """
+    names = {table.name for mapper in mappers for table in mapper.tables}
+    names.update(
+        table.name
+        for table in find_tables(statement, include_joins=True, include_aliases=True)
+        if isinstance(table, sa.Table)
+    )
+    return names
+
+
+def _listen(session: sa_orm.scoped_session[Session]) -> None:
+    sa_event.listen(session, "do_orm_execute", _do_orm_execute)
+    sa_event.listen(session, "before_flush", _record_tables)
+    sa_event.listen(session, "after_commit", _after_commit)
+    sa_event.listen(session, "after_rollback", _after_rollback)
+
+
+def _current_cache(session: Session) -> QueryCache | None:
+    if not has_app_context():
+        return None
+
+    db = getattr(session, "_db", None)
+
+    if db is None:
+        return None
+
+    app = current_app._get_current_object()  # type: ignore[attr-defined]
+    return db._app_query_caches.get(app)  # type: ignore[no-any-return]
+
+
+def _do_orm_execute(state: sa_orm.ORMExecuteState) -> t.Any:
+    session: Session = state.session  # type: ignore[assignment]
+
+    if state.is_insert or state.is_update or state.is_delete:
+        table = getattr(state.statement, "table", None)
+
+        if isinstance(table, sa.Table):
+            session._cache_invalidations.add(table.name)
+
+        return None
+
+    if not state.is_select:
+        return None
+
+    fill = _filling.get()
+
+    if state.is_relationship_load:
+        # Eager loads run inside the load of a cached result, tag it with their
+        # tables too, and read them from the same place.
+        if fill is not None:
+            fill.add(_statement_tables(state.statement, state.all_mappers))
+            state.bind_arguments["primary"] = True
+
+        return None
+
+    options = CacheOptions.coerce(state.execution_options.get("cache"))
+
+    if options is None:
+        return None
+
+    cache = _current_cache(session)
+
+    if cache is None:
+        return None
+
+    # Read your own writes.
+    if session._cache_invalidations or session.new or session.dirty or session.deleted:
+        return None
+
+    statement = state.statement
+    cache_key = statement._generate_cache_key()
+
+    if cache_key is None:
+        return None
+
+    key = cache_key.to_offline_string(
+        session._db._query_cache_strings, statement, state.parameters or {}
+    )
+    tags = set(options.tags)
+    tags.update(_statement_tables(statement, state.all_mappers))
+
+    def load() -> t.Any:
+        # A replica could still be behind the commit that invalidated the result.
+        state.bind_arguments["primary"] = True
+        return state.invoke_statement().freeze()
+
+    frozen = cache.get_or_load(key, tags, options.ttl, load)
+    return merge_frozen_result(session, statement, frozen, load=False)()
+
+
+def _record_tables(session: Session, flush_context: t.Any, instances: t.Any) -> None:
+    for targets in (session.new, session.dirty, session.deleted):
+        for target in targets:
+            mapper = sa.inspect(target).mapper
+            session._cache_invalidations.update(table.name for table in mapper.tables)
+
+
+def _after_commit(session: Session) -> None:
+    if session._cache_invalidations:
+        cache = _current_cache(session)
+
+        if cache is not None:
+            cache.invalidate(*session._cache_invalidations)
+
+        session._cache_invalidations.clear()
+
+
+def _after_rollback(session: Session) -> None:
+    session._cache_invalidations.clear()
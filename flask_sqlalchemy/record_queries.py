@@ -1,7 +1,16 @@
 from __future__ import annotations
 
+import atexit
 import dataclasses
+import heapq
 import inspect
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import time
 import typing as t
 from time import perf_counter
 
@@ -46,6 +55,22 @@ def get_recorded_queries() -> list[_QueryInfo]:
     return g.get("_sqlalchemy_queries", [])  # type: ignore[no-any-return]
 
 
+def get_query_stats() -> QueryStats | None:
+    """Get the aggregated query statistics of the current application in this
+    process. Statistics are collected if the config :data:`.SQLALCHEMY_RECORD_QUERIES`
+    is ``"aggregate"``, otherwise this returns ``None``.
+
+    Call :meth:`QueryStats.snapshot` on the result to read them. To combine the
+    statistics of every worker process, set :data:`.SQLALCHEMY_RECORD_QUERIES_DIR`
+    and use :func:`load_query_stats` or the ``flask db queries`` command.
+
+    .. versionadded:: 3.2
+    """
+    db = current_app.extensions["sqlalchemy"]
+    app = current_app._get_current_object()  # type: ignore[attr-defined]
+    return db._app_query_stats.get(app)  # type: ignore[no-any-return]
+
+
 @dataclasses.dataclass
 class _QueryInfo:
     """Information about an executed query. Returned by :func:`get_recorded_queries`.
@@ -71,6 +96,400 @@ class _QueryInfo:
         return self.end_time - self.start_time
 
 
+# Durations are counted in log scale buckets, four per doubling from 10µs. The last
+# bucket, from about 7 minutes, catches everything above.
+_BUCKET_BASE = 1e-5
+_BUCKETS_PER_DOUBLING = 4
+_BUCKETS = 96
+
+
+def _bucket(duration: float) -> int:
+    if duration <= _BUCKET_BASE:
+        return 0
+
+    index = int(math.log2(duration / _BUCKET_BASE) * _BUCKETS_PER_DOUBLING) + 1
+    return min(index, _BUCKETS - 1)
+
+
+def _bucket_upper(index: int) -> float:
+    return _BUCKET_BASE * 2 ** (index / _BUCKETS_PER_DOUBLING)
+
+
+def _percentile(buckets: t.Mapping[int, int], count: int, q: float) -> float:
+    """The upper bound of the bucket that holds the ``q`` quantile."""
+    rank = q * count
+    seen = 0
+
+    for index in sorted(buckets):
+        seen += buckets[index]
+
+        if seen >= rank:
+            return _bucket_upper(index)
+
+    return 0.0
+
+
+_fingerprint_subs = [
+    # String and number literals, and each driver's placeholder style.
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"%\(\w+\)s|%s|:\w+|\$\d+"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    # Expanded IN lists and multi-row VALUES, whatever their length.
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(...)"),
+    (re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+"), "(...)"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def fingerprint(statement: str) -> str:
+    """Normalize a SQL statement so that executions that only differ by their values
+    are counted together.
+
+    .. versionadded:: 3.2
+    """
+    for pattern, replacement in _fingerprint_subs:
+        statement = pattern.sub(replacement, statement)
+
+    return statement.strip()
+
+
+def _find_location(import_name: str) -> str:
+    """Describe the innermost frame in the application's code.
+
+    :meta private:
+    """
+    import_top = import_name.partition(".")[0]
+    import_dot = f"{import_top}."
+    frame = inspect.currentframe()
+
+    while frame:
+        name = frame.f_globals.get("__name__")
+
+        if name and (name == import_top or name.startswith(import_dot)):
+            code = frame.f_code
+            return f"{code.co_filename}:{frame.f_lineno} ({code.co_name})"
+
+        frame = frame.f_back
+
+    return "<unknown>"
+
+
+class _FingerprintStats:
+    """Counters for one fingerprint.
+
+    :meta private:
+    """
+
+    __slots__ = ("count", "total", "max", "error", "buckets", "locations")
+
+    def __init__(self, error: float = 0.0) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.error = error
+        self.buckets: dict[int, int] = {}
+        self.locations: dict[str, int] = {}
+
+    @property
+    def weight(self) -> float:
+        return self.total + self.error
+
+
+class QueryStats:
+    """Aggregate statistics about every query executed by an application's engines,
+    cheap enough to leave on in production. Enabled by setting
+    :data:`.SQLALCHEMY_RECORD_QUERIES` to ``"aggregate"``, and returned by
+    :func:`get_query_stats`.
+
+    Each statement is reduced to a :func:`fingerprint`. For each fingerprint, the
+    number of executions, the total and maximum duration, and a histogram of
+    durations are kept. The histogram gives the p50 and p99 to within about 20%.
+    At most ``max_fingerprints`` are kept. When a new one arrives beyond that, the
+    tenth with the least total time is dropped in one pass. A newcomer starts with
+    empty counts, and its ``error`` is the largest total time dropped so far, the
+    most it might have taken before it was tracked. Eviction orders by total plus
+    error, so expensive queries are not pushed out by many cheap ones.
+
+    Walking the stack to find where a query came from is the expensive part, so it
+    is only done for the first execution of each fingerprint and then for one in
+    every ``sample`` executions. Up to five locations are kept for each fingerprint.
+
+    If ``dump_dir`` is set, each process writes its statistics to a JSON file there
+    every ``dump_interval`` seconds, for :func:`load_query_stats` to combine. The
+    file is written by a background thread started in each process, and once more
+    when the process exits, so requests never wait on the disk.
+
+    .. versionadded:: 3.2
+    """
+
+    max_locations = 5
+
+    def __init__(
+        self,
+        import_name: str,
+        max_fingerprints: int = 500,
+        sample: int = 100,
+        dump_dir: str | os.PathLike[str] | None = None,
+        dump_interval: float = 60,
+    ) -> None:
+        self.import_name = import_name
+        self.max_fingerprints = max_fingerprints
+        self.sample = max(sample, 1)
+        self.dump_dir = dump_dir
+        self.dump_interval = dump_interval
+        self.started = time.time()
+        self._stats: dict[str, _FingerprintStats] = {}
+        self._fingerprints: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._dump_lock = threading.Lock()
+        self._dumper_pid: int | None = None
+        self._evicted = 0.0
+
+    def _listen(self, engine: sa.engine.Engine) -> None:
+        # Positional listeners, named=True costs more than recording does.
+        sa_event.listen(engine, "before_cursor_execute", self._record_start)
+        sa_event.listen(engine, "after_cursor_execute", self._record_end)
+
+    # Unlike the per-request mode, also count queries from background threads that
+    # have no app context.
+    def _record_start(
+        self,
+        conn: t.Any,
+        cursor: t.Any,
+        statement: str,
+        parameters: t.Any,
+        context: t.Any,
+        executemany: bool,
+    ) -> None:
+        if context is not None:
+            context._fsa_start_time = perf_counter()
+
+    def _record_end(
+        self,
+        conn: t.Any,
+        cursor: t.Any,
+        statement: str,
+        parameters: t.Any,
+        context: t.Any,
+        executemany: bool,
+    ) -> None:
+        start = getattr(context, "_fsa_start_time", None)
+
+        if start is not None:
+            self.record(statement, perf_counter() - start)
+
+    def record(self, statement: str, duration: float) -> None:
+        """Count one execution of a statement."""
+        key = self._fingerprints.get(statement)
+
+        if key is None:
+            key = fingerprint(statement)
+
+            # Raw statements repeat, but IN lists of every length are different.
+            if len(self._fingerprints) >= self.max_fingerprints * 4:
+                self._fingerprints.clear()
+
+            self._fingerprints[statement] = key
+
+        index = _bucket(duration)
+
+        with self._lock:
+            stats = self._stats.get(key)
+
+            if stats is None:
+                stats = self._stats[key] = self._evict()
+
+            stats.count += 1
+            stats.total += duration
+
+            if duration > stats.max:
+                stats.max = duration
+
+            stats.buckets[index] = stats.buckets.get(index, 0) + 1
+            sampled = stats.count % self.sample == 1 or self.sample == 1
+
+        if sampled:
+            location = _find_location(self.import_name)
+
+            with self._lock:
+                locations = stats.locations
+
+                if location in locations or len(locations) < self.max_locations:
+                    locations[location] = locations.get(location, 0) + 1
+
+        if self.dump_dir is not None and self._dumper_pid != os.getpid():
+            self._start_dumper()
+
+    def _start_dumper(self) -> None:
+        """Start the thread that dumps this process's statistics. Threads don't
+        survive a fork, so each worker starts its own.
+
+        :meta private:
+        """
+        with self._dump_lock:
+            pid = os.getpid()
+
+            if self._dumper_pid == pid:
+                return
+
+            if self._dumper_pid is None:
+                atexit.register(self._dump_at_exit)
+
+            self._dumper_pid = pid
+
+        threading.Thread(
+            target=self._run_dumper, args=(pid,), name="query-stats-dump", daemon=True
+        ).start()
+
+    def _run_dumper(self, pid: int) -> None:
+        while True:
+            time.sleep(self.dump_interval)
+
+            if os.getpid() != pid:
+                return
+
+            try:
+                self.dump()
+            except OSError:
+                pass
+
+    def _dump_at_exit(self) -> None:
+        # Only a process that recorded something has a dumper, don't let a parent
+        # that forked the workers overwrite their files with its empty statistics.
+        if self._dumper_pid == os.getpid():
+            try:
+                self.dump()
+            except OSError:
+                pass
+
+    def _evict(self) -> _FingerprintStats:
+        if len(self._stats) < self.max_fingerprints:
+            return _FingerprintStats(self._evicted)
+
+        # Drop a tenth at once, so finding the cheapest isn't repeated for every new
+        # fingerprint while the lock is held.
+        n = max(len(self._stats) - self.max_fingerprints + 1, self.max_fingerprints // 10)
+        victims = heapq.nsmallest(n, self._stats, key=lambda k: self._stats[k].weight)
+
+        for key in victims:
+            self._evicted = max(self._evicted, self._stats.pop(key).weight)
+
+        return _FingerprintStats(self._evicted)
+
+    def snapshot(self) -> list[dict[str, t.Any]]:
+        """Return the statistics of each fingerprint, most total time first."""
+        with self._lock:
+            rows = [
+                {
+                    "fingerprint": key,
+                    "count": stats.count,
+                    "total": stats.total,
+                    "max": stats.max,
+                    "error": stats.error,
+                    "buckets": dict(stats.buckets),
+                    "locations": dict(stats.locations),
+                }
+                for key, stats in self._stats.items()
+            ]
+
+        return _finish(rows)
+
+    def reset(self) -> None:
+        """Forget all statistics collected so far."""
+        with self._lock:
+            self._stats.clear()
+            self._evicted = 0.0
+            self.started = time.time()
+
+    def dump(self) -> None:
+        """Write this process's statistics to ``dump_dir``."""
+        if self.dump_dir is None:
+            return
+
+        os.makedirs(self.dump_dir, exist_ok=True)
+        data = {
+            "pid": os.getpid(),
+            "started": self.started,
+            "updated": time.time(),
+            "queries": self.snapshot(),
+        }
+        fd, tmp = tempfile.mkstemp(dir=self.dump_dir, suffix=".tmp")
+
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+
+            os.replace(tmp, os.path.join(self.dump_dir, f"queries-{os.getpid()}.json"))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+def _finish(rows: list[dict[str, t.Any]]) -> list[dict[str, t.Any]]:
+    """Add percentiles and sort by total time.
+
+    :meta private:
+    """
+    for row in rows:
+        row["mean"] = row["total"] / row["count"] if row["count"] else 0.0
+        row["p50"] = min(_percentile(row["buckets"], row["count"], 0.5), row["max"])
+        row["p99"] = min(_percentile(row["buckets"], row["count"], 0.99), row["max"])
+
+    rows.sort(key=lambda row: row["total"], reverse=True)
+    return rows
+
+
+def load_query_stats(directory: str | os.PathLike[str]) -> list[dict[str, t.Any]]:
+    """Combine the statistics dumped by every process into ``directory``. The result
+    has the same format as :meth:`QueryStats.snapshot`.
+
+    .. versionadded:: 3.2
+    """
+    merged: dict[str, dict[str, t.Any]] = {}
+
+    try:
+        names = sorted(os.listdir(directory))
+    except FileNotFoundError:
+        return []
+
+    for name in names:
+        if not (name.startswith("queries-") and name.endswith(".json")):
+            continue
+
+        try:
+            with open(os.path.join(directory, name)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+
+        for row in data["queries"]:
+            out = merged.setdefault(
+                row["fingerprint"],
+                {
+                    "fingerprint": row["fingerprint"],
+                    "count": 0,
+                    "total": 0.0,
+                    "max": 0.0,
+                    "error": 0.0,
+                    "buckets": {},
+                    "locations": {},
+                },
+            )
+            out["count"] += row["count"]
+            out["total"] += row["total"]
+            out["max"] = max(out["max"], row["max"])
+            out["error"] += row.get("error", 0.0)
+
+            # JSON turns the integer bucket keys into strings.
+            for index, n in row["buckets"].items():
+                out["buckets"][int(index)] = out["buckets"].get(int(index), 0) + n
+
+            for location, n in row["locations"].items():
+                out["locations"][location] = out["locations"].get(location, 0) + n
+
+    return _finish(list(merged.values()))
+
+
 def _listen(engine: sa.engine.Engine) -> None:
     sa_event.listen(engine, "before_cursor_execute", _record_start, named=True)
     sa_event.listen(engine, "after_cursor_execute", _record_end, named=True)
@@ -90,22 +509,7 @@ def _record_end(context: sa.engine.ExecutionContext, **kwargs: t.Any) -> None:
     if "_sqlalchemy_queries" not in g:
         g._sqlalchemy_queries = []
 
-    import_top = current_app.import_name.partition(".")[0]
-    import_dot = f"{import_top}."
-    frame = inspect.currentframe()
-
-    while frame:
-        name = frame.f_globals.get("__name__")
-
-        if name and (name == import_top or name.startswith(import_dot)):
-            code = frame.f_code
-            location = f"{code.co_filename}:{frame.f_lineno} ({code.co_name})"
-            break
-
-        frame = frame.f_back
-    else:
-        location = "<unknown>"
-
+    location = _find_location(current_app.import_name)
     g._sqlalchemy_queries.append(
         _QueryInfo(
             statement=context.statement,
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import dataclasses
+import logging
+import os
+import random
+import threading
+import time
+import typing as t
+
+import sqlalchemy as sa
+import sqlalchemy.event as sa_event
+import sqlalchemy.exc as sa_exc
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class _ReplicaState:
+    """Health of one replica engine, as seen by the last check.
+
+    :meta private:
+    """
+
+    healthy: bool = False
+    lag: float | None = None
+    checked_at: float | None = None
+
+
+class ReplicaSet:
+    """Read replicas of one primary engine. Used by :meth:`.Session.get_bind` to route
+    plain ``SELECT`` statements away from the primary.
+
+    A replica is only picked if its last health check succeeded and its replication lag
+    was at most ``max_lag`` seconds. Among those, replicas with less lag are preferred.
+    If no replica qualifies, the primary is returned. Replicas start out unhealthy, so
+    reads go to the primary until the first check has run.
+
+    Checks run in a background thread, started on first use in each process, every
+    ``check_interval`` seconds. A replica that raises a disconnect error while serving
+    a query is marked unhealthy immediately, without waiting for the next check.
+
+    Replicas are configured as binds with a ``replica_of`` key in
+    :data:`.SQLALCHEMY_BINDS`. This is created by the extension, there is no need to
+    create it directly.
+
+    :param primary: The engine that writes go to.
+    :param replicas: Engines that replicate from ``primary``.
+    :param max_lag: Replicas further behind than this many seconds are skipped.
+    :param check_interval: Seconds between health checks.
+
+    .. versionadded:: 3.2
+    """
+
+    def __init__(
+        self,
+        primary: sa.engine.Engine,
+        replicas: t.Iterable[sa.engine.Engine],
+        max_lag: float = 5.0,
+        check_interval: float = 5.0,
+    ) -> None:
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._states = {engine: _ReplicaState() for engine in self.replicas}
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+
+        for engine in self.replicas:
+            sa_event.listen(engine, "handle_error", self._on_error)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.primary.url!r} +{len(self.replicas)}>"
+
+    @property
+    def states(self) -> dict[sa.engine.Engine, _ReplicaState]:
+        """The last observed state of each replica."""
+        return self._states
+
+    def choose(self) -> sa.engine.Engine:
+        """Pick a replica to read from, or the primary if no replica is usable."""
+        self._ensure_started()
+        candidates = [
+            (engine, state.lag)
+            for engine, state in self._states.items()
+            if state.healthy and state.lag is not None and state.lag <= self.max_lag
+        ]
+
+        if not candidates:
+            return self.primary
+
+        if len(candidates) == 1:
+            return candidates[0][0]
+
+        engines, lags = zip(*candidates)
+        return random.choices(engines, weights=[1 / (1 + lag) for lag in lags])[0]
+
+    def check(self) -> None:
+        """Check every replica now, updating its health and lag."""
+        for engine, state in self._states.items():
+            try:
+                with engine.connect() as conn:
+                    lag = _measure_lag(conn)
+            except sa_exc.SQLAlchemyError as e:
+                if state.healthy or state.checked_at is None:
+                    logger.warning("Replica %r is unavailable: %s", engine.url, e)
+
+                state.healthy = False
+                state.lag = None
+            else:
+                if lag is None and (state.healthy or state.checked_at is None):
+                    logger.warning("Replica %r is not replicating.", engine.url)
+
+                state.healthy = lag is not None
+                state.lag = lag
+
+            state.checked_at = time.time()
+
+    def _on_error(self, context: sa.engine.ExceptionContext) -> None:
+        if context.is_disconnect and context.engine in self._states:
+            self._states[context.engine].healthy = False
+
+    def _ensure_started(self) -> None:
+        pid = os.getpid()
+
+        if self._pid == pid:
+            return
+
+        with self._lock:
+            if self._pid == pid:
+                return
+
+            # Threads do not survive a fork, start one in each process.
+            self._pid = pid
+            thread = threading.Thread(
+                target=self._run, name="sqlalchemy-replica-check", daemon=True
+            )
+            thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Replica health check failed.")
+
+            time.sleep(self.check_interval)
+
+
+def _measure_lag(conn: sa.engine.Connection) -> float | None:
+    """Return how many seconds the replica is behind its source, ``0`` if it is not a
+    replica at all, or ``None`` if replication is stopped.
+
+    :meta private:
+    """
+    name = conn.dialect.name
+
+    if name in {"mysql", "mariadb"}:
+        try:
+            row = conn.exec_driver_sql("SHOW REPLICA STATUS").mappings().first()
+        except sa_exc.DBAPIError:
+            # MySQL before 8.0.22 and MariaDB before 10.5.1.
+            conn.rollback()
+            row = conn.exec_driver_sql("SHOW SLAVE STATUS").mappings().first()
+
+        if row is None:
+            return 0.0
+
+        if "Seconds_Behind_Source" in row:
+            value = row["Seconds_Behind_Source"]
+        else:
+            value = row["Seconds_Behind_Master"]
+
+        return None if value is None else float(value)
+
+    if name == "postgresql":
+        # An idle primary does not advance the replay timestamp, so only count lag
+        # while there is received WAL left to replay.
+        value = conn.exec_driver_sql(
+            "SELECT CASE WHEN NOT pg_is_in_recovery()"
+            " OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+            " ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+        ).scalar()
+        return None if value is None else float(value)
+
+    conn.exec_driver_sql("SELECT 1")
+    return 0.0
@@ -19,6 +19,16 @@ class Session(sa_orm.Session):
     To customize ``db.session``, subclass this and pass it as the ``class_`` key in the
     ``session_options`` to :class:`.SQLAlchemy`.
 
+    If read replicas are configured for an engine, plain ``SELECT`` statements are
+    sent to one of them instead, until the session first writes to that engine. From
+    then on every statement for that engine goes to the primary, so the session reads
+    its own writes, until the session is closed. For the scoped ``db.session`` that is
+    the end of the app context, usually the end of the request.
+
+    .. versionchanged:: 3.2
+        Route reads to replicas configured with ``replica_of`` in
+        :data:`.SQLALCHEMY_BINDS`.
+
     .. versionchanged:: 3.0
         Renamed from ``SignallingSession``.
     """
@@ -27,6 +37,47 @@ class Session(sa_orm.Session):
         super().__init__(**kwargs)
         self._db = db
         self._model_changes: dict[object, tuple[t.Any, str]] = {}
+        self._primary_only: set[sa.engine.Engine] = set()
+        self._replica_binds: dict[sa.engine.Engine, sa.engine.Engine] = {}
+        self._cache_invalidations: set[str] = set()
+
+    def execute(  # type: ignore[override]
+        self,
+        statement: t.Any,
+        params: t.Any | None = None,
+        *,
+        cache: t.Any | None = None,
+        execution_options: t.Mapping[str, t.Any] | None = None,
+        **kwargs: t.Any,
+    ) -> t.Any:
+        """Execute a statement, like :meth:`sqlalchemy.orm.Session.execute`.
+
+        :param cache: Serve the result from :attr:`.SQLAlchemy.query_cache`. ``True``
+            to use the defaults, a dict with ``ttl`` and ``tags`` keys, or a
+            :class:`.CacheOptions`. This is the same as the ``cache`` execution
+            option.
+
+        .. versionchanged:: 3.2
+            Added the ``cache`` parameter.
+        """
+        if cache is not None:
+            execution_options = {**(execution_options or {}), "cache": cache}
+
+        if execution_options is not None:
+            kwargs["execution_options"] = execution_options
+
+        return super().execute(statement, params, **kwargs)
+
+    def close(self) -> None:
+        """Close the session, and forget which engines it wrote to and which
+        replicas it read from.
+
+        .. versionchanged:: 3.2
+            Reset read replica routing.
+        """
+        super().close()
+        self._primary_only.clear()
+        self._replica_binds.clear()
 
     def get_bind(
         self,
@@ -38,6 +89,14 @@ class Session(sa_orm.Session):
         """Select an engine based on the ``bind_key`` of the metadata associated with
         the model or table being queried. If no bind key is set, uses the default bind.
 
+        If the engine has read replicas, a plain ``SELECT`` goes to a replica unless
+        the session has already written to the engine. The session keeps using the
+        same replica until it is closed. Pass ``bind_arguments={"primary": True}`` to
+        read from the primary anyway.
+
+        .. versionchanged:: 3.2
+            Route reads to read replicas.
+
         .. versionchanged:: 3.0.3
             Fix finding the bind for a joined inheritance model.
 
@@ -64,19 +123,65 @@ class Session(sa_orm.Session):
             engine = _clause_to_engine(mapper.local_table, engines)
 
             if engine is not None:
-                return engine
+                return self._route(engine, clause, kwargs.get("primary", False))
 
         if clause is not None:
             engine = _clause_to_engine(clause, engines)
 
             if engine is not None:
-                return engine
+                return self._route(engine, clause, kwargs.get("primary", False))
 
         if None in engines:
-            return engines[None]
+            return self._route(engines[None], clause, kwargs.get("primary", False))
 
         return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
 
+    def _route(
+        self, engine: sa.engine.Engine, clause: t.Any | None, primary: bool = False
+    ) -> sa.engine.Engine:
+        """Choose between a primary engine and its read replicas.
+
+        :meta private:
+
+        .. versionadded:: 3.2
+        """
+        replica_set = self._db.replicas.get(engine)
+
+        if replica_set is None or primary:
+            return engine
+
+        # Anything other than a plain SELECT may write: flushes (no clause), DML,
+        # text, SELECT ... FOR UPDATE. Stay on the primary after that.
+        if engine in self._primary_only or not _is_plain_select(clause):
+            self._primary_only.add(engine)
+            return engine
+
+        replica = self._replica_binds.get(engine)
+
+        if replica is None:
+            replica = self._replica_binds[engine] = replica_set.choose()
+
+        return replica
+
+
+class _ScopedSession(sa_orm.scoped_session[Session]):
+    """Pass the ``cache`` argument of :meth:`Session.execute` through ``db.session``.
+
+    :meta private:
+
+    .. versionadded:: 3.2
+    """
+
+    def execute(  # type: ignore[override]
+        self,
+        statement: t.Any,
+        params: t.Any | None = None,
+        *,
+        cache: t.Any | None = None,
+        **kwargs: t.Any,
+    ) -> t.Any:
+        return self.registry().execute(statement, params, cache=cache, **kwargs)
+
 
 def _clause_to_engine(
     clause: sa.ClauseElement | None,
@@ -106,6 +211,16 @@ def _clause_to_engine(
     return None
 
 
+def _is_plain_select(clause: t.Any | None) -> bool:
+    """If the clause is a ``SELECT`` without ``FOR UPDATE``, it can be sent to a read
+    replica.
+    """
+    return (
+        isinstance(clause, sa.sql.expression.GenerativeSelect)
+        and clause._for_update_arg is None
+    )
+
+
 def _app_ctx_id() -> int:
     """Get the id of the current Flask application context for the session scope."""
     return id(app_ctx._get_current_object())  # type: ignore[attr-defined]
@@ -16,6 +16,7 @@ from .sansio.multipart import Field
 from .sansio.multipart import File
 from .sansio.multipart import MultipartDecoder
 from .sansio.multipart import NeedData
+from .sansio.multipart import ZeroCopyMultipartDecoder
 from .wsgi import get_content_length
 from .wsgi import get_input_stream
 
@@ -154,6 +155,9 @@ class FormDataParser:
     :param silent: If set to False parsing errors will not be caught.
     :param max_form_parts: The maximum number of multipart parts to be parsed. If this
         is exceeded, a :exc:`~exceptions.RequestEntityTooLarge` exception is raised.
+    :param zero_copy: Decode multipart data with
+        :class:`~werkzeug.sansio.multipart.ZeroCopyMultipartDecoder`, which
+        writes file data to the streams without intermediate copies.
 
     .. versionchanged:: 3.0
         The ``charset`` and ``errors`` parameters were removed.
@@ -176,6 +180,7 @@ class FormDataParser:
         silent: bool = True,
         *,
         max_form_parts: int | None = None,
+        zero_copy: bool = False,
     ) -> None:
         if stream_factory is None:
             stream_factory = default_stream_factory
@@ -184,6 +189,7 @@ class FormDataParser:
         self.max_form_memory_size = max_form_memory_size
         self.max_content_length = max_content_length
         self.max_form_parts = max_form_parts
+        self.zero_copy = zero_copy
 
         if cls is None:
             cls = t.cast("type[MultiDict[str, t.Any]]", MultiDict)
@@ -258,6 +264,7 @@ class FormDataParser:
             max_form_memory_size=self.max_form_memory_size,
             max_form_parts=self.max_form_parts,
             cls=self.cls,
+            zero_copy=self.zero_copy,
         )
         boundary = options.get("boundary", "").encode("ascii")
 
@@ -297,9 +304,11 @@ class MultiPartParser:
         cls: type[MultiDict[str, t.Any]] | None = None,
         buffer_size: int = 64 * 1024,
         max_form_parts: int | None = None,
+        zero_copy: bool = False,
     ) -> None:
         self.max_form_memory_size = max_form_memory_size
         self.max_form_parts = max_form_parts
+        self.zero_copy = zero_copy
 
         if stream_factory is None:
             stream_factory = default_stream_factory
@@ -356,7 +365,8 @@ class MultiPartParser:
         container: t.IO[bytes] | list[bytes]
         _write: t.Callable[[bytes], t.Any]
 
-        parser = MultipartDecoder(
+        decoder_class = ZeroCopyMultipartDecoder if self.zero_copy else MultipartDecoder
+        parser = decoder_class(
             boundary,
             max_form_memory_size=self.max_form_memory_size,
             max_parts=self.max_form_parts,
@@ -373,7 +383,14 @@ class MultiPartParser:
                     current_part = event
                     field_size = 0
                     container = []
-                    _write = container.append
+
+                    if self.zero_copy:
+                        # The decoder reuses the memory behind each view.
+                        def _write(data: bytes, container: list[bytes] = container) -> None:
+                            container.append(bytes(data))
+
+                    else:
+                        _write = container.append
                 elif isinstance(event, File):
                     current_part = event
                     field_size = None
@@ -0,0 +1,195 @@
+# 投票数のライブ配信（Server-Sent Events）
+#
+# クライアントごとに /api/bills/<id> をポーリングさせると、開いている画面の数
+# だけクエリが走る。ここではワーカーごとに1本のポーラースレッドが
+#   SELECT id, support, against FROM bill
+# を1ティックに1回だけ実行し、前回から変わった法案だけを全クライアントに配る。
+# 世代番号（response_cache）が変わっていなければクエリ自体を省く。
+#
+# 各クライアントのキューは上限付きで、読み切れない遅いクライアントは溜め込まずに
+# 切断する（EventSource は自動で再接続し、最新のスナップショットから再開する）。
+#
+# 同期ワーカーでは1本のストリームがスレッドを1つ占有し続ける。ワーカーあたりの
+# 同時ストリーム数は LIVE_MAX_STREAMS までとし、超えた分は 503 で断って通常の
+# リクエスト用のスレッドを残す。多数の画面を繋ぐときは uwsgi-stream.ini の
+# gevent インスタンスで /api/bills/stream だけを受け、そちらで上限を上げる。
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+import sqlalchemy as sa
+
+logger = logging.getLogger(__name__)
+
+
+class _Subscriber:
+    __slots__ = ('queue', 'dropped')
+
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize)
+        self.dropped = False
+
+
+class VoteBroadcaster:
+    def __init__(self, app=None, db=None, model=None, generations=None):
+        self.db = db
+        self.model = model
+        self.generations = generations
+        self.app = None
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._state = {}
+        self._generation = None
+        self._thread = None
+        self._pid = None
+
+        if app is not None:
+            self.init_app(app, db, model, generations)
+
+    def init_app(self, app, db=None, model=None, generations=None):
+        if db is not None:
+            self.db = db
+        if model is not None:
+            self.model = model
+        if generations is not None:
+            self.generations = generations
+
+        app.config.setdefault('LIVE_POLL_INTERVAL', 1.0)
+        app.config.setdefault('LIVE_HEARTBEAT', 15.0)
+        app.config.setdefault('LIVE_CLIENT_QUEUE', 32)
+        # uwsgi.ini は threads = 2 なので、1本はストリーム以外のために空けておく
+        app.config.setdefault('LIVE_MAX_STREAMS', 1)
+
+        self.app = app
+        self.poll_interval = app.config['LIVE_POLL_INTERVAL']
+        self.heartbeat = app.config['LIVE_HEARTBEAT']
+        self.client_queue = app.config['LIVE_CLIENT_QUEUE']
+        self.max_streams = int(app.config['LIVE_MAX_STREAMS'])
+        app.extensions['live'] = self
+
+    def subscribe(self):
+        """購読者を登録する。このワーカーのストリームが上限に達していれば None を返す。"""
+        self._ensure_started()
+        subscriber = _Subscriber(self.client_queue)
+
+        with self._lock:
+            if len(self._subscribers) >= self.max_streams:
+                return None
+            # 最初に現在の全件を送る（まだ1回も読んでいなければ次のティックで届く）
+            if self._state:
+                subscriber.queue.put_nowait(_format_event(self._state))
+            self._subscribers.add(subscriber)
+
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    # SSE の本文を生成する（切断・ドロップされたら終わる）
+    def events(self, subscriber):
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    message = subscriber.queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    # 切断されたクライアントはこの書き込みで検出される
+                    yield ': ping\n\n'
+                    continue
+
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    def poll(self):
+        if self.generations is not None:
+            generation = self.generations.get((self.model.__table__.name,))
+            if generation == self._generation and self._state:
+                return 0
+        else:
+            generation = None
+
+        table = self.model.__table__
+        with self.app.app_context():
+            with self.db.engine.connect() as conn:
+                rows = conn.execute(
+                    sa.select(table.c.id, table.c.support, table.c.against)
+                ).all()
+
+        changed = {}
+        for bill_id, support, against in rows:
+            tally = (support or 0, against or 0)
+            if self._state.get(bill_id) != tally:
+                changed[bill_id] = tally
+
+        self._generation = generation
+        if not changed:
+            return 0
+
+        with self._lock:
+            self._state.update(changed)
+            subscribers = list(self._subscribers)
+
+        # 全クライアントで同じ文字列を共有する
+        message = _format_event(changed)
+        for subscriber in subscribers:
+            self._offer(subscriber, message)
+
+        return len(changed)
+
+    def _offer(self, subscriber, message):
+        try:
+            subscriber.queue.put_nowait(message)
+        except queue.Full:
+            # 溜まった分を捨て、終了の合図だけを入れる
+            self.unsubscribe(subscriber)
+            subscriber.dropped = True
+            with subscriber.queue.mutex:
+                subscriber.queue.queue.clear()
+            subscriber.queue.put_nowait(None)
+            logger.info("Dropped slow vote stream subscriber")
+
+    def _ensure_started(self):
+        pid = os.getpid()
+
+        if self._pid == pid:
+            return
+
+        with self._lock:
+            if self._pid == pid:
+                return
+
+            # fork 後は親の購読者もスレッドも引き継がれない
+            self._subscribers = set()
+            self._state = {}
+            self._generation = None
+            self._pid = pid
+            self._thread = threading.Thread(
+                target=self._run, name='vote-broadcaster', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            if not self._subscribers:
+                continue
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Vote stream poll failed")
+
+
+def _format_event(tallies):
+    # {"<id>": [support, against], ...} の差分だけを送る
+    data = json.dumps(
+        {str(bill_id): list(tally) for bill_id, tally in tallies.items()},
+        separators=(',', ':'),
+    )
+    return f"event: votes\ndata: {data}\n\n"
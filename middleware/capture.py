@@ -0,0 +1,441 @@
+"""
+Request Capture
+===============
+
+This module provides a middleware that records a sample of requests to
+JSON Lines files, so real traffic can be replayed later against the
+application, for example by a benchmark.
+
+.. autoclass:: CaptureMiddleware
+
+:copyright: 2007 Pallets
+:license: BSD-3-Clause
+"""
+
+from __future__ import annotations
+
+import atexit
+import base64
+import collections
+import glob
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import typing as t
+from io import BytesIO
+from urllib.parse import parse_qsl
+from urllib.parse import urlencode
+
+if t.TYPE_CHECKING:
+    from _typeshed.wsgi import StartResponse
+    from _typeshed.wsgi import WSGIApplication
+    from _typeshed.wsgi import WSGIEnvironment
+
+_default_headers = (
+    "Accept",
+    "Accept-Encoding",
+    "Accept-Language",
+    "Content-Type",
+    "Origin",
+    "User-Agent",
+    "X-Requested-With",
+)
+
+
+def _environ_key(name: str) -> str:
+    key = name.upper().replace("-", "_")
+
+    if key in {"CONTENT_TYPE", "CONTENT_LENGTH"}:
+        return key
+
+    return f"HTTP_{key}"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists but belongs to another user.
+        return True
+
+    return True
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+class CaptureMiddleware:
+    """Wrap a WSGI application and record a random sample of requests
+    to rotating JSON Lines files in ``directory``.
+
+    Each line is a JSON object with these keys:
+
+    -   ``method``, ``path``, ``query`` - The request line. ``query`` is
+        the raw query string.
+    -   ``headers`` - The captured headers, see ``headers`` below.
+    -   ``body`` - The request body, if there is one and it is at most
+        ``max_body`` bytes. ``body_encoding`` is ``"base64"`` if it is
+        not valid UTF-8. Larger bodies are not read, and
+        ``body_truncated`` is set instead.
+    -   ``status`` - The response status code.
+    -   ``duration_ms`` - Time from calling the application until the
+        response iterable was closed.
+    -   ``time`` - When the request started, as a Unix timestamp.
+
+    Request threads never wait on disk or on a lock. A sampled request
+    is appended to an in-memory ring buffer holding at most
+    ``capacity`` requests; if the buffer is full, the oldest request is
+    overwritten and counted in :attr:`dropped`. A background thread,
+    started on first use in each process, drains the buffer every
+    ``flush_interval`` seconds. It encodes and redacts the records and
+    appends them to ``capture-{pid}-{n}.jsonl``, starting the next file
+    once one reaches ``max_bytes``. Only the ``backup_count`` newest
+    files of each process are kept, and at most ``max_files`` in the
+    directory. The directory limit also covers files left by processes
+    that have exited, such as restarted workers.
+
+    Redacted header and query values are replaced with a salted hash,
+    so the same token still maps to the same value across requests
+    without revealing it. For anything else, such as body fields, pass
+    a ``redact`` callable. It is called in the background thread with
+    each record dict and returns the record to write, or ``None`` to
+    skip it.
+
+    Bodies are only read when the request has a ``Content-Length``, the
+    application then sees a buffered copy. Streaming uploads larger
+    than ``max_body`` are passed through untouched.
+
+    :param app: The WSGI application to wrap.
+    :param directory: Write capture files to this directory.
+    :param sample_rate: The fraction of requests to record, from ``0``
+        to ``1``.
+    :param headers: Names of request headers to record. Other headers
+        are not captured.
+    :param redact_headers: Names of headers whose values are hashed.
+        ``Authorization`` and ``Cookie`` are always redacted if they are
+        captured.
+    :param redact_query: Names of query arguments whose values are
+        hashed.
+    :param redact: Called with each record before it is written.
+    :param redact_salt: Salt for the redaction hash. Defaults to a
+        random value, pass a fixed one to compare captures across
+        restarts.
+    :param max_body: Largest request body to record, in bytes.
+    :param capacity: Largest number of requests to hold in memory.
+    :param flush_interval: Seconds between writes to disk.
+    :param max_bytes: Size at which to start a new file.
+    :param backup_count: Number of files to keep per process.
+    :param max_files: Number of files to keep in the directory across
+        all processes. The oldest by modification time are removed
+        first, except the file each running process is writing to.
+
+    .. code-block:: python
+
+        from werkzeug.middleware.capture import CaptureMiddleware
+        app.wsgi_app = CaptureMiddleware(
+            app.wsgi_app, "/var/log/capture", sample_rate=0.01
+        )
+    """
+
+    def __init__(
+        self,
+        app: WSGIApplication,
+        directory: str,
+        sample_rate: float = 0.01,
+        headers: t.Iterable[str] = _default_headers,
+        redact_headers: t.Iterable[str] = (),
+        redact_query: t.Iterable[str] = (),
+        redact: t.Callable[[dict[str, t.Any]], dict[str, t.Any] | None] | None = None,
+        redact_salt: bytes | None = None,
+        max_body: int = 64 * 1024,
+        capacity: int = 4096,
+        flush_interval: float = 1.0,
+        max_bytes: int = 64 * 1024 * 1024,
+        backup_count: int = 8,
+        max_files: int = 64,
+    ) -> None:
+        self._app = app
+        self.directory = directory
+        self.sample_rate = sample_rate
+        # Computed once, request threads look headers up by their WSGI key.
+        self._headers = tuple((name, _environ_key(name)) for name in headers)
+        self._redact_headers = {"authorization", "cookie"}
+        self._redact_headers.update(name.lower() for name in redact_headers)
+        self._redact_query = set(redact_query)
+        self._redact = redact
+        self._redact_salt = os.urandom(16) if redact_salt is None else redact_salt
+        self.max_body = max_body
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.max_files = max_files
+        #: Number of sampled requests overwritten before they were
+        #: written because the buffer was full. Approximate, it is not
+        #: updated atomically.
+        self.dropped = 0
+        # Appending to and popping from a deque are atomic, so the request
+        # threads and the writer thread share it without a lock. With maxlen
+        # set, appending to a full deque discards the oldest record.
+        self._buffer: collections.deque[tuple[t.Any, ...]] = collections.deque(
+            maxlen=capacity
+        )
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+        self._file: t.IO[bytes] | None = None
+        self._file_index = 0
+
+    def __call__(
+        self, environ: WSGIEnvironment, start_response: StartResponse
+    ) -> t.Iterable[bytes]:
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return self._app(environ, start_response)
+
+        self._ensure_started()
+        started = time.time()
+        start = time.perf_counter()
+        body, truncated = self._read_body(environ)
+        headers = {
+            name: environ[key] for name, key in self._headers if key in environ
+        }
+
+        request = (
+            environ.get("REQUEST_METHOD", "GET"),
+            environ.get("SCRIPT_NAME", "") + environ.get("PATH_INFO", ""),
+            environ.get("QUERY_STRING", ""),
+            headers,
+            body,
+            truncated,
+            started,
+        )
+        status_code: list[int] = [0]
+
+        def catching_start_response(status, headers, exc_info=None):  # type: ignore
+            status_code[0] = int(status.split(None, 1)[0])
+            return start_response(status, headers, exc_info)
+
+        def on_close() -> None:
+            if len(self._buffer) >= self.capacity:
+                self.dropped += 1
+
+            duration = time.perf_counter() - start
+            self._buffer.append((*request, status_code[0], duration))
+
+        app_iter = self._app(
+            environ, t.cast("StartResponse", catching_start_response)
+        )
+        return _CaptureIterator(app_iter, on_close)
+
+    def _read_body(self, environ: WSGIEnvironment) -> tuple[bytes | None, bool]:
+        try:
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            return None, False
+
+        if length <= 0:
+            return None, False
+
+        if length > self.max_body:
+            return None, True
+
+        body = environ["wsgi.input"].read(length)
+        environ["wsgi.input"] = BytesIO(body)
+        return body, False
+
+    def _ensure_started(self) -> None:
+        pid = os.getpid()
+
+        if self._pid == pid:
+            return
+
+        with self._lock:
+            if self._pid == pid:
+                return
+
+            # Threads do not survive a fork, start one in each process. Drop
+            # anything the parent buffered, the parent writes it itself.
+            self._pid = pid
+            self._buffer.clear()
+            self._file = None
+            self._file_index = 0
+            os.makedirs(self.directory, exist_ok=True)
+            atexit.register(self.flush)
+            thread = threading.Thread(
+                target=self._run, name="werkzeug-capture", daemon=True
+            )
+            thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+
+            try:
+                self.flush()
+            except Exception:
+                from .._internal import _log
+
+                _log("exception", "Writing captured requests failed.")
+
+    def flush(self) -> None:
+        """Write all buffered requests to disk now."""
+        with self._lock:
+            lines = []
+
+            while True:
+                try:
+                    item = self._buffer.popleft()
+                except IndexError:
+                    break
+
+                record = self._make_record(*item)
+
+                if record is not None:
+                    lines.append(json.dumps(record, separators=(",", ":")).encode())
+
+            if lines:
+                self._write(b"\n".join(lines) + b"\n")
+
+    def _hash(self, value: str) -> str:
+        digest = hashlib.sha256(self._redact_salt + value.encode()).hexdigest()
+        return f"redacted:{digest[:16]}"
+
+    def _make_record(
+        self,
+        method: str,
+        path: str,
+        query: str,
+        headers: dict[str, str],
+        body: bytes | None,
+        truncated: bool,
+        started: float,
+        status: int,
+        duration: float,
+    ) -> dict[str, t.Any] | None:
+        # WSGI strings are latin-1 decoded bytes, recover the UTF-8 text.
+        path = path.encode("latin1").decode("utf-8", "replace")
+
+        if self._redact_query and query:
+            args = parse_qsl(query, keep_blank_values=True)
+
+            if any(key in self._redact_query for key, _ in args):
+                query = urlencode(
+                    [
+                        (key, self._hash(value) if key in self._redact_query else value)
+                        for key, value in args
+                    ]
+                )
+
+        headers = {
+            name: self._hash(value) if name.lower() in self._redact_headers else value
+            for name, value in headers.items()
+        }
+        record: dict[str, t.Any] = {
+            "method": method,
+            "path": path,
+            "query": query,
+            "headers": headers,
+        }
+
+        if body is not None:
+            try:
+                record["body"] = body.decode("utf-8")
+            except UnicodeDecodeError:
+                record["body"] = base64.b64encode(body).decode("ascii")
+                record["body_encoding"] = "base64"
+        elif truncated:
+            record["body_truncated"] = True
+
+        record["status"] = status
+        record["duration_ms"] = round(duration * 1000.0, 3)
+        record["time"] = round(started, 3)
+
+        if self._redact is not None:
+            return self._redact(record)
+
+        return record
+
+    def _write(self, data: bytes) -> None:
+        if self._file is not None and self._file.tell() >= self.max_bytes:
+            self._file.close()
+            self._file = None
+
+        if self._file is None:
+            self._file_index += 1
+            name = f"capture-{self._pid}-{self._file_index}.jsonl"
+            self._file = open(os.path.join(self.directory, name), "ab")
+            self._prune()
+
+        self._file.write(data)
+        self._file.flush()
+
+    def _prune(self) -> None:
+        # capture-{pid}-{n}.jsonl, grouped by process and sorted by index.
+        by_pid: dict[int, list[tuple[int, str]]] = {}
+
+        for path in glob.glob(os.path.join(self.directory, "capture-*-*.jsonl")):
+            try:
+                _, pid, index = os.path.basename(path)[:-6].split("-")
+                by_pid.setdefault(int(pid), []).append((int(index), path))
+            except ValueError:
+                continue
+
+        remove = set()
+        keep = []
+        current = set()
+
+        for pid, files in by_pid.items():
+            files.sort()
+            remove.update(path for _, path in files[: -max(self.backup_count, 1)])
+            kept = [path for _, path in files[-max(self.backup_count, 1) :]]
+            keep.extend(kept)
+
+            if pid == self._pid or _pid_alive(pid):
+                current.add(kept[-1])
+
+        # Across all processes, drop the oldest files beyond the limit. A
+        # running process keeps writing to its newest file, so never remove
+        # that one.
+        excess = len(keep) - max(self.max_files, len(current))
+
+        if excess > 0:
+            for path in sorted(
+                (path for path in keep if path not in current), key=_mtime
+            )[:excess]:
+                remove.add(path)
+
+        for path in remove:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+class _CaptureIterator:
+    """Pass the response through unchanged and call ``on_close`` once it
+    has been closed.
+    """
+
+    def __init__(
+        self, app_iter: t.Iterable[bytes], on_close: t.Callable[[], None]
+    ) -> None:
+        self._app_iter = app_iter
+        self._on_close = on_close
+
+    def __iter__(self) -> t.Iterator[bytes]:
+        return iter(self._app_iter)
+
+    def close(self) -> None:
+        try:
+            if hasattr(self._app_iter, "close"):
+                self._app_iter.close()
+        finally:
+            self._on_close()
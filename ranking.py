@@ -0,0 +1,321 @@
+# 「人気順」ランキング（ホットなツイート・賛否が拮抗している法案）
+#
+# リクエストのたびに全件を読んでスコアで並べ替える代わりに、上位 K 件だけを
+# メモリに持ち、いいね・リツイート・投票のたびに差分で更新する。
+#
+# ホット度は時間で減衰させるが、全件のスコアを毎回減らすのではなく
+# 「基準時刻からの経過に応じて重みを増やして足す」（forward decay）ので、
+# 加算は O(1) で順位も崩れない。値が大きくなりすぎないよう定期的に基準時刻を
+# 進めて全体を割り戻す（rebase）。
+#
+# 保持件数を超えたら最小スコアの項目を追い出し、新しい項目はそのスコアを
+# 引き継ぐ（Space-Saving）。これで上位に入るべき項目は取りこぼさない。
+#
+# 他のワーカーでの更新は定期的な DB からの再読み込み（refresh）で取り込む。
+# DB にはイベントの時刻がない（件数だけ）ので、DB から作ったスコアで置き換えず、
+# 項目ごとに手元のスコアと大きい方を取ってマージする。
+import logging
+import os
+import threading
+import time
+
+import sqlalchemy as sa
+
+logger = logging.getLogger(__name__)
+
+
+class DecayedTopK:
+    def __init__(self, k, half_life, capacity=None):
+        self.k = k
+        self.half_life = half_life
+        self.capacity = capacity or k * 4
+        self._lock = threading.Lock()
+        self._scores = {}
+        self._epoch = time.time()
+        self._sorted = None
+
+    def _weight(self, when):
+        return 2.0 ** ((when - self._epoch) / self.half_life)
+
+    # when 時点の重み weight のイベントを足す
+    def add(self, item_id, weight=1.0, when=None):
+        if when is None:
+            when = time.time()
+
+        with self._lock:
+            score = self._scores.get(item_id)
+            if score is None:
+                score = self._evict()
+            self._scores[item_id] = score + weight * self._weight(when)
+            self._sorted = None
+
+    def remove(self, item_id):
+        with self._lock:
+            if self._scores.pop(item_id, None) is not None:
+                self._sorted = None
+
+    def _evict(self):
+        if len(self._scores) < self.capacity:
+            return 0.0
+        victim = min(self._scores, key=self._scores.get)
+        return self._scores.pop(victim)
+
+    # 上位 n 件の (id, 現在のスコア)
+    def top(self, n=None):
+        n = self.k if n is None else max(1, min(n, self.k))
+
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(self._scores.items(), key=lambda item: (-item[1], item[0]))
+            ranked = self._sorted[:n]
+            scale = 1.0 / self._weight(time.time())
+
+        return [(item_id, score * scale) for item_id, score in ranked]
+
+    # 基準時刻を now に進め、全スコアを割り戻す（順位は変わらない）
+    def rebase(self, now=None):
+        if now is None:
+            now = time.time()
+
+        with self._lock:
+            factor = 1.0 / self._weight(now)
+            self._epoch = now
+            self._scores = {
+                item_id: score * factor
+                for item_id, score in self._scores.items()
+                if score * factor > 1e-9
+            }
+            self._sorted = None
+
+    def merge(self, events):
+        """events は (id, weight, when)。DB から読み直したスコアを手元のスコアにマージする。
+
+        DB のスコアは投稿時刻に寄せた近似なので、手元で差分更新したスコアの方が
+        大きければそちらを残す。DB の方が大きいのは他のワーカーでの更新分。
+        """
+        with self._lock:
+            # 基準時刻を今に進めてから比べる（rebase と同じ）
+            now = time.time()
+            factor = 1.0 / self._weight(now)
+            self._epoch = now
+            scores = {item_id: score * factor for item_id, score in self._scores.items()}
+
+            fresh = {}
+            for item_id, weight, when in events:
+                fresh[item_id] = fresh.get(item_id, 0.0) + weight * self._weight(when)
+            for item_id, score in fresh.items():
+                if score > scores.get(item_id, 0.0):
+                    scores[item_id] = score
+
+            ranked = sorted(scores.items(), key=lambda item: -item[1])[:self.capacity]
+            self._scores = {item_id: score for item_id, score in ranked if score > 1e-9}
+            self._sorted = None
+
+
+class ContestedTopK:
+    """賛否の少ない方の票数が多い（＝拮抗していて票も多い）法案の上位。"""
+
+    def __init__(self, k, capacity=None):
+        self.k = k
+        self.capacity = capacity or k * 4
+        self._lock = threading.Lock()
+        self._tallies = {}
+        self._sorted = None
+
+    @staticmethod
+    def score(support, against):
+        return min(support, against)
+
+    def update(self, bill_id, support, against):
+        score = self.score(support, against)
+
+        with self._lock:
+            if bill_id not in self._tallies and len(self._tallies) >= self.capacity:
+                victim = min(self._tallies, key=lambda i: self.score(*self._tallies[i]))
+                if self.score(*self._tallies[victim]) >= score:
+                    return
+                del self._tallies[victim]
+            self._tallies[bill_id] = (support, against)
+            self._sorted = None
+
+    def remove(self, bill_id):
+        with self._lock:
+            if self._tallies.pop(bill_id, None) is not None:
+                self._sorted = None
+
+    def top(self, n=None):
+        n = self.k if n is None else max(1, min(n, self.k))
+
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(
+                    self._tallies.items(),
+                    key=lambda item: (-self.score(*item[1]), item[0]),
+                )
+            return [(bill_id, self.score(*tally)) for bill_id, tally in self._sorted[:n]]
+
+    def merge(self, tallies):
+        """tallies は (id, support, against)。票は減らないので、賛否それぞれ大きい方を取る。
+
+        手元の値には DB にまだ書かれていない未反映の票が入っていることがある。
+        """
+        with self._lock:
+            merged = dict(self._tallies)
+            for bill_id, support, against in tallies:
+                local = merged.get(bill_id)
+                if local is not None:
+                    support, against = max(support, local[0]), max(against, local[1])
+                merged[bill_id] = (support, against)
+            ranked = sorted(merged.items(), key=lambda item: -self.score(*item[1]))[:self.capacity]
+            self._tallies = dict(ranked)
+            self._sorted = None
+
+
+# イベントの重み
+WEIGHT_POST = 1.0
+WEIGHT_GOOD = 1.0
+WEIGHT_RETWEET = 2.0
+
+
+class Rankings:
+    def __init__(self, app=None, db=None, tweet_model=None, bill_model=None):
+        self.db = db
+        self.tweet_model = tweet_model
+        self.bill_model = bill_model
+        self.app = None
+        self.hot_tweets = None
+        self.contested_bills = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app, db, tweet_model, bill_model)
+
+    def init_app(self, app, db=None, tweet_model=None, bill_model=None):
+        if db is not None:
+            self.db = db
+        if tweet_model is not None:
+            self.tweet_model = tweet_model
+        if bill_model is not None:
+            self.bill_model = bill_model
+
+        app.config.setdefault('RANKING_SIZE', 100)
+        app.config.setdefault('RANKING_HALF_LIFE', 6 * 3600)
+        app.config.setdefault('RANKING_DECAY_INTERVAL', 300)
+        app.config.setdefault('RANKING_REFRESH_INTERVAL', 60)
+
+        self.app = app
+        self.size = app.config['RANKING_SIZE']
+        self.half_life = app.config['RANKING_HALF_LIFE']
+        self.decay_interval = app.config['RANKING_DECAY_INTERVAL']
+        self.refresh_interval = app.config['RANKING_REFRESH_INTERVAL']
+        self.hot_tweets = DecayedTopK(self.size, self.half_life)
+        self.contested_bills = ContestedTopK(self.size)
+        app.extensions['rankings'] = self
+
+    # --- 更新（各エンドポイントから呼ぶ） ---------------------------------
+
+    def tweet_posted(self, tweet_id, timestamp):
+        self._ensure_started()
+        self.hot_tweets.add(tweet_id, WEIGHT_POST, timestamp)
+
+    def tweet_good(self, tweet_id):
+        self._ensure_started()
+        self.hot_tweets.add(tweet_id, WEIGHT_GOOD)
+
+    def tweet_retweeted(self, tweet_id):
+        self._ensure_started()
+        self.hot_tweets.add(tweet_id, WEIGHT_RETWEET)
+
+    def bill_voted(self, bill_id, support, against):
+        self._ensure_started()
+        self.contested_bills.update(bill_id, support, against)
+
+    # --- 読み込み --------------------------------------------------------
+
+    def top_tweets(self, n=None):
+        self._ensure_started()
+        return [tweet_id for tweet_id, _ in self.hot_tweets.top(n)]
+
+    def top_contested_bills(self, n=None):
+        self._ensure_started()
+        return [bill_id for bill_id, _ in self.contested_bills.top(n)]
+
+    # --- DB との同期 -----------------------------------------------------
+
+    def refresh(self):
+        """DB から候補を読み直してマージする（起動時と、他のワーカーの更新を取り込むため定期的に）。
+
+        ツイートは半減期の数倍より古いとほぼ0点なので、新しい順に
+        保持件数の数倍だけ読めば十分。
+        """
+        tweet = self.tweet_model.__table__
+        bill = self.bill_model.__table__
+        since = int(time.time() - self.half_life * 8)
+        limit = self.hot_tweets.capacity * 4
+
+        with self.app.app_context():
+            with self.db.engine.connect() as conn:
+                tweets = conn.execute(
+                    sa.select(tweet.c.id, tweet.c.timestamp, tweet.c.good_count, tweet.c.retweet_count)
+                    .where(tweet.c.timestamp >= since)
+                    .order_by(tweet.c.timestamp.desc())
+                    .limit(limit)
+                ).all()
+                contested = sa.case(
+                    (bill.c.support < bill.c.against, bill.c.support),
+                    else_=bill.c.against,
+                )
+                bills = conn.execute(
+                    sa.select(bill.c.id, bill.c.support, bill.c.against)
+                    .order_by(contested.desc())
+                    .limit(self.contested_bills.capacity)
+                ).all()
+
+        # いいね・リツイートの時刻は持っていないので投稿時刻に寄せる
+        self.hot_tweets.merge(
+            (tweet_id, WEIGHT_POST + WEIGHT_GOOD * (good or 0) + WEIGHT_RETWEET * (retweets or 0), timestamp)
+            for tweet_id, timestamp, good, retweets in tweets
+        )
+        self.contested_bills.merge(
+            (bill_id, support or 0, against or 0) for bill_id, support, against in bills
+        )
+
+    def _ensure_started(self):
+        pid = os.getpid()
+
+        if self._pid == pid:
+            return
+
+        with self._lock:
+            if self._pid == pid:
+                return
+
+            self._pid = pid
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Ranking refresh failed")
+
+            self._thread = threading.Thread(
+                target=self._run, name='ranking-maintainer', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        last_refresh = last_decay = time.monotonic()
+        tick = min(self.decay_interval, self.refresh_interval)
+
+        while True:
+            time.sleep(tick)
+            now = time.monotonic()
+            try:
+                if now - last_refresh >= self.refresh_interval:
+                    self.refresh()
+                    last_refresh = last_decay = now
+                elif now - last_decay >= self.decay_interval:
+                    self.hot_tweets.rebase()
+                    last_decay = now
+            except Exception:
+                logger.exception("Ranking maintenance failed")
@@ -0,0 +1,290 @@
+# GET /api/bills・/api/tweets のレスポンスキャッシュ
+#
+# 一覧の読み込みは書き込みより桁違いに多いのに、毎回 MySQL を読んで JSON を
+# 作り直していた。ここではシリアライズ済みの本文を ETag 付きで保存し、
+# テーブルごとの世代番号で無効化する。
+#
+#   - 書き込み側: コミットされたモデルのテーブルの世代を +1 するだけ
+#     （flask_sqlalchemy の models_committed シグナルから）
+#   - 読み込み側: 依存テーブルの世代が保存時と同じならキャッシュをそのまま返す。
+#     If-None-Match が一致すれば 304 で本文も送らない
+#
+# 世代番号は mmap の共有ファイルに置くので、あるワーカーでの書き込みが
+# 全ワーカーのキャッシュを無効化する（キャッシュ本体は各ワーカーのメモリ）。
+#
+# 読み込みがレプリカに振り分けられる場合、世代が変わった直後に作ったレスポンスは
+# まだ書き込みが届いていない古い内容かもしれない。RESPONSE_CACHE_SETTLE 秒
+# （レプリカの許容遅延）が過ぎるまでは、その世代のキャッシュを仮のものとして扱う。
+import fcntl
+import functools
+import gzip
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from flask import make_response
+from flask import request
+from flask_sqlalchemy.track_modifications import models_committed
+from werkzeug.wrappers import Response
+
+# キャッシュから返すときに付け直すヘッダー
+_SKIP_HEADERS = {'content-length', 'content-encoding', 'etag', 'vary'}
+
+
+def open_private(path, create=False):
+    """自分だけが書き込めるファイルを開く（他のユーザーのもの・リンクは拒否する）。"""
+    flags = os.O_RDWR | os.O_NOFOLLOW | os.O_CLOEXEC
+    if create:
+        flags |= os.O_CREAT
+    fd = os.open(path, flags, 0o600)
+    st = os.fstat(fd)
+    if st.st_uid != os.getuid() or st.st_mode & 0o077:
+        os.close(fd)
+        raise PermissionError(f"{path} must be owned by the current user and not accessible by others")
+    return fd
+
+
+class MemoryGenerations:
+    """プロセス内の世代番号（開発・単一プロセス用）。"""
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, tables):
+        return tuple(self._counters.get(table, 0) for table in tables)
+
+    def bump(self, tables):
+        with self._lock:
+            for table in tables:
+                self._counters[table] = self._counters.get(table, 0) + 1
+
+
+class MmapGenerations:
+    """全ワーカーで共有する世代番号。テーブル名のハッシュでスロットを選ぶ。
+
+    別のテーブルが同じスロットに当たっても余計に無効化されるだけで、
+    古いレスポンスを返すことはない。
+
+    ファイル名にスロット数を付ける（{path}.{slots}）。スロット数を変えたデプロイでも
+    動いているワーカーがマップ中のファイルを縮めず、新しいファイルを使う。
+    ファイルはモード 0600 で作り、他のユーザーのもの・シンボリックリンクは使わない。
+    """
+
+    _slot = struct.Struct('<Q')
+
+    def __init__(self, path, slots=256):
+        self.slots = slots
+        self.path = f"{path}.{slots}"
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._map = None
+
+        size = slots * self._slot.size
+        fd = open_private(self.path, create=True)
+        try:
+            # 新しいファイルを空から1回だけ広げる。広げる前にマップするプロセスはない
+            # （どのプロセスもロックを取ってから大きさを確かめる）
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                current = os.fstat(fd).st_size
+                if current == 0:
+                    os.ftruncate(fd, size)
+                elif current != size:
+                    raise RuntimeError(f"{self.path} is {current} bytes, expected {size}")
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def _open(self):
+        # flock は open したファイル記述ごとなので fork 後は開き直す
+        pid = os.getpid()
+        if self._pid != pid:
+            self._fd = open_private(self.path)
+            self._map = mmap.mmap(self._fd, self.slots * self._slot.size)
+            self._pid = pid
+        return self._fd, self._map
+
+    def _offset(self, table):
+        return (zlib.crc32(table.encode('utf-8')) % self.slots) * self._slot.size
+
+    def get(self, tables):
+        # 8バイト境界の読み込みなのでロックなしでも値が壊れることはない
+        _, buf = self._open()
+        return tuple(self._slot.unpack_from(buf, self._offset(table))[0] for table in tables)
+
+    def bump(self, tables):
+        with self._lock:
+            fd, buf = self._open()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                for offset in {self._offset(table) for table in tables}:
+                    value, = self._slot.unpack_from(buf, offset)
+                    self._slot.pack_into(buf, offset, value + 1)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class _Entry:
+    __slots__ = ('generations', 'etag', 'body', 'encoding', 'mimetype', 'headers', 'expires')
+
+    def __init__(self, generations, etag, body, encoding, mimetype, headers, expires=None):
+        self.generations = generations
+        self.expires = expires
+        self.etag = etag
+        self.body = body
+        self.encoding = encoding
+        self.mimetype = mimetype
+        self.headers = headers
+
+
+class ResponseCache:
+    def __init__(self, app=None):
+        self.generations = None
+        self._entries = OrderedDict()
+        self._first_seen = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RESPONSE_CACHE_BACKEND', 'mmap')
+        app.config.setdefault('RESPONSE_CACHE_MMAP_PATH', os.path.join(app.instance_path, 'generations.bin'))
+        app.config.setdefault('RESPONSE_CACHE_MAX_ENTRIES', 512)
+        app.config.setdefault('RESPONSE_CACHE_GZIP_MIN_SIZE', 1024)
+        app.config.setdefault('RESPONSE_CACHE_SETTLE', 0)
+
+        backend = app.config['RESPONSE_CACHE_BACKEND']
+        if backend == 'memory':
+            self.generations = MemoryGenerations()
+        elif backend == 'mmap':
+            self.generations = MmapGenerations(app.config['RESPONSE_CACHE_MMAP_PATH'])
+        else:
+            raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {backend!r}")
+
+        self.max_entries = app.config['RESPONSE_CACHE_MAX_ENTRIES']
+        self.gzip_min_size = app.config['RESPONSE_CACHE_GZIP_MIN_SIZE']
+        self.settle = app.config['RESPONSE_CACHE_SETTLE']
+
+        # SQLALCHEMY_TRACK_MODIFICATIONS が True のときだけ送られる
+        models_committed.connect(self._on_models_committed, app)
+        app.extensions['response_cache'] = self
+
+    # 書き込み側: テーブルの世代を進める（セッションを通らない更新から直接呼ぶ）
+    def bump(self, *tables):
+        self.generations.bump(tables)
+
+    def _on_models_committed(self, sender, changes):
+        tables = {obj.__table__.name for obj, _ in changes}
+        if tables:
+            self.generations.bump(tables)
+
+    # 読み込み側: tables のどれかが更新されるまでレスポンスを使い回す。
+    # unless() が真のリクエストはキャッシュしない（テーブルの更新以外でも結果が
+    # 変わるもの。ワーカーごとのランキングや時間で減衰するスコアなど）
+    def cached(self, *tables, unless=None):
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if request.method not in ('GET', 'HEAD') or (unless is not None and unless()):
+                    return view(*args, **kwargs)
+
+                encoding = 'gzip' if request.accept_encodings['gzip'] else None
+                key = (
+                    request.endpoint,
+                    tuple(sorted(kwargs.items())),
+                    tuple(sorted(request.args.items(multi=True))),
+                    encoding,
+                )
+                # ビューの実行中に書き込まれたら次回は作り直すよう、先に世代を読む
+                generations = self.generations.get(tables)
+                now = time.monotonic()
+
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if (
+                        entry is not None
+                        and entry.generations == generations
+                        and (entry.expires is None or now < entry.expires)
+                    ):
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                    else:
+                        entry = None
+                        self.misses += 1
+
+                if entry is None:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.direct_passthrough:
+                        return response
+                    expires = self._settle_deadline(tables, generations, now)
+                    entry = self._store(key, generations, response, encoding, expires)
+
+                return self._respond(entry)
+
+            return wrapper
+
+        return decorator
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # この世代を最初に見てから settle 秒以内なら、その期限を返す
+    def _settle_deadline(self, tables, generations, now):
+        if not self.settle:
+            return None
+
+        with self._lock:
+            if len(self._first_seen) > self.max_entries * 4:
+                # 忘れても期限が後ろにずれるだけ
+                self._first_seen.clear()
+            seen = self._first_seen.setdefault((tables, generations), now)
+
+        if now - seen >= self.settle:
+            return None
+        return seen + self.settle
+
+    def _store(self, key, generations, response, encoding, expires=None):
+        body = response.get_data()
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+
+        if encoding is not None and len(body) >= self.gzip_min_size:
+            # 圧縮は保存時に1回だけ。表現が違うので ETag も分ける
+            body = gzip.compress(body, compresslevel=6, mtime=0)
+            etag = f"{etag}-gz"
+        else:
+            encoding = None
+
+        headers = [
+            (name, value)
+            for name, value in response.headers.items()
+            if name.lower() not in _SKIP_HEADERS and name.lower() != 'content-type'
+        ]
+        entry = _Entry(generations, etag, body, encoding, response.mimetype, headers, expires)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return entry
+
+    def _respond(self, entry):
+        response = Response(entry.body, mimetype=entry.mimetype, headers=entry.headers)
+        if entry.encoding is not None:
+            response.headers['Content-Encoding'] = entry.encoding
+        response.vary.add('Accept-Encoding')
+        response.set_etag(entry.etag)
+        return response.make_conditional(request)
@@ -123,6 +123,7 @@ from .exceptions import RoutingException as RoutingException
 from .exceptions import WebsocketMismatch as WebsocketMismatch
 from .map import Map as Map
 from .map import MapAdapter as MapAdapter
+from .map import MatchCacheInfo as MatchCacheInfo
 from .matcher import StateMachineMatcher as StateMachineMatcher
 from .rules import EndpointPrefix as EndpointPrefix
 from .rules import parse_converter_args as parse_converter_args
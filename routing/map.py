@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import typing as t
 import warnings
+from collections import OrderedDict
 from pprint import pformat
 from threading import Lock
 from urllib.parse import quote
@@ -38,6 +39,17 @@ if t.TYPE_CHECKING:
     from .rules import RuleFactory
 
 
+class MatchCacheInfo(t.NamedTuple):
+    """Counters returned by :meth:`Map.match_cache_info`."""
+
+    hits: int
+    misses: int
+    converter_hits: int
+    converter_misses: int
+    maxsize: int
+    currsize: int
+
+
 class Map:
     """The map class stores all the URL rules and some configuration
     parameters.  Some of the configuration values are only stored on the
@@ -66,6 +78,15 @@ class Map:
                           feature and disables the subdomain one.  If
                           enabled the `host` parameter to rules is used
                           instead of the `subdomain` one.
+    :param compiled_matcher: if set to `True` sibling dynamic parts are
+                             merged into one alternation regex per state, so
+                             matching does not slow down as more rules share
+                             a static prefix.
+    :param match_cache_size: keep the results of up to this many matches
+                             against rules without variable parts in an LRU
+                             cache, and memoize as many converted values per
+                             rule for the others. Disabled by default. See
+                             :meth:`match_cache_info`.
 
     .. versionchanged:: 3.0
         The ``charset`` and ``encoding_errors`` parameters were removed.
@@ -102,8 +123,17 @@ class Map:
         sort_parameters: bool = False,
         sort_key: t.Callable[[t.Any], t.Any] | None = None,
         host_matching: bool = False,
+        compiled_matcher: bool = False,
+        match_cache_size: int = 0,
     ) -> None:
-        self._matcher = StateMachineMatcher(merge_slashes)
+        self._matcher = StateMachineMatcher(merge_slashes, compiled_matcher)
+        self._matcher.converter_cache_size = match_cache_size
+        self._match_cache: OrderedDict[
+            tuple[str, str, str, bool], tuple[Rule, t.Mapping[str, t.Any]]
+        ] = OrderedDict()
+        self._match_cache_lock = Lock()
+        self._match_cache_hits = 0
+        self._match_cache_misses = 0
         self._rules_by_endpoint: dict[t.Any, list[Rule]] = {}
         self._remap = True
         self._remap_lock = self.lock_class()
@@ -130,6 +160,69 @@ class Map:
     @merge_slashes.setter
     def merge_slashes(self, value: bool) -> None:
         self._matcher.merge_slashes = value
+        self.clear_match_cache()
+
+    @property
+    def match_cache_size(self) -> int:
+        return self._matcher.converter_cache_size
+
+    @match_cache_size.setter
+    def match_cache_size(self, value: int) -> None:
+        self._matcher.converter_cache_size = value
+        self.clear_match_cache()
+
+    def match_cache_info(self) -> MatchCacheInfo:
+        """Return the hit and miss counters of the match cache enabled
+        with ``match_cache_size``. *hits* and *misses* count lookups of
+        static rules, *converter_hits* and *converter_misses* count the
+        memoized converter values of rules with variable parts.
+        """
+        with self._match_cache_lock:
+            return MatchCacheInfo(
+                self._match_cache_hits,
+                self._match_cache_misses,
+                self._matcher.converter_hits,
+                self._matcher.converter_misses,
+                self.match_cache_size,
+                len(self._match_cache),
+            )
+
+    def clear_match_cache(self) -> None:
+        """Empty the match cache. This is done automatically whenever
+        rules are added or the map is updated.
+        """
+        with self._match_cache_lock:
+            self._match_cache.clear()
+
+        self._matcher.clear_converter_cache()
+
+    def _cached_match(
+        self, domain_part: str, path_part: str, method: str, websocket: bool
+    ) -> tuple[Rule, t.MutableMapping[str, t.Any]]:
+        key = (domain_part, path_part, method, websocket)
+
+        with self._match_cache_lock:
+            cached = self._match_cache.get(key)
+
+            if cached is not None:
+                self._match_cache.move_to_end(key)
+                self._match_cache_hits += 1
+                return cached[0], dict(cached[1])
+
+            self._match_cache_misses += 1
+
+        rule, rv = self._matcher.match(domain_part, path_part, method, websocket)
+
+        # Only rules without variable parts are cached, the values of the
+        # others are memoized per rule by the matcher instead.
+        if not rule._converters:
+            with self._match_cache_lock:
+                self._match_cache[key] = (rule, dict(rv))
+
+                if len(self._match_cache) > self.match_cache_size:
+                    self._match_cache.popitem(last=False)
+
+        return rule, rv
 
     def is_endpoint_expecting(self, endpoint: t.Any, *arguments: str) -> bool:
         """Iterate over all rules and check if the endpoint expects
@@ -179,6 +272,7 @@ class Map:
                 self._matcher.add(rule)
             self._rules_by_endpoint.setdefault(rule.endpoint, []).append(rule)
         self._remap = True
+        self.clear_match_cache()
 
     def bind(
         self,
@@ -372,6 +466,7 @@ class Map:
             self._matcher.update()
             for rules in self._rules_by_endpoint.values():
                 rules.sort(key=lambda x: x.build_compare_key())
+            self.clear_match_cache()
             self._remap = False
 
     def __repr__(self) -> str:
@@ -602,7 +697,14 @@ class MapAdapter:
         path_part = f"/{path_info.lstrip('/')}" if path_info else ""
 
         try:
-            result = self.map._matcher.match(domain_part, path_part, method, websocket)
+            if self.map.match_cache_size:
+                result = self.map._cached_match(
+                    domain_part, path_part, method, websocket
+                )
+            else:
+                result = self.map._matcher.match(
+                    domain_part, path_part, method, websocket
+                )
         except RequestPath as e:
             # safe = https://url.spec.whatwg.org/#url-path-segment-string
             new_path = quote(e.path_info, safe="!$&'()*+,/:;=@")
@@ -2,8 +2,10 @@ from __future__ import annotations
 
 import re
 import typing as t
+from collections import OrderedDict
 from dataclasses import dataclass
 from dataclasses import field
+from threading import Lock
 
 from .converters import ValidationError
 from .exceptions import NoMatch
@@ -17,23 +19,134 @@ class SlashRequired(Exception):
     pass
 
 
+_TRAILING_SLASH = [""]
+
+
+# Named groups inside a part's regex. They are turned into plain
+# groups when parts are merged into a single alternation, since the
+# same ``__werkzeug_N`` name appears in every alternative.
+_named_group_re = re.compile(r"\(\?P<[A-Za-z_][A-Za-z0-9_]*>")
+_backref_re = re.compile(r"\(\?P=|\\[1-9]")
+# The escaped static text a dynamic part starts with, before its first
+# converter group.
+_literal_prefix_re = re.compile(r"(?:\\[^A-Za-z0-9]|[^\\()\[\]{}.*+?^$|])*")
+
+
+@dataclass
+class Transition:
+    """A dynamic transition with its regex compiled ahead of time.
+
+    *groups* holds the group numbers of the converter groups in the
+    order the rule's converters expect their values.
+    """
+
+    part: RulePart
+    state: State
+    pattern: re.Pattern[str]
+    groups: tuple[int, ...]
+
+
+@dataclass
+class Dispatch:
+    """The dynamic transitions that can match parts starting with a
+    given literal prefix, in weight order. *combined* is the optional
+    alternation of the leading transitions, see
+    :func:`_combine_transitions`.
+    """
+
+    transitions: list[Transition]
+    combined: tuple[re.Pattern[str], dict[int, int]] | None = None
+
+
 @dataclass
 class State:
     """A representation of a rule state.
 
     This includes the *rules* that correspond to the state and the
     possible *static* and *dynamic* transitions to the next state.
+    *dispatch* indexes the dynamic transitions by their literal prefix
+    and is derived from *dynamic* by :meth:`StateMachineMatcher.update`.
     """
 
     dynamic: list[tuple[RulePart, State]] = field(default_factory=list)
     rules: list[Rule] = field(default_factory=list)
     static: dict[str, State] = field(default_factory=dict)
+    dispatch: dict[str, Dispatch] | None = None
+    prefix_lengths: tuple[int, ...] = ()
+
+
+def _compile_transition(part: RulePart, state: State) -> Transition:
+    pattern = re.compile(part.content)
+    names = sorted(
+        name for name in pattern.groupindex if name[:11] == "__werkzeug_"
+    )
+    groups = tuple(pattern.groupindex[name] for name in names)
+    return Transition(part, state, pattern, groups)
+
+
+def _literal_prefix(content: str) -> str:
+    """The text every string matched by *content* must start with, or
+    ``""`` if it cannot be determined safely.
+    """
+    prefix = _literal_prefix_re.match(content).group()  # type: ignore[union-attr]
+
+    if content[len(prefix) : len(prefix) + 1] not in ("", "("):
+        # The last literal may be quantified, e.g. ``ab?``.
+        return ""
+
+    return re.sub(r"\\(.)", r"\1", prefix)
+
+
+def _combine_transitions(
+    transitions: list[Transition],
+) -> tuple[re.Pattern[str], dict[int, int]] | None:
+    """Merge the leading non-final transitions into one alternation so
+    that finding the first matching transition is a single regex call.
+    Returns the pattern and a map from outer group number to transition
+    index.
+    """
+    alternatives = []
+
+    for transition in transitions:
+        content = transition.part.content
+
+        if transition.part.final or _backref_re.search(content):
+            break
+
+        alternatives.append(_named_group_re.sub("(", content))
+
+    if len(alternatives) < 2:
+        return None
+
+    try:
+        pattern = re.compile("|".join(f"({alt})" for alt in alternatives))
+    except re.error:
+        return None
+
+    index = {}
+    group = 1
+
+    for i, alternative in enumerate(alternatives):
+        index[group] = i
+        group += 1 + re.compile(alternative).groups
+
+    return pattern, index
 
 
 class StateMachineMatcher:
-    def __init__(self, merge_slashes: bool) -> None:
+    def __init__(self, merge_slashes: bool, compiled: bool = False) -> None:
         self._root = State()
         self.merge_slashes = merge_slashes
+        #: Merge the candidate dynamic transitions of each state into a
+        #: single alternation regex.
+        self.compiled = compiled
+        #: Remember up to this many converted value dicts per rule,
+        #: keyed by the raw matched values. ``0`` disables it.
+        self.converter_cache_size = 0
+        self.converter_hits = 0
+        self.converter_misses = 0
+        self._converted: dict[int, OrderedDict[tuple[str, ...], dict[str, t.Any]]] = {}
+        self._converted_lock = Lock()
 
     def add(self, rule: Rule) -> None:
         state = self._root
@@ -49,6 +162,7 @@ class StateMachineMatcher:
                 else:
                     new_state = State()
                     state.dynamic.append((part, new_state))
+                    state.dispatch = None
                     state = new_state
         state.rules.append(rule)
 
@@ -59,12 +173,76 @@ class StateMachineMatcher:
 
         def _update_state(state: State) -> None:
             state.dynamic.sort(key=lambda entry: entry[0].weight)
+            self._compile_state(state)
             for new_state in state.static.values():
                 _update_state(new_state)
             for _, new_state in state.dynamic:
                 _update_state(new_state)
 
         _update_state(state)
+        self.clear_converter_cache()
+
+    def clear_converter_cache(self) -> None:
+        with self._converted_lock:
+            self._converted.clear()
+
+    def _convert(self, rule: Rule, values: list[str]) -> dict[str, t.Any]:
+        result = {}
+        for name, value in zip(rule._converters.keys(), values):
+            result[str(name)] = rule._converters[name].to_python(value)
+        if rule.defaults:
+            result.update(rule.defaults)
+        return result
+
+    def _convert_cached(self, rule: Rule, values: list[str]) -> dict[str, t.Any]:
+        key = tuple(values)
+
+        with self._converted_lock:
+            cache = self._converted.get(id(rule))
+
+            if cache is not None and key in cache:
+                cache.move_to_end(key)
+                self.converter_hits += 1
+                return dict(cache[key])
+
+            self.converter_misses += 1
+
+        result = self._convert(rule, values)
+
+        with self._converted_lock:
+            cache = self._converted.setdefault(id(rule), OrderedDict())
+            cache[key] = result
+
+            if len(cache) > self.converter_cache_size:
+                cache.popitem(last=False)
+
+        return dict(result)
+
+    def _compile_state(self, state: State) -> dict[str, Dispatch]:
+        # Index the transitions by literal prefix. A part can only match
+        # transitions whose prefix it starts with, and all of those
+        # prefixes are prefixes of the longest one, so each index entry
+        # holds its own transitions plus those of its shorter prefixes.
+        transitions = [
+            _compile_transition(part, new_state) for part, new_state in state.dynamic
+        ]
+        prefixes = [_literal_prefix(t.part.content) for t in transitions]
+        dispatch = {}
+
+        for key in {"", *prefixes}:
+            candidates = [
+                transition
+                for transition, prefix in zip(transitions, prefixes)
+                if key.startswith(prefix)
+            ]
+            combined = _combine_transitions(candidates) if self.compiled else None
+            dispatch[key] = Dispatch(candidates, combined)
+
+        state.prefix_lengths = tuple(
+            sorted({len(key) for key in dispatch if key}, reverse=True)
+        )
+        state.dispatch = dispatch
+        return dispatch
 
     def match(
         self, domain: str, path: str, method: str, websocket: bool
@@ -77,17 +255,17 @@ class StateMachineMatcher:
         websocket_mismatch = False
 
         def _match(
-            state: State, parts: list[str], values: list[str]
+            state: State, parts: list[str], pos: int, values: list[str]
         ) -> tuple[Rule, list[str]] | None:
             # This function is meant to be called recursively, and will attempt
-            # to match the head part to the state's transitions.
+            # to match the head part (``parts[pos]``) to the state's transitions.
             nonlocal have_match_for, websocket_mismatch
 
             # The base case is when all parts have been matched via
             # transitions. Hence if there is a rule with methods &
             # websocket that work return it and the dynamic values
             # extracted.
-            if parts == []:
+            if pos == len(parts):
                 for rule in state.rules:
                     if rule.methods is not None and method not in rule.methods:
                         have_match_for.update(rule.methods)
@@ -110,41 +288,60 @@ class StateMachineMatcher:
                                 return rule, values
                 return None
 
-            part = parts[0]
+            part = parts[pos]
             # To match this part try the static transitions first
             if part in state.static:
-                rv = _match(state.static[part], parts[1:], values)
+                rv = _match(state.static[part], parts, pos + 1, values)
                 if rv is not None:
                     return rv
             # No match via the static transitions, so try the dynamic
             # ones.
-            for test_part, new_state in state.dynamic:
+            dispatch = state.dispatch
+            if dispatch is None:
+                dispatch = self._compile_state(state)
+
+            for length in state.prefix_lengths:
+                candidates = dispatch.get(part[:length])
+                if candidates is not None:
+                    break
+            else:
+                candidates = dispatch[""]
+
+            transitions = candidates.transitions
+            start = 0
+            if candidates.combined is not None:
+                # Jump straight to the first transition that matches
+                # the part, the others before it cannot match.
+                combined, index = candidates.combined
+                match = combined.match(part)
+                if match is None:
+                    start = len(index)
+                else:
+                    start = index[match.lastindex]  # type: ignore[index]
+
+            for transition in transitions[start:]:
+                test_part = transition.part
                 target = part
-                remaining = parts[1:]
+                next_parts = parts
+                next_pos = pos + 1
                 # A final part indicates a transition that always
                 # consumes the remaining parts i.e. transitions to a
                 # final state.
                 if test_part.final:
-                    target = "/".join(parts)
-                    remaining = []
-                match = re.compile(test_part.content).match(target)
+                    target = "/".join(parts[pos:])
+                    next_pos = len(parts)
+                match = transition.pattern.match(target)
                 if match is not None:
                     if test_part.suffixed:
                         # If a part_isolating=False part has a slash suffix, remove the
                         # suffix from the match and check for the slash redirect next.
                         suffix = match.groups()[-1]
                         if suffix == "/":
-                            remaining = [""]
-
-                    converter_groups = sorted(
-                        match.groupdict().items(), key=lambda entry: entry[0]
-                    )
-                    groups = [
-                        value
-                        for key, value in converter_groups
-                        if key[:11] == "__werkzeug_"
-                    ]
-                    rv = _match(new_state, remaining, values + groups)
+                            next_parts = _TRAILING_SLASH
+                            next_pos = 0
+
+                    groups = [match.group(group) for group in transition.groups]
+                    rv = _match(transition.state, next_parts, next_pos, values + groups)
                     if rv is not None:
                         return rv
 
@@ -152,7 +349,7 @@ class StateMachineMatcher:
             # trailing slash ("") consider rules that aren't
             # strict-slashes as these should match if there is a final
             # slash part.
-            if parts == [""]:
+            if pos == len(parts) - 1 and part == "":
                 for rule in state.rules:
                     if rule.strict_slashes:
                         continue
@@ -166,7 +363,7 @@ class StateMachineMatcher:
             return None
 
         try:
-            rv = _match(self._root, [domain, *path.split("/")], [])
+            rv = _match(self._root, [domain, *path.split("/")], 0, [])
         except SlashRequired:
             raise RequestPath(f"{path}/") from None
 
@@ -174,7 +371,7 @@ class StateMachineMatcher:
             # Try to match again, but with slashes merged
             path = re.sub("/{2,}?", "/", path)
             try:
-                rv = _match(self._root, [domain, *path.split("/")], [])
+                rv = _match(self._root, [domain, *path.split("/")], 0, [])
             except SlashRequired:
                 raise RequestPath(f"{path}/") from None
             if rv is None or rv[0].merge_slashes is False:
@@ -184,15 +381,13 @@ class StateMachineMatcher:
         elif rv is not None:
             rule, values = rv
 
-            result = {}
-            for name, value in zip(rule._converters.keys(), values):
-                try:
-                    value = rule._converters[name].to_python(value)
-                except ValidationError:
-                    raise NoMatch(have_match_for, websocket_mismatch) from None
-                result[str(name)] = value
-            if rule.defaults:
-                result.update(rule.defaults)
+            try:
+                if self.converter_cache_size and values:
+                    result = self._convert_cached(rule, values)
+                else:
+                    result = self._convert(rule, values)
+            except ValidationError:
+                raise NoMatch(have_match_for, websocket_mismatch) from None
 
             if rule.alias and rule.map.redirect_defaults:
                 raise RequestAliasRedirect(result, rule.endpoint)
@@ -284,6 +284,135 @@ class MultipartDecoder:
         return bytes(data[data_start:data_end]), del_index, more_data
 
 
+class ZeroCopyMultipartDecoder(MultipartDecoder):
+    """A :class:`MultipartDecoder` that avoids copying part data.
+
+    Consumed bytes are tracked with an offset into the buffer, which is
+    only compacted once the consumed prefix is at least half of it. The
+    boundary search continues from where the previous one stopped, and
+    :class:`Data` events carry :class:`memoryview` slices of the buffer
+    instead of copies.
+
+    A view is only valid until the next call to :meth:`receive_data` or
+    :meth:`next_event`, which release it. Copy the data if it has to be
+    kept longer.
+    """
+
+    def __init__(
+        self,
+        boundary: bytes,
+        max_form_memory_size: int | None = None,
+        *,
+        max_parts: int | None = None,
+    ) -> None:
+        super().__init__(boundary, max_form_memory_size, max_parts=max_parts)
+        self._start = 0
+        self._view: memoryview | None = None
+        self._boundary_marker = b"--" + boundary
+
+    def _release(self) -> None:
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+
+    def _compact(self) -> None:
+        if self._start:
+            del self.buffer[: self._start]
+            self._start = 0
+
+    def receive_data(self, data: bytes | None) -> None:
+        self._release()
+
+        if self._start and self._start * 2 >= len(self.buffer):
+            self._compact()
+
+        if (
+            data is not None
+            and self.max_form_memory_size is not None
+            and len(self.buffer) - self._start + len(data) > self.max_form_memory_size
+        ):
+            raise RequestEntityTooLarge()
+
+        if data is None:
+            self.complete = True
+        else:
+            self.buffer.extend(data)
+
+    def next_event(self) -> Event:
+        self._release()
+
+        if self.state not in {State.DATA_START, State.DATA}:
+            # Headers, preamble and epilogue are small, use the copying
+            # implementation for them.
+            self._compact()
+            return super().next_event()
+
+        event: Event = NEED_DATA
+        start = self.state == State.DATA_START
+        data_start, data_end, more_data = self._find_data(start=start)
+
+        if start or data_end > data_start or not more_data:
+            base = memoryview(self.buffer)
+            self._view = base[data_start:data_end]
+            base.release()
+            event = Data(data=t.cast(bytes, self._view), more_data=more_data)
+
+            if start and more_data:
+                self.state = State.DATA
+
+        if self.complete and isinstance(event, NeedData):
+            raise ValueError(f"Invalid form-data cannot parse beyond {self.state}")
+
+        return event
+
+    def _last_newline_from(self, start: int) -> int:
+        end = len(self.buffer)
+        last_nl = self.buffer.rfind(b"\n", start)
+        last_cr = self.buffer.rfind(b"\r", start)
+        return min(end if last_nl == -1 else last_nl, end if last_cr == -1 else last_cr)
+
+    def _find_data(self, *, start: bool) -> tuple[int, int, bool]:
+        # Same rules as _parse_data, but working on offsets into the
+        # buffer and marking the data before ``data_end`` as consumed.
+        pos = self._start
+
+        if start:
+            match = LINE_BREAK_RE.match(self.buffer, pos)
+            data_start = t.cast(t.Match[bytes], match).end()
+        else:
+            data_start = pos
+
+        marker = self._boundary_marker
+        found = self.buffer.find(marker, pos)
+
+        if found == -1:
+            data_end = del_index = self._last_newline_from(data_start)
+
+            if (len(self.buffer) - data_end) > len(marker) + 1:
+                data_end = del_index = len(self.buffer)
+
+            more_data = True
+        else:
+            # No match can start before the line break preceding the
+            # first marker, don't search the bytes find() already did.
+            match = self.boundary_re.search(self.buffer, max(pos, found - 2))
+
+            if match is not None:
+                if match.group(1).startswith(b"--"):
+                    self.state = State.EPILOGUE
+                else:
+                    self.state = State.PART
+                data_end = match.start()
+                del_index = match.end()
+            else:
+                data_end = del_index = self._last_newline_from(data_start)
+
+            more_data = match is None
+
+        self._start = del_index
+        return data_start, data_end, more_data
+
+
 class MultipartEncoder:
     def __init__(self, boundary: bytes) -> None:
         self.boundary = boundary
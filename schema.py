@@ -0,0 +1,80 @@
+# 起動時のスキーマ確認
+#
+# 以前は各ワーカーの import 時に create_all()（テーブルごとの存在確認）と
+# 初期データの有無の確認をしていた。ここではモデル定義から作った DDL の
+# ハッシュ（フィンガープリント）を schema_version テーブルに保存しておき、
+# 起動時は1行読んで一致すれば何もしない。一致しないとき（初回・モデル変更後）
+# だけ create_all() を実行してフィンガープリントを更新する。
+import hashlib
+import logging
+import time
+
+import sqlalchemy as sa
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.schema import CreateTable
+
+logger = logging.getLogger(__name__)
+
+
+def schema_version_table(db):
+    return db.Table(
+        'schema_version',
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column('fingerprint', sa.String(64), nullable=False),
+        sa.Column('applied_at', sa.Integer, nullable=False),
+    )
+
+
+def schema_fingerprint(db):
+    # 接続先の方言でコンパイルした DDL をテーブル名順に並べてハッシュする
+    dialect = db.engine.dialect
+    digest = hashlib.sha256()
+    for table in sorted(db.metadata.tables.values(), key=lambda t: t.name):
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode('utf-8'))
+        for index in sorted(table.indexes, key=lambda i: i.name or ''):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def stored_fingerprint(db, table):
+    try:
+        with db.engine.connect() as conn:
+            return conn.execute(
+                sa.select(table.c.fingerprint).where(table.c.id == 1)
+            ).scalar()
+    except SQLAlchemyError:
+        # schema_version 自体がまだない
+        return None
+
+
+# 一致すれば False、create_all を実行したら True
+def ensure_schema(db, table):
+    started = time.perf_counter()
+    fingerprint = schema_fingerprint(db)
+
+    if stored_fingerprint(db, table) == fingerprint:
+        logger.info("Schema up to date (%.1f ms)", (time.perf_counter() - started) * 1000)
+        return False
+
+    logger.info("Schema fingerprint changed; running create_all")
+    db.create_all()
+    with db.engine.begin() as conn:
+        updated = conn.execute(
+            sa.update(table)
+            .where(table.c.id == 1)
+            .values(fingerprint=fingerprint, applied_at=int(time.time()))
+        ).rowcount
+    if not updated:
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(
+                    sa.insert(table).values(id=1, fingerprint=fingerprint, applied_at=int(time.time()))
+                )
+        except IntegrityError:
+            # 同時に起動した別のワーカーが先に書いた
+            pass
+
+    logger.info("Schema created/updated (%.1f ms)", (time.perf_counter() - started) * 1000)
+    return True
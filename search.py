@@ -0,0 +1,407 @@
+# /api/search 用のプロセス内転置インデックス
+#
+# LIKE '%...%' は全件スキャンになるうえ、ブラウザ側で全件を落として絞り込む
+# 方式は件数に比例して遅くなる。ここでは法案・ツイートの本文から転置インデックスを
+# 作り、以後はコミットシグナルで差分だけ反映する。
+#
+# インデックスは各ワーカーで最初の検索のときに作る。起動時に作ると、検索しない
+# CLI のコマンドまで全件を読むうえ、fork 前の親プロセスの分が無駄になる。
+#
+# 分かち書きをしない日本語・中国語・韓国語は文字 bigram、それ以外は単語で
+# トークン化する。スコアは TF-IDF の合計（全トークンを含む文書だけが対象）。
+#
+# インデックスはワーカーごとに持つ。ORM のコミットで追加・更新・削除された行の id は
+# 共有の変更ログ（MmapChangeLog）に書き、他のワーカーは検索時にその行だけを読み直す
+# （読めなければ削除済み）。
+#
+# models_committed は ORM のセッション経由の書き込みでしか飛ばない。Core の
+# INSERT や bulk_save_objects（seed、flask db import）で行を足すときは、書いた側で
+# テーブルの世代を上げること（response_cache.bump）。世代が変わっていたら
+# 「前回より大きい id」を読んで取り込む。ORM を通さない UPDATE・DELETE は拾えない
+# ので、その場合はワーカーを再起動してインデックスを作り直す。
+import bisect
+import fcntl
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import unicodedata
+from collections import Counter
+
+import sqlalchemy as sa
+from flask_sqlalchemy.track_modifications import models_committed
+
+from .response_cache import open_private
+
+logger = logging.getLogger(__name__)
+
+# ひらがな・カタカナ・CJK統合漢字（拡張A含む）・ハングル
+_CJK = '\u3040-\u30ff\u31f0-\u31ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af'
+_TOKEN_RE = re.compile(f'([{_CJK}]+)|([^\\W{_CJK}]+)')
+
+
+def tokenize(text):
+    if not text:
+        return []
+
+    tokens = []
+    text = unicodedata.normalize('NFKC', text).lower()
+    for cjk, word in _TOKEN_RE.findall(text):
+        if word:
+            tokens.append(word)
+        elif len(cjk) == 1:
+            tokens.append(cjk)
+        else:
+            tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+    return tokens
+
+
+class SearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = {}     # token -> {doc_key: tf}
+        self._docs = {}         # doc_key -> (トークン数, トークン一覧)
+        self._terms = []        # 前方一致用のソート済み語彙（CJK以外）
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, key, text):
+        tokens = Counter(tokenize(text))
+
+        with self._lock:
+            self._remove(key)
+            if not tokens:
+                return
+
+            for token, tf in tokens.items():
+                docs = self._postings.get(token)
+                if docs is None:
+                    docs = self._postings[token] = {}
+                    if not _is_cjk(token):
+                        bisect.insort(self._terms, token)
+                docs[key] = tf
+            self._docs[key] = (sum(tokens.values()), tuple(tokens))
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+
+        for token in doc[1]:
+            docs = self._postings[token]
+            del docs[key]
+            if not docs:
+                del self._postings[token]
+                if not _is_cjk(token):
+                    index = bisect.bisect_left(self._terms, token)
+                    del self._terms[index]
+
+    # kinds で絞り込み、(key, score) をスコア順に返す
+    def search(self, query, kinds=None):
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        with self._lock:
+            total = len(self._docs) or 1
+            groups = []
+            for i, token in enumerate(tokens):
+                # 入力途中の最後の単語は前方一致にする
+                if i == len(tokens) - 1 and not _is_cjk(token):
+                    groups.append(self._prefix_postings(token))
+                else:
+                    groups.append([self._postings.get(token, {})])
+
+            # 一番件数の少ないトークンから候補を絞る
+            order = sorted(range(len(groups)), key=lambda i: sum(len(d) for d in groups[i]))
+            candidates = None
+            for i in order:
+                docs = set()
+                for postings in groups[i]:
+                    docs.update(postings)
+                if kinds is not None:
+                    docs = {key for key in docs if key[0] in kinds}
+                candidates = docs if candidates is None else candidates & docs
+                if not candidates:
+                    return []
+
+            scores = {}
+            for postings_list in groups:
+                for postings in postings_list:
+                    idf = math.log(1 + total / len(postings))
+                    # 小さい方を回す
+                    if len(postings) < len(candidates):
+                        matched = ((key, tf) for key, tf in postings.items() if key in candidates)
+                    else:
+                        matched = ((key, postings[key]) for key in candidates if key in postings)
+                    for key, tf in matched:
+                        scores[key] = scores.get(key, 0.0) + tf / self._docs[key][0] * idf
+
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def _prefix_postings(self, prefix):
+        start = bisect.bisect_left(self._terms, prefix)
+        out = []
+        for term in self._terms[start:start + 256]:
+            if not term.startswith(prefix):
+                break
+            out.append(self._postings[term])
+        return out
+
+
+def _is_cjk(token):
+    return re.match(f'[{_CJK}]', token) is not None
+
+
+class MmapChangeLog:
+    """全ワーカーで共有する「変更された行」のリングバッファ。
+
+    ORM のコミットで追加・更新・削除された (kind, id) を書き、ほかのワーカーは
+    検索のときに前回読んだ位置から先を読んで、その行だけを読み直す。
+    slots 件より遅れたワーカーは取りこぼしがあるので全件を読み直す。
+
+    ファイル名にスロット数を付ける（{path}.{slots}）。スロット数を変えたデプロイでも
+    動いているワーカーがマップ中のファイルを縮めず、新しいファイルを使う。
+    ファイルはモード 0600 で作り、他のユーザーのもの・シンボリックリンクは使わない。
+    """
+
+    # ヘッダー = 最後に書いた通し番号
+    _header = struct.Struct('<Q')
+    # 1件 = 通し番号 + 書いたログの識別子 + kind の番号 + 行の id
+    _entry = struct.Struct('<QIIq')
+
+    def __init__(self, path, slots=1 << 16):
+        self.slots = slots
+        self.path = f"{path}.{slots}"
+        self._size = self._header.size + slots * self._entry.size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._map = None
+        self._writer = None
+
+        fd = open_private(self.path, create=True)
+        try:
+            # 新しいファイルを空から1回だけ広げる。広げる前にマップするプロセスはない
+            # （どのプロセスもロックを取ってから大きさを確かめる）
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                current = os.fstat(fd).st_size
+                if current == 0:
+                    os.ftruncate(fd, self._size)
+                elif current != self._size:
+                    raise RuntimeError(f"{self.path} is {current} bytes, expected {self._size}")
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def _open(self):
+        # flock は open したファイル記述ごとなので fork 後は開き直す
+        pid = os.getpid()
+        if self._pid != pid:
+            self._fd = open_private(self.path)
+            self._map = mmap.mmap(self._fd, self._size)
+            # 自分で書いた分を読み飛ばすための識別子（fork した子は別になる）
+            self._writer = int.from_bytes(os.urandom(4), 'little')
+            self._pid = pid
+        return self._fd, self._map
+
+    def _offset(self, seq):
+        return self._header.size + (seq % self.slots) * self._entry.size
+
+    def position(self):
+        # 8バイト境界の読み込みなのでロックなしでも値が壊れることはない
+        _, buf = self._open()
+        return self._header.unpack_from(buf, 0)[0]
+
+    def append(self, changes):
+        """changes は (kind の番号, id) の列。"""
+        with self._lock:
+            fd, buf = self._open()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                seq, = self._header.unpack_from(buf, 0)
+                for kind, obj_id in changes:
+                    seq += 1
+                    self._entry.pack_into(buf, self._offset(seq), seq, self._writer, kind, obj_id)
+                self._header.pack_into(buf, 0, seq)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def read(self, since):
+        """since より後の (kind の番号, id) を読み、(新しい位置, 変更) を返す。
+        このログから書いた分は除く。追い越されていたら変更は None。"""
+        with self._lock:
+            fd, buf = self._open()
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            try:
+                current, = self._header.unpack_from(buf, 0)
+                if current - since > self.slots:
+                    return current, None
+
+                changes = []
+                for seq in range(since + 1, current + 1):
+                    _, writer, kind, obj_id = self._entry.unpack_from(buf, self._offset(seq))
+                    if writer != self._writer:
+                        changes.append((kind, obj_id))
+                return current, changes
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class SearchService:
+    """モデルと SearchIndex をつなぐ。sources は {kind: (model, text_columns)}。"""
+
+    def __init__(self, app=None, db=None, sources=None, generations=None):
+        self.db = db
+        self.sources = sources or {}
+        self.generations = generations
+        self.changes = None
+        self.index = SearchIndex()
+        self._tables = {}
+        self._kinds = []
+        self._max_ids = {}
+        self._dirty = {}
+        self._generation = None
+        self._position = 0
+        self._built = False
+        self._sync_lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app, db, sources, generations)
+
+    def init_app(self, app, db=None, sources=None, generations=None):
+        if db is not None:
+            self.db = db
+        if sources is not None:
+            self.sources = sources
+        if generations is not None:
+            self.generations = generations
+
+        # 変更ログのパス。None ならワーカー間で更新・削除を伝えない（単一プロセス用）
+        app.config.setdefault('SEARCH_CHANGES_MMAP_PATH', None)
+        app.config.setdefault('SEARCH_CHANGES_SLOTS', 1 << 16)
+        path = app.config['SEARCH_CHANGES_MMAP_PATH']
+        if path is not None:
+            self.changes = MmapChangeLog(path, app.config['SEARCH_CHANGES_SLOTS'])
+
+        self._tables = {
+            model.__table__.name: kind for kind, (model, _) in self.sources.items()
+        }
+        # 変更ログには kind を番号で書く（どのワーカーも同じ sources の順）
+        self._kinds = list(self.sources)
+        models_committed.connect(self._on_models_committed, app)
+        app.extensions['search'] = self
+
+    # 全件を読む（app_context 内で呼ぶ）。普通は最初の検索で自動的に呼ばれる
+    def build(self):
+        self._generation = self._current_generation()
+        # 読んでいる間に書かれた変更は次の検索で読み直す
+        self._position = self.changes.position() if self.changes is not None else 0
+        for kind in self.sources:
+            self._load(kind, self._rows_after(kind, None))
+        self._built = True
+        logger.info("Search index built with %d documents", len(self.index))
+
+    def search(self, query, kinds=None):
+        if not self._built:
+            # 同時に来た最初の検索は1つだけが読み、ほかは待つ
+            with self._build_lock:
+                if not self._built:
+                    self.build()
+        self._catch_up()
+        return self.index.search(query, kinds)
+
+    def _select(self, kind):
+        model, columns = self.sources[kind]
+        table = model.__table__
+        return table, sa.select(table.c.id, *(table.c[column] for column in columns))
+
+    def _rows_after(self, kind, after_id):
+        table, stmt = self._select(kind)
+        if after_id is not None:
+            stmt = stmt.where(table.c.id > after_id)
+        return stmt.order_by(table.c.id)
+
+    def _load(self, kind, stmt, expected=()):
+        missing = set(expected)
+        with self.db.engine.connect() as conn:
+            for row in conn.execute(stmt):
+                missing.discard(row[0])
+                self.index.add((kind, row[0]), '\n'.join(value or '' for value in row[1:]))
+                self._max_ids[kind] = max(self._max_ids.get(kind, 0), row[0])
+
+        # 読めなかった行は削除済み
+        for obj_id in missing:
+            self.index.remove((kind, obj_id))
+
+    def _current_generation(self):
+        if self.generations is None:
+            return None
+        return self.generations.get(tuple(self._tables))
+
+    # 自分のコミットで変わった行と、他のワーカーで変わった行を取り込む
+    def _catch_up(self):
+        generation = self._current_generation()
+        position = self.changes.position() if self.changes is not None else 0
+        if not self._dirty and generation == self._generation and position == self._position:
+            return
+
+        with self._sync_lock:
+            dirty, self._dirty = self._dirty, {}
+
+            if self.changes is not None and position != self._position:
+                self._position, changes = self.changes.read(self._position)
+                if changes is None:
+                    # 変更ログに追い越された。何が変わったか分からないので作り直す
+                    logger.warning("Search index fell behind the change log, rebuilding")
+                    self._rebuild()
+                    return
+                for kind, obj_id in changes:
+                    if kind < len(self._kinds):
+                        dirty.setdefault(self._kinds[kind], set()).add(obj_id)
+
+            for kind, ids in dirty.items():
+                table, stmt = self._select(kind)
+                self._load(kind, stmt.where(table.c.id.in_(ids)), ids)
+
+            if generation != self._generation:
+                for kind in self.sources:
+                    self._load(kind, self._rows_after(kind, self._max_ids.get(kind, 0)))
+                self._generation = generation
+
+    def _rebuild(self):
+        index = SearchIndex()
+        self.index, self._max_ids = index, {}
+        self.build()
+
+    def _on_models_committed(self, sender, changes):
+        # コミット後の属性は expire 済みなので、ここでは読まずに id だけ控えて
+        # 次の検索でまとめて1クエリで読む
+        logged = []
+        for obj, operation in changes:
+            kind = self._tables.get(obj.__table__.name)
+            if kind is None:
+                continue
+
+            obj_id = sa.inspect(obj).identity[0]
+            logged.append((self._kinds.index(kind), obj_id))
+            if operation == 'delete':
+                self.index.remove((kind, obj_id))
+            else:
+                # _catch_up が _dirty を差し替えている途中に足すと取りこぼす
+                with self._sync_lock:
+                    self._dirty.setdefault(kind, set()).add(obj_id)
+
+        if logged and self.changes is not None:
+            self.changes.append(logged)
@@ -0,0 +1,33 @@
+# テスト共通の設定
+#
+# application は読み込み時に設定を読むので、どのテストよりも先に SQLite と
+# 一時ファイルへ差し替える（bench.py と同じ）。
+import os
+import tempfile
+
+import pytest
+
+_workdir = tempfile.mkdtemp(prefix='deathbill-test-')
+
+for key, value in {
+    'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(_workdir, 'test.db')}",
+    'SQLALCHEMY_ENGINE_OPTIONS': '{}',
+    'SQLALCHEMY_POOL_WARM': '0',
+    'SQLALCHEMY_RECORD_QUERIES_DIR': 'null',
+    'SQLALCHEMY_QUERY_CACHE_MMAP_PATH': os.path.join(_workdir, 'query-cache.bin'),
+    'RESPONSE_CACHE_MMAP_PATH': os.path.join(_workdir, 'generations.bin'),
+    'DEDUP_MMAP_PATH': os.path.join(_workdir, 'dedup.bin'),
+    'SEARCH_CHANGES_MMAP_PATH': os.path.join(_workdir, 'search-changes.bin'),
+    'VOTE_JOURNAL_DIR': os.path.join(_workdir, 'votes'),
+}.items():
+    os.environ.setdefault(f'FLASK_{key}', value)
+
+
+@pytest.fixture
+def app_ctx():
+    from ..application import application, db
+
+    with application.app_context():
+        db.create_all()
+        yield application
+        db.session.remove()
@@ -0,0 +1,79 @@
+# リプレイベンチマーク（bench.py）
+import json
+
+from ..application import application, db
+from ..bench import Replayer, load_records, summarize
+
+
+def write_records(path, records):
+    with open(path, 'w') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+
+def test_streaming_requests_are_skipped_and_the_rest_stay_aligned(app_ctx, tmp_path, monkeypatch):
+    path = tmp_path / 'traffic.jsonl'
+    write_records(path, [
+        {'method': 'GET', 'path': '/api/bills/stream'},
+        {'method': 'GET', 'path': '/api/bills'},
+        {'method': 'GET', 'path': '/api/tweets', 'query': 'page=1'},
+        {'method': 'POST', 'path': '/api/bills/1/vote', 'body': '{}', 'body_truncated': True},
+    ])
+
+    # 実際に送られたパスを記録する
+    sent = []
+    wsgi_app = application.wsgi_app
+
+    def recording_app(environ, start_response):
+        sent.append(environ['PATH_INFO'])
+        return wsgi_app(environ, start_response)
+
+    monkeypatch.setattr(application, 'wsgi_app', recording_app)
+
+    replayer = Replayer(application, db, load_records(str(path)))
+    assert replayer.skipped_streams == 1
+    assert replayer.endpoints == ['list_bills', 'list_tweets']
+
+    results = []
+    replayer.run_thread(0, 2, 1, 0, results)
+
+    assert sent == ['/api/bills', '/api/tweets']
+    assert [(endpoint, status) for endpoint, _, _, status, _ in results] == [
+        ('list_bills', 200),
+        ('list_tweets', 200),
+    ]
+    rows, _ = summarize(results)
+    assert [row['endpoint'] for row in rows] == ['list_bills', 'list_tweets', 'TOTAL']
+
+
+def test_load_records_decodes_base64_bodies(tmp_path):
+    path = tmp_path / 'traffic.jsonl'
+    write_records(path, [
+        {'method': 'post', 'path': '/x', 'body': 'aGVsbG8=', 'body_encoding': 'base64'},
+        {'path': '/y', 'body': 'text'},
+    ])
+
+    assert load_records(str(path)) == [
+        ('POST', '/x', '', {}, b'hello'),
+        ('GET', '/y', '', {}, b'text'),
+    ]
+
+
+def test_paths_with_braces_are_replayed_as_is(app_ctx, tmp_path, monkeypatch):
+    path = tmp_path / 'traffic.jsonl'
+    write_records(path, [{'method': 'GET', 'path': '/api/bills/{id}'}])
+
+    sent = []
+    wsgi_app = application.wsgi_app
+
+    def recording_app(environ, start_response):
+        sent.append(environ['PATH_INFO'])
+        return wsgi_app(environ, start_response)
+
+    monkeypatch.setattr(application, 'wsgi_app', recording_app)
+
+    results = []
+    Replayer(application, db, load_records(str(path))).run_thread(0, 1, 1, 0, results)
+
+    assert sent == ['/api/bills/{id}']
+    assert results[0][3] == 404
@@ -0,0 +1,56 @@
+# bill_detail_query のクエリ数の確認
+#
+# 詳細は selectinload でまとめて読むので、コメント数に関係なく
+# Bill・Evidence・Comment・Reply・Comment.file の5本で済むはず。
+# コメントごとに遅延読み込みが走る（N+1 に戻る）とここで落ちる。
+import time
+
+import pytest
+import sqlalchemy as sa
+
+from ..application import application, db, Bill, Comment, Reply, Evidence, bill_detail_query, serialize_bill_detail
+
+EXPECTED_QUERIES = 5
+
+
+@pytest.fixture(scope='module')
+def bills():
+    now = int(time.time())
+    with application.app_context():
+        db.create_all()
+        for bill_id, n_comments in ((1001, 1), (1002, 500)):
+            db.session.add(Bill(id=bill_id, title=f'bill {bill_id}', description='test', timestamp=now))
+            db.session.add(Evidence(bill_id=bill_id, name='e.png', type='image/png', file_url='/e.png'))
+            for i in range(n_comments):
+                file = Evidence(name=f'c{i}.png', type='image/png', file_url=f'/c{i}.png')
+                comment = Comment(bill_id=bill_id, content=f'comment {i}', timestamp=now, file=file)
+                comment.replies.append(Reply(content='reply', timestamp=now))
+                db.session.add(comment)
+        db.session.commit()
+        yield {1001: 1, 1002: 500}
+
+
+def count_queries(bill_id):
+    queries = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        queries.append(statement)
+
+    with application.app_context():
+        engine = db.engine
+        sa.event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            bill = db.session.execute(bill_detail_query(bill_id)).scalar_one()
+            data = serialize_bill_detail(bill)
+        finally:
+            sa.event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+            db.session.remove()
+    return queries, data
+
+
+@pytest.mark.parametrize('bill_id', [1001, 1002])
+def test_bill_detail_query_count_is_constant(bills, bill_id):
+    queries, data = count_queries(bill_id)
+    assert len(data['comments']) == bills[bill_id]
+    assert all(c['file'] and len(c['replies']) == 1 for c in data['comments'])
+    assert len(queries) == EXPECTED_QUERIES, queries
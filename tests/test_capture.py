@@ -0,0 +1,93 @@
+# werkzeug.middleware.capture（本番リクエストの記録）
+import json
+import os
+import subprocess
+import sys
+
+from werkzeug.middleware.capture import CaptureMiddleware
+from werkzeug.test import Client
+from werkzeug.wrappers import Request, Response
+
+
+@Request.application
+def app(request):
+    return Response(request.get_data(), status=201)
+
+
+def dead_pid():
+    proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+    proc.wait()
+    return proc.pid
+
+
+# レスポンスを閉じたときに記録されるので、テストでは buffered=True で閉じる
+def capture(tmp_path, **kwargs):
+    kwargs.setdefault('sample_rate', 1.0)
+    kwargs.setdefault('flush_interval', 3600)
+    kwargs.setdefault('headers', ('X-User-Token', 'Content-Type'))
+    return CaptureMiddleware(app, str(tmp_path), **kwargs)
+
+
+def read_records(tmp_path):
+    records = []
+    for name in sorted(os.listdir(tmp_path)):
+        with open(tmp_path / name) as f:
+            records.extend(json.loads(line) for line in f)
+    return records
+
+
+def test_records_and_redacts_requests(tmp_path):
+    middleware = capture(tmp_path, redact_headers=['X-User-Token'], redact_query=['token'], max_body=8)
+    client = Client(middleware)
+
+    client.post('/a', buffered=True, query_string='token=secret&page=2', data='ok', headers={'X-User-Token': 'user-1'})
+    client.post('/b', buffered=True, data=b'\xff\xfe')
+    client.post('/c', buffered=True, data=b'x' * 100)
+    middleware.flush()
+
+    first, second, third = read_records(tmp_path)
+    assert first['path'] == '/a'
+    assert first['status'] == 201
+    assert first['body'] == 'ok'
+    assert 'secret' not in first['query'] and 'page=2' in first['query']
+    assert first['headers']['X-User-Token'].startswith('redacted:')
+    assert second['body_encoding'] == 'base64'
+    assert third['body_truncated'] is True and 'body' not in third
+
+    # 同じ値は同じハッシュになる
+    client.get('/d', buffered=True, headers={'X-User-Token': 'user-1'})
+    middleware.flush()
+    assert read_records(tmp_path)[-1]['headers']['X-User-Token'] == first['headers']['X-User-Token']
+
+
+def test_full_buffer_drops_oldest(tmp_path):
+    middleware = capture(tmp_path, capacity=2)
+    client = Client(middleware)
+
+    for path in ('/1', '/2', '/3'):
+        client.get(path, buffered=True)
+    middleware.flush()
+
+    assert middleware.dropped == 1
+    assert [record['path'] for record in read_records(tmp_path)] == ['/2', '/3']
+
+
+def test_prunes_files_of_all_processes(tmp_path):
+    dead = dead_pid()
+    old = [tmp_path / f'capture-{dead}-{i}.jsonl' for i in (1, 2, 3)]
+    live = tmp_path / f'capture-{os.getppid()}-1.jsonl'
+
+    for i, path in enumerate([*old, live]):
+        path.write_text('{}\n')
+        os.utime(path, (1000 + i, 1000 + i))
+
+    middleware = capture(tmp_path, backup_count=2, max_files=3)
+    Client(middleware).get('/x', buffered=True)
+    middleware.flush()
+
+    names = set(os.listdir(tmp_path))
+    # 終了したプロセスの分は backup_count を超えた分と、古いものから消える。
+    # 動いているプロセスが書いているファイルは残す
+    assert old[0].name not in names
+    assert old[1].name not in names
+    assert {old[2].name, live.name, f'capture-{os.getpid()}-1.jsonl'} == names
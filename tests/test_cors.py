@@ -0,0 +1,109 @@
+# flask_cors のリソース照合とヘッダーのキャッシュ
+import re
+
+import pytest
+from flask import Flask
+from flask_cors import CORS
+from flask_cors.core import CompiledResource, ResourceMatcher
+
+OPTIONS = {'origins': ['*'], 'allow_headers': ['*']}
+
+
+def match(matcher, path):
+    resource = matcher.match(path)
+    return None if resource is None else resource.pattern
+
+
+def test_matcher_returns_first_resource_in_order():
+    matcher = ResourceMatcher([
+        (r'/api/(v1)/.*', OPTIONS),
+        (r'/api/.*', OPTIONS),
+        ('/exact', OPTIONS),
+        (re.compile(r'/compiled/\d+'), OPTIONS),
+    ])
+
+    assert matcher._combined is not None
+    assert match(matcher, '/api/v1/bills') == r'/api/(v1)/.*'
+    assert match(matcher, '/api/bills') == r'/api/.*'
+    assert match(matcher, '/exact') == '/exact'
+    assert match(matcher, '/exact/more') is None
+    assert match(matcher, '/compiled/12').pattern == r'/compiled/\d+'
+    assert match(matcher, '/other') is None
+
+
+@pytest.mark.parametrize('patterns', [
+    # 番号付き後方参照は結合すると番号がずれる
+    [r'/(a)/.*', r'/(x)\1'],
+    # 同じ名前のグループは結合できない
+    [r'/(?P<id>a)/.*', r'/(?P<id>x)x'],
+])
+def test_matcher_falls_back_to_scanning(patterns):
+    matcher = ResourceMatcher([(pattern, OPTIONS) for pattern in patterns])
+
+    assert matcher._combined is None
+    assert match(matcher, '/a/b') == patterns[0]
+    assert match(matcher, '/xx') == patterns[1]
+    assert match(matcher, '/xy') is None
+
+
+class Headers(dict):
+    def get(self, key, default=None):
+        return super().get(key, default)
+
+
+def test_compiled_resource_caches_headers_per_request_key():
+    resource = CompiledResource('/api/*', {
+        'origins': ['https://a.example', r'https://.*\.b\.example'],
+        'allow_headers': ['*'],
+        'expose_headers': None,
+        'methods': 'GET, POST',
+        'max_age': None,
+        'send_wildcard': False,
+        'always_send': True,
+        'automatic_options': True,
+        'vary_header': True,
+        'supports_credentials': False,
+        'allow_private_network': False,
+    }, cache_size=2)
+
+    first = resource.get_headers(Headers(Origin='https://a.example'), 'GET')
+    assert dict(first)['Access-Control-Allow-Origin'] == 'https://a.example'
+    assert resource.get_headers(Headers(Origin='https://a.example'), 'GET') is first
+
+    sub = dict(resource.get_headers(Headers(Origin='https://x.b.example'), 'GET'))
+    assert sub['Access-Control-Allow-Origin'] == 'https://x.b.example'
+    assert 'Access-Control-Allow-Origin' not in dict(
+        resource.get_headers(Headers(Origin='https://evil.example'), 'GET')
+    )
+    assert len(resource._cache) == 2
+
+
+def test_app_preflight_and_simple_requests():
+    app = Flask(__name__)
+    CORS(app, resources={
+        r'/private/*': {'origins': ['https://a.example']},
+        r'/api/*': {'origins': '*'},
+    })
+
+    @app.route('/private/x')
+    @app.route('/api/x')
+    def view():
+        return 'ok'
+
+    client = app.test_client()
+
+    response = client.get('/api/x', headers={'Origin': 'https://other.example'})
+    assert response.headers['Access-Control-Allow-Origin'] == 'https://other.example'
+
+    response = client.get('/private/x', headers={'Origin': 'https://other.example'})
+    assert 'Access-Control-Allow-Origin' not in response.headers
+
+    for _ in range(2):
+        response = client.options('/private/x', headers={
+            'Origin': 'https://a.example',
+            'Access-Control-Request-Method': 'POST',
+            'Access-Control-Request-Headers': 'X-User-Token',
+        })
+        assert response.headers['Access-Control-Allow-Origin'] == 'https://a.example'
+        assert 'POST' in response.headers['Access-Control-Allow-Methods']
+        assert response.headers['Access-Control-Allow-Headers'].lower() == 'x-user-token'
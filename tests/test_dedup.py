@@ -0,0 +1,75 @@
+# 投票・いいねの重複チェック
+import os
+import stat
+
+import pytest
+
+from ..dedup import MemoryDedupStore, MmapDedupStore
+
+
+def test_add_and_contains(tmp_path):
+    store = MmapDedupStore(60, str(tmp_path / 'dedup.bin'), slots=64)
+
+    assert store.add('user', 'bill_vote', 1)
+    assert not store.add('user', 'bill_vote', 1)
+    assert store.add('user', 'bill_vote', 2)
+    assert store.contains('user', 'bill_vote', 1)
+    assert not store.contains('other', 'bill_vote', 1)
+
+
+def test_full_table_rejects_instead_of_evicting(tmp_path):
+    store = MmapDedupStore(60, str(tmp_path / 'dedup.bin'), slots=4)
+
+    for user in range(4):
+        assert store.add(f'user{user}', 'bill_vote', 1)
+
+    # 埋まっていても古い票を追い出さない
+    assert not store.add('late', 'bill_vote', 1)
+    assert store.overflows == 1
+    for user in range(4):
+        assert not store.add(f'user{user}', 'bill_vote', 1)
+
+
+def test_full_table_falls_back_to_overflow(tmp_path, monkeypatch):
+    clock = [1_000_000.0]
+    monkeypatch.setattr('time.time', lambda: clock[0])
+    overflow = MemoryDedupStore(60)
+    store = MmapDedupStore(60, str(tmp_path / 'dedup.bin'), slots=4, overflow=overflow)
+
+    for user in range(4):
+        assert store.add(f'user{user}', 'bill_vote', 1)
+
+    clock[0] += 30
+    assert store.add('late', 'bill_vote', 1)
+    assert store.overflows == 1
+    assert store.contains('late', 'bill_vote', 1)
+    assert not store.add('late', 'bill_vote', 1)
+
+    # mmap 側に空きができても overflow に入っているキーは二重に登録しない
+    clock[0] += 40
+    assert not store.add('late', 'bill_vote', 1)
+    assert store.add('user0', 'bill_vote', 1)
+
+    clock[0] += 30
+    assert store.add('late', 'bill_vote', 1)
+
+
+def test_file_is_private_and_named_by_slots(tmp_path):
+    store = MmapDedupStore(60, str(tmp_path / 'dedup.bin'), slots=64)
+    store.add('user', 'bill_vote', 1)
+
+    assert store.path == str(tmp_path / 'dedup.bin.64')
+    assert stat.S_IMODE(os.stat(store.path).st_mode) == 0o600
+
+    other = MmapDedupStore(60, str(tmp_path / 'dedup.bin'), slots=128)
+    assert other.path != store.path
+    assert not other.contains('user', 'bill_vote', 1)
+
+
+def test_refuses_file_readable_by_others(tmp_path):
+    path = tmp_path / 'dedup.bin.64'
+    path.touch()
+    path.chmod(0o644)
+
+    with pytest.raises(PermissionError):
+        MmapDedupStore(60, str(tmp_path / 'dedup.bin'), slots=64)
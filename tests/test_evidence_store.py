@@ -0,0 +1,93 @@
+# 証拠ファイルの重複排除と参照数
+import os
+
+import pytest
+import sqlalchemy as sa
+
+from ..application import db, Evidence, evidence_store
+from ..uploads import UploadPart
+
+
+@pytest.fixture
+def store(app_ctx, tmp_path, monkeypatch):
+    # アプリの EvidenceStore をそのまま使い、保存先だけ一時ディレクトリにする
+    folder = tmp_path / 'uploads'
+    folder.mkdir()
+    monkeypatch.setattr(evidence_store, 'folder', str(folder))
+    db.session.execute(sa.delete(evidence_store.table))
+    db.session.commit()
+    yield evidence_store
+    db.session.rollback()
+
+
+def make_part(store, data):
+    part = UploadPart(store.folder)
+    part.write(data)
+    return part
+
+
+def refcount(store, file_url):
+    return db.session.execute(
+        sa.select(store.table.c.refcount).where(store.table.c.file_url == file_url)
+    ).scalar_one_or_none()
+
+
+def test_same_content_with_another_extension_reuses_file(store):
+    first = store.store(make_part(store, b'same bytes'), 'a.png')
+    second = store.store(make_part(store, b'same bytes'), 'b.jpg')
+    db.session.commit()
+
+    assert second == first
+    assert first.endswith('.png')
+    assert sorted(os.listdir(store.folder)) == [first.rsplit('/', 1)[1]]
+    assert refcount(store, first) == 2
+
+
+def test_rolled_back_store_removes_new_file(store):
+    store.store(make_part(store, b'never committed'), 'a.png')
+    db.session.rollback()
+
+    assert os.listdir(store.folder) == []
+
+
+def test_release_removes_file_with_last_reference(store):
+    file_url = store.store(make_part(store, b'shared'), 'a.png')
+    store.store(make_part(store, b'shared'), 'b.png')
+    db.session.commit()
+    path = os.path.join(store.folder, file_url.rsplit('/', 1)[1])
+
+    store.release(file_url)
+    db.session.commit()
+    assert refcount(store, file_url) == 1
+    assert os.path.exists(path)
+
+    store.release(file_url)
+    db.session.commit()
+    assert refcount(store, file_url) is None
+    assert os.listdir(store.folder) == []
+
+
+def test_rolled_back_release_keeps_file(store):
+    file_url = store.store(make_part(store, b'kept'), 'a.png')
+    db.session.commit()
+    path = os.path.join(store.folder, file_url.rsplit('/', 1)[1])
+
+    store.release(file_url)
+    db.session.rollback()
+
+    assert refcount(store, file_url) == 1
+    assert os.listdir(store.folder) == [os.path.basename(path)]
+
+
+def test_deleting_evidence_releases_file(store):
+    # application で release_on_delete(Evidence) 済み
+    file_url = store.store(make_part(store, b'evidence'), 'a.png')
+    evidence = Evidence(name='a.png', type='image/png', file_url=file_url)
+    db.session.add(evidence)
+    db.session.commit()
+
+    db.session.delete(evidence)
+    db.session.commit()
+
+    assert refcount(store, file_url) is None
+    assert os.listdir(store.folder) == []
@@ -0,0 +1,127 @@
+# flask_sqlalchemy のキーセットページネーション
+import base64
+import datetime
+import decimal
+import json
+
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from werkzeug.exceptions import NotFound
+
+
+@pytest.fixture
+def env(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path / "page.db"}'
+    app.secret_key = 'test'
+    db = SQLAlchemy(app)
+
+    class Item(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        created = db.Column(db.DateTime, nullable=False)
+        price = db.Column(db.Numeric(10, 2), nullable=False)
+
+    with app.app_context():
+        db.create_all()
+        start = datetime.datetime(2024, 1, 1)
+
+        for i in range(1, 8):
+            db.session.add(Item(
+                id=i,
+                created=start + datetime.timedelta(hours=i // 2),
+                price=decimal.Decimal(i) / 4,
+            ))
+
+        db.session.commit()
+        yield app, db, Item
+        db.session.remove()
+
+
+def paginate(db, Item, keyset, **kwargs):
+    kwargs.setdefault('per_page', 3)
+    return db.paginate(db.select(Item), keyset=keyset, **kwargs)
+
+
+def encode(data):
+    raw = json.dumps(data).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode(cursor):
+    return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+
+
+@pytest.mark.parametrize('column', ['created', 'price'])
+def test_walks_datetime_and_decimal_keysets(env, column):
+    app, db, Item = env
+    keyset = (getattr(Item, column).desc(), Item.id.desc())
+
+    with app.test_request_context():
+        page = paginate(db, Item, keyset)
+        seen = [item.id for item in page]
+
+        while page.has_next:
+            page = page.next()
+            seen.extend(item.id for item in page)
+
+        assert seen == [7, 6, 5, 4, 3, 2, 1]
+
+        back = page.prev()
+        assert [item.id for item in back] == [4, 3, 2]
+
+
+def test_rejects_values_that_do_not_match_the_column(env):
+    app, db, Item = env
+    keyset = (Item.created, Item.id)
+
+    with app.test_request_context():
+        for values in (
+            [['2024-01-01'], 1],
+            ['2024-01-01T00:00:00', {'a': 1}],
+            ['not a date', 1],
+            ['2024-01-01T00:00:00', True],
+            ['2024-01-01T00:00:00'],
+        ):
+            cursor = encode({'k': values})
+
+            with pytest.raises(NotFound):
+                paginate(db, Item, keyset, cursor=cursor)
+
+            # error_out=False なら最初のページになる
+            page = paginate(db, Item, keyset, cursor=cursor, error_out=False)
+            assert [item.id for item in page] == [1, 2, 3]
+
+
+def test_forged_total_is_counted_again(env):
+    app, db, Item = env
+    keyset = (Item.id,)
+
+    with app.test_request_context():
+        page = paginate(db, Item, keyset)
+        assert page.total == 7
+
+        data = decode(page.next_cursor)
+        assert page.next().total == 7
+
+        data['t'] = 1000
+        assert paginate(db, Item, keyset, cursor=encode(data)).total == 7
+
+        del data['s']
+        assert paginate(db, Item, keyset, cursor=encode(data)).total == 7
+
+        # 数えないときは偽の合計を返さない
+        forged = paginate(db, Item, keyset, cursor=encode(data), count=False)
+        assert forged.total is None
+
+
+def test_total_is_not_stored_without_secret_key(env):
+    app, db, Item = env
+    app.secret_key = None
+
+    with app.test_request_context():
+        page = paginate(db, Item, (Item.id,))
+
+        assert 't' not in decode(page.next_cursor)
+        assert page.next().total == 7
+
@@ -0,0 +1,68 @@
+# werkzeug.test.PreparedRequest（bench.py のリプレイで使う）
+import pytest
+from flask import Flask, jsonify, request
+from werkzeug.test import Client, PreparedRequest
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+
+    @app.route('/<path:path>', methods=['GET', 'POST'])
+    def echo(path):
+        return jsonify(
+            path=request.path,
+            raw=request.environ['REQUEST_URI'],
+            query=request.query_string.decode(),
+            token=request.headers.get('X-User-Token'),
+            body=request.get_data(as_text=True),
+        )
+
+    return Client(app)
+
+
+def test_braces_are_literal_without_template(client):
+    prepared = PreparedRequest('/a/{id}/%7Bx%7D/}', query_string='q=1')
+
+    data = client.open(prepared).get_json()
+    assert data['path'] == '/a/{id}/{x}/}'
+    assert data['query'] == 'q=1'
+
+
+def test_template_fills_placeholders(client):
+    prepared = PreparedRequest(
+        '/bills/{bill_id}/{{id}}/%7Bx%7D', path_template=True, method='POST', data='{}'
+    )
+
+    for bill_id in (1, 'ü v'):
+        data = client.open(
+            prepared, path_args={'bill_id': bill_id}, headers={'X-User-Token': f'u{bill_id}'}
+        ).get_json()
+        assert data['path'] == f'/bills/{bill_id}/{{id}}/{{x}}'
+        assert data['token'] == f'u{bill_id}'
+        assert data['body'] == '{}'
+
+    assert data['raw'] == '/bills/%C3%BC%20v/{id}/%7Bx%7D'
+
+
+def test_template_replaces_query_string(client):
+    prepared = PreparedRequest('/bills/{bill_id}', path_template=True, query_string='a=1')
+
+    data = client.open(prepared, path_args={'bill_id': 2}, query_string='b=2').get_json()
+    assert data['path'] == '/bills/2'
+    assert data['raw'] == '/bills/2?b=2'
+    assert data['query'] == 'b=2'
+
+
+def test_template_errors():
+    with pytest.raises(TypeError):
+        PreparedRequest('/bills/{bill_id}', path_template=True).get_environ()
+
+    with pytest.raises(ValueError):
+        PreparedRequest('/bills/{bill_id:>3}', path_template=True)
+
+    with pytest.raises(ValueError):
+        PreparedRequest('/bills?id={bill_id}', path_template=True)
+
+    with pytest.raises(ValueError):
+        PreparedRequest('/bills/{', path_template=True)
@@ -0,0 +1,60 @@
+# flask_sqlalchemy の mmap クエリキャッシュ
+import os
+import stat
+
+import pytest
+from flask_sqlalchemy.query_cache import MmapCacheBackend
+
+
+def small_backend(path, slots=8):
+    return MmapCacheBackend(str(path), slots=slots, slot_size=4096, tag_slots=16)
+
+
+def test_round_trip_and_invalidate(tmp_path):
+    backend = small_backend(tmp_path / 'cache.bin')
+    versions = backend.versions(['bill'])
+    backend.set('key', [(1, 'a')], 60, versions)
+
+    assert backend.get('key') == [(1, 'a')]
+
+    backend.invalidate(['bill'])
+    assert backend.get('key') is None
+
+
+def test_file_is_private_and_named_by_layout(tmp_path):
+    backend = small_backend(tmp_path / 'cache.bin')
+
+    assert backend.file_path == str(tmp_path / 'cache.bin.8x4096.16')
+    assert stat.S_IMODE(os.stat(backend.file_path).st_mode) == 0o600
+
+
+def test_other_layout_uses_another_file(tmp_path):
+    old = small_backend(tmp_path / 'cache.bin', slots=8)
+    old.set('key', 'value', 60, {})
+    size = os.path.getsize(old.file_path)
+
+    new = small_backend(tmp_path / 'cache.bin', slots=16)
+
+    # 動いているワーカーがマップしているファイルは縮めない
+    assert new.file_path != old.file_path
+    assert os.path.getsize(old.file_path) == size
+    assert old.get('key') == 'value'
+
+
+def test_refuses_file_writable_by_others(tmp_path):
+    path = tmp_path / 'cache.bin.8x4096.16'
+    path.write_bytes(b'')
+    os.chmod(path, 0o666)
+
+    with pytest.raises(PermissionError):
+        small_backend(tmp_path / 'cache.bin')
+
+
+def test_refuses_symlink(tmp_path):
+    target = tmp_path / 'elsewhere'
+    target.write_bytes(b'')
+    os.chmod(target, 0o600)
+    os.symlink(target, tmp_path / 'cache.bin.8x4096.16')
+
+    with pytest.raises(OSError):
+        small_backend(tmp_path / 'cache.bin')
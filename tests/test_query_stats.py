@@ -0,0 +1,52 @@
+# flask_sqlalchemy のクエリ統計（SQLALCHEMY_RECORD_QUERIES = "aggregate"）
+import threading
+import time
+
+from flask_sqlalchemy.record_queries import QueryStats, load_query_stats
+
+
+def test_dump_runs_in_background_thread(tmp_path, monkeypatch):
+    stats = QueryStats(__name__, dump_dir=tmp_path, dump_interval=0.05)
+    threads = []
+    dumped = threading.Event()
+    original = QueryStats.dump
+
+    def dump(self):
+        threads.append(threading.current_thread())
+        original(self)
+        dumped.set()
+
+    monkeypatch.setattr(QueryStats, 'dump', dump)
+
+    stats.record('SELECT 1', 0.01)
+    time.sleep(0.1)
+    stats.record('SELECT 1', 0.01)
+
+    assert dumped.wait(5)
+    assert threading.current_thread() not in threads
+    rows = load_query_stats(tmp_path)
+    assert rows[0]['fingerprint'] == 'SELECT ?'
+
+
+def test_evicted_counts_are_not_inherited():
+    stats = QueryStats(__name__, max_fingerprints=20, sample=1000)
+
+    for i in range(20):
+        for _ in range(i + 1):
+            stats.record(f'SELECT * FROM t{i}', 1.0)
+
+    stats.record('SELECT * FROM newcomer', 0.001)
+    rows = {row['fingerprint']: row for row in stats.snapshot()}
+
+    # 一番安い 2 つを一度に捨てる
+    assert len(rows) == 19
+    assert 'SELECT * FROM t0' not in rows
+    assert 'SELECT * FROM t1' not in rows
+
+    newcomer = rows['SELECT * FROM newcomer']
+    assert newcomer['count'] == 1
+    assert newcomer['total'] == 0.001
+    assert newcomer['max'] == 0.001
+    assert sum(newcomer['buckets'].values()) == 1
+    # 捨てたうち一番重いものの合計が誤差の上限になる
+    assert newcomer['error'] == 2.0
@@ -0,0 +1,116 @@
+# 人気順ランキング（ranking.py）
+import time
+
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+from ..ranking import ContestedTopK, DecayedTopK, Rankings
+
+
+def ids(ranked):
+    return [item_id for item_id, _ in ranked]
+
+
+def test_decayed_top_k_prefers_recent_events():
+    now = time.time()
+    top = DecayedTopK(k=2, half_life=3600)
+    top.add(1, 1.0, now - 3 * 3600)
+    top.add(1, 1.0, now - 3 * 3600)
+    top.add(2, 1.0, now)
+    top.add(3, 0.5, now)
+
+    assert ids(top.top()) == [2, 3]
+    assert top.top(1)[0][1] == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize('n, expected', [(None, 2), (100, 2), (0, 1), (-5, 1), (1, 1)])
+def test_top_clamps_limit(n, expected):
+    hot = DecayedTopK(k=2, half_life=3600)
+    contested = ContestedTopK(k=2)
+    for item_id in range(5):
+        hot.add(item_id)
+        contested.update(item_id, item_id, item_id)
+
+    assert len(hot.top(n)) == expected
+    assert len(contested.top(n)) == expected
+
+
+def test_decayed_merge_keeps_the_larger_score():
+    now = time.time()
+    top = DecayedTopK(k=3, half_life=3600)
+    for _ in range(5):
+        top.add(1, 1.0, now)
+    top.add(2, 1.0, now)
+
+    # 1 は手元の方が大きい、2 は他のワーカーで増えた、3 は新しく入る
+    top.merge([(1, 2.0, now), (2, 4.0, now), (3, 3.0, now)])
+
+    scores = dict(top.top())
+    assert scores[1] == pytest.approx(5.0, rel=1e-3)
+    assert scores[2] == pytest.approx(4.0, rel=1e-3)
+    assert scores[3] == pytest.approx(3.0, rel=1e-3)
+
+
+def test_contested_merge_keeps_unflushed_votes():
+    top = ContestedTopK(k=2)
+    top.update(1, 10, 12)
+    top.merge([(1, 11, 5), (2, 3, 3)])
+
+    assert top.top() == [(1, 11), (2, 3)]
+
+
+def test_contested_capacity_keeps_the_most_contested():
+    top = ContestedTopK(k=1, capacity=2)
+    top.update(1, 5, 5)
+    top.update(2, 1, 9)
+    top.update(3, 0, 100)
+    top.update(4, 7, 8)
+
+    assert ids(top.top(10)) == [4]
+    assert set(top._tallies) == {1, 4}
+
+
+def test_rankings_refresh_from_db(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path / "ranking.db"}'
+    app.config['RANKING_SIZE'] = 2
+    db = SQLAlchemy(app)
+
+    class Tweet(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        timestamp = db.Column(db.Integer, nullable=False)
+        good_count = db.Column(db.Integer, default=0)
+        retweet_count = db.Column(db.Integer, default=0)
+
+    class Bill(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        support = db.Column(db.Integer, default=0)
+        against = db.Column(db.Integer, default=0)
+
+    now = int(time.time())
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Tweet(id=1, timestamp=now, good_count=1),
+            Tweet(id=2, timestamp=now, good_count=10),
+            Tweet(id=3, timestamp=now, retweet_count=3),
+            Bill(id=1, support=100, against=1),
+            Bill(id=2, support=40, against=50),
+            Bill(id=3, support=20, against=20),
+        ])
+        db.session.commit()
+
+    rankings = Rankings(app, db, Tweet, Bill)
+
+    assert rankings.top_tweets(50) == [2, 3]
+    assert rankings.top_contested_bills() == [2, 3]
+
+    rankings.tweet_retweeted(1)
+    rankings.tweet_retweeted(1)
+    rankings.tweet_retweeted(1)
+    rankings.tweet_good(1)
+    assert rankings.top_tweets(1) == [2]
+    for _ in range(3):
+        rankings.tweet_good(1)
+    assert rankings.top_tweets(1) == [1]
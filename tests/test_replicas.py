@@ -0,0 +1,100 @@
+# flask_sqlalchemy の読み込みレプリカへの振り分け
+#
+# SQLite のファイル2つをプライマリとレプリカに見立て、中身を変えておいて
+# どちらから読んだかを見分ける。
+import os
+
+import pytest
+import sqlalchemy as sa
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+
+@pytest.fixture
+def env(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path / "primary.db"}'
+    app.config['SQLALCHEMY_BINDS'] = {
+        'replica': {'url': f'sqlite:///{tmp_path / "replica.db"}', 'replica_of': None},
+    }
+    app.config['SQLALCHEMY_REPLICA_MAX_LAG'] = 2.0
+    app.config['SQLALCHEMY_REPLICA_CHECK_INTERVAL'] = 3600
+    db = SQLAlchemy(app)
+
+    class Item(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(50), nullable=False)
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(Item(id=1, name='primary'))
+        db.session.commit()
+
+        # レプリカはメタデータを持たないので直接作る
+        replica = db.engines['replica']
+        db.metadata.create_all(replica)
+        with replica.begin() as conn:
+            conn.execute(sa.insert(Item.__table__).values(id=1, name='replica'))
+
+        replica_set = db.replicas[db.engine]
+        # 確認スレッドは起動させず、テストから check() を呼ぶ
+        replica_set._pid = os.getpid()
+        db.session.remove()
+        yield db, Item, replica_set
+        db.session.remove()
+
+
+def read(db, Item, **kwargs):
+    return db.session.execute(sa.select(Item.name), **kwargs).scalar()
+
+
+def test_config_builds_a_replica_set(env):
+    db, Item, replica_set = env
+
+    assert replica_set.primary is db.engine
+    assert replica_set.replicas == [db.engines['replica']]
+
+
+def test_reads_primary_until_replica_is_checked(env):
+    db, Item, replica_set = env
+
+    assert read(db, Item) == 'primary'
+
+
+def test_plain_select_reads_replica(env):
+    db, Item, replica_set = env
+    replica_set.check()
+
+    assert read(db, Item) == 'replica'
+    assert read(db, Item, bind_arguments={'primary': True}) == 'primary'
+
+
+def test_stays_on_primary_after_write_until_closed(env):
+    db, Item, replica_set = env
+    replica_set.check()
+
+    db.session.add(Item(id=2, name='new'))
+    db.session.flush()
+    assert db.session.execute(sa.select(Item.name).where(Item.id == 2)).scalar() == 'new'
+    db.session.commit()
+    assert read(db, Item) == 'primary'
+
+    db.session.close()
+    assert read(db, Item) == 'replica'
+
+
+def test_for_update_goes_to_primary(env):
+    db, Item, replica_set = env
+    replica_set.check()
+
+    assert db.session.execute(sa.select(Item.name).with_for_update()).scalar() == 'primary'
+    assert read(db, Item) == 'primary'
+
+
+def test_lagging_replica_is_skipped(env):
+    db, Item, replica_set = env
+    replica_set.check()
+    replica_set.states[db.engines['replica']].lag = 10.0
+
+    assert replica_set.choose() is db.engine
+    assert read(db, Item) == 'primary'
@@ -0,0 +1,62 @@
+# 一覧レスポンスのキャッシュ
+import pytest
+from flask import Flask, jsonify, request
+
+from ..response_cache import ResponseCache
+
+
+@pytest.fixture
+def env():
+    app = Flask(__name__)
+    app.config['RESPONSE_CACHE_BACKEND'] = 'memory'
+    cache = ResponseCache(app)
+    calls = []
+
+    @app.route('/items')
+    @cache.cached('item', unless=lambda: request.args.get('sort') == 'hot')
+    def items():
+        calls.append(request.args.get('sort'))
+        return jsonify(len(calls))
+
+    return app.test_client(), cache, calls
+
+
+def test_reuses_response_until_table_changes(env):
+    client, cache, calls = env
+
+    first = client.get('/items')
+    assert client.get('/items').get_json() == first.get_json()
+    assert len(calls) == 1
+
+    cache.bump('item')
+    assert client.get('/items').get_json() == 2
+
+
+def test_if_none_match_returns_304(env):
+    client, cache, calls = env
+    etag = client.get('/items').headers['ETag']
+
+    response = client.get('/items', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+
+def test_unless_bypasses_cache(env):
+    client, cache, calls = env
+
+    assert client.get('/items?sort=hot').get_json() == 1
+    assert client.get('/items?sort=hot').get_json() == 2
+    assert calls == ['hot', 'hot']
+    assert cache.hits == 0 and cache.misses == 0
+
+
+@pytest.mark.parametrize('path', ['/api/bills?sort=contested', '/api/tweets?sort=hot'])
+def test_ranking_sorts_are_not_cached(app_ctx, path):
+    from ..application import response_cache
+
+    client = app_ctx.test_client()
+    hits, misses = response_cache.hits, response_cache.misses
+
+    for _ in range(2):
+        assert client.get(path).status_code == 200
+
+    assert (response_cache.hits, response_cache.misses) == (hits, misses)
@@ -0,0 +1,101 @@
+# /api/search の転置インデックス
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+from ..response_cache import MemoryGenerations
+from ..search import SearchService, tokenize
+
+
+def make_worker(tmp_path, slots=64):
+    # ワーカーごとに別の app・世代番号で、DB と変更ログだけを共有する
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path / "search.db"}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = True
+    app.config['SEARCH_CHANGES_MMAP_PATH'] = str(tmp_path / 'changes.bin')
+    app.config['SEARCH_CHANGES_SLOTS'] = slots
+    db = SQLAlchemy(app)
+
+    class Post(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        body = db.Column(db.Text, nullable=False)
+
+    service = SearchService(app, db, {'post': (Post, ('body',))}, MemoryGenerations())
+
+    with app.app_context():
+        db.create_all()
+
+    return app, db, Post, service
+
+
+@pytest.fixture
+def env(tmp_path):
+    app, db, Post, service = make_worker(tmp_path)
+
+    with app.app_context():
+        yield app, db, Post, service, service.generations
+        db.session.remove()
+
+
+def keys(hits):
+    return [key for key, _ in hits]
+
+
+def test_tokenize_uses_bigrams_for_cjk():
+    assert tokenize('無料の公共交通 Free Transport') == [
+        '無料', '料の', 'の公', '公共', '共交', '交通', 'free', 'transport',
+    ]
+
+
+def test_index_is_built_on_first_search(env):
+    app, db, Post, service, _ = env
+    db.session.add(Post(id=1, body='free public transport'))
+    db.session.commit()
+
+    assert len(service.index) == 0
+    assert keys(service.search('transport')) == [('post', 1)]
+    assert len(service.index) == 1
+
+
+def test_other_workers_updates_and_deletes(tmp_path):
+    app, db, Post, service = make_worker(tmp_path)
+    other_app, other_db, _, other = make_worker(tmp_path)
+
+    with app.app_context():
+        db.session.add_all([Post(id=1, body='free transport'), Post(id=2, body='tax break')])
+        db.session.commit()
+
+    with other_app.app_context():
+        assert keys(other.search('transport')) == [('post', 1)]
+
+    with app.app_context():
+        db.session.get(Post, 1).body = 'healthcare access'
+        db.session.delete(db.session.get(Post, 2))
+        db.session.commit()
+        db.session.remove()
+
+    with other_app.app_context():
+        assert other.search('transport') == []
+        assert keys(other.search('healthcare')) == [('post', 1)]
+        assert other.search('tax') == []
+
+
+def test_rebuilds_after_falling_behind_the_change_log(tmp_path):
+    app, db, Post, service = make_worker(tmp_path, slots=4)
+    other_app, other_db, _, other = make_worker(tmp_path, slots=4)
+
+    with app.app_context():
+        db.session.add(Post(id=1, body='first'))
+        db.session.commit()
+
+    with other_app.app_context():
+        assert keys(other.search('first')) == [('post', 1)]
+
+    with app.app_context():
+        for i in range(10):
+            db.session.get(Post, 1).body = f'edit{i}'
+            db.session.commit()
+
+    with other_app.app_context():
+        assert other.search('first') == []
+        assert keys(other.search('edit9')) == [('post', 1)]
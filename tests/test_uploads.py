@@ -0,0 +1,53 @@
+# アップロードのストリーミング受信（uploads.py）
+import io
+import os
+
+import pytest
+from flask import Flask, jsonify, request
+
+from ..uploads import init_uploads
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = Flask(__name__, instance_path=str(tmp_path / 'instance'))
+    app.config['UPLOAD_FOLDER'] = str(tmp_path / 'uploads')
+    init_uploads(app, 1024, {'png'})
+
+    @app.route('/upload', methods=['POST'])
+    def upload():
+        file = request.files.get('file')
+        if file is None or not file.filename:
+            return jsonify(saved=None, content=request.form.get('content'))
+        return jsonify(saved=os.path.basename(file.stream.commit('saved.png')))
+
+    return app.test_client()
+
+
+def test_saves_allowed_file(client, tmp_path):
+    response = client.post('/upload', data={'file': (io.BytesIO(b'png'), 'a.png')})
+
+    assert response.get_json()['saved'] == 'saved.png'
+    assert (tmp_path / 'uploads' / 'saved.png').read_bytes() == b'png'
+
+
+def test_rejects_other_extensions(client):
+    response = client.post('/upload', data={'file': (io.BytesIO(b'x'), 'a.exe')})
+    assert response.status_code == 415
+
+
+def test_rejects_large_part(client):
+    response = client.post('/upload', data={'file': (io.BytesIO(b'x' * 2048), 'a.png')})
+    assert response.status_code == 413
+
+
+def test_empty_file_input_is_skipped(client, tmp_path):
+    # 何も選ばれていないファイル入力は filename="" で届く
+    response = client.post('/upload', data={
+        'content': 'text only',
+        'file': (io.BytesIO(b''), ''),
+    })
+
+    assert response.status_code == 200
+    assert response.get_json() == {'saved': None, 'content': 'text only'}
+    assert os.listdir(tmp_path / 'instance' / 'upload-tmp') == []
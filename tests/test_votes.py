@@ -0,0 +1,135 @@
+# 投票の書き込み集約（VoteAggregator）
+import os
+import subprocess
+import sys
+import uuid
+
+import pytest
+import sqlalchemy as sa
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+from ..votes import VoteAggregator
+
+
+@pytest.fixture
+def setup(tmp_path):
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'votes.db'}",
+        VOTE_FLUSH_INTERVAL=3600,
+        VOTE_FLUSH_THRESHOLD=5,
+        VOTE_JOURNAL_DIR=str(tmp_path / 'journal'),
+    )
+    db = SQLAlchemy(app)
+
+    class Bill(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        support = db.Column(db.Integer, default=0)
+        against = db.Column(db.Integer, default=0)
+
+    votes = VoteAggregator(app, db, Bill)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([Bill(id=1, support=0, against=0), Bill(id=2, support=0, against=0)])
+        db.session.commit()
+
+    def tallies():
+        with app.app_context(), db.engine.connect() as conn:
+            return {row.id: (row.support, row.against) for row in conn.execute(sa.select(Bill.__table__))}
+
+    yield votes, tallies
+    votes.close()
+
+
+def dead_pid():
+    proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+    proc.wait()
+    return proc.pid
+
+
+def test_votes_are_batched_until_flush(setup):
+    votes, tallies = setup
+    votes.record(1, 'support')
+    votes.record(1, 'against')
+    votes.record(2, 'support')
+
+    assert tallies() == {1: (0, 0), 2: (0, 0)}
+    assert votes.pending(1) == {'support': 1, 'against': 1}
+
+    assert votes.flush() == 2
+    assert tallies() == {1: (1, 1), 2: (1, 0)}
+    assert votes.pending(1) == {'support': 0, 'against': 0}
+    # flush したジャーナルは消え、書き込み中のものだけが残る
+    assert os.listdir(votes.journal_dir) == [f'votes-{os.getpid()}.log']
+
+
+def test_threshold_triggers_flush(setup):
+    votes, tallies = setup
+    for _ in range(5):
+        votes.record(1, 'support')
+
+    assert tallies()[1] == (5, 0)
+
+
+def test_dead_worker_journal_is_recovered(setup):
+    # record() はまだ呼ばない（flusher スレッドの回収と競合させない）
+    votes, tallies = setup
+    pid = dead_pid()
+    with open(os.path.join(votes.journal_dir, f'votes-{pid}.log'), 'w') as f:
+        f.write('1 0\n1 0\n2 1\n1 ')  # 最終行は書き込み途中
+
+    assert votes._recover_journals()
+    assert tallies() == {1: (2, 0), 2: (0, 1)}
+    assert os.listdir(votes.journal_dir) == []
+
+
+def test_batch_committed_before_unlink_is_not_applied_twice(setup):
+    votes, tallies = setup
+    pid = dead_pid()
+    batch_id = uuid.uuid4().hex
+    with open(os.path.join(votes.journal_dir, f'votes-{pid}.{batch_id}.batch'), 'w') as f:
+        f.write('1 0\n1 0\n')
+    # UPDATE とバッチ id はコミット済み、ファイルの削除前に落ちた
+    votes._apply({1: [2, 0]}, [batch_id])
+
+    assert votes._recover_journals()
+    assert tallies()[1] == (2, 0)
+    assert not any(name.endswith('.batch') for name in os.listdir(votes.journal_dir))
+
+
+def test_failed_recovery_keeps_claimed_journal(setup, monkeypatch):
+    votes, tallies = setup
+    pid = dead_pid()
+    with open(os.path.join(votes.journal_dir, f'votes-{pid}.log'), 'w') as f:
+        f.write('1 0\n')
+
+    def fail(batch, batch_ids=()):
+        raise sa.exc.OperationalError('UPDATE', {}, Exception('down'))
+
+    monkeypatch.setattr(votes, '_apply', fail)
+    assert not votes._recover_journals()
+    assert any(name.endswith(f'.{os.getpid()}.recovering') for name in os.listdir(votes.journal_dir))
+
+    monkeypatch.undo()
+    assert votes._recover_journals()
+    assert tallies()[1] == (1, 0)
+
+
+def test_forked_child_does_not_inherit_pending_votes(setup):
+    votes, tallies = setup
+    votes.record(1, 'support')
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            votes.record(2, 'support')
+            ok = votes.pending(1)['support'] == 0 and votes.pending(2)['support'] == 1
+            ok = ok and os.path.exists(votes._journal_path(os.getpid()))
+            os._exit(0 if ok else 1)
+        except BaseException:
+            os._exit(2)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert votes.pending(1)['support'] == 1
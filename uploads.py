@@ -0,0 +1,144 @@
+# アップロードファイルをUPLOAD_FOLDERへ直接書き込むパイプライン
+#
+# 既定の stream factory は SpooledTemporaryFile に溜めてから save() で
+# もう一度コピーする。ここではパートを最初から UPLOAD_TEMP_FOLDER（公開されない、
+# UPLOAD_FOLDER と同じファイルシステム上のディレクトリ）の一時ファイルに書き、
+# サイズと拡張子はパース中に検査する（上限を超えた時点で 413 を返し、残りを
+# 受信・保存しない）。保存は os.replace なので、コピーなしでアトミックに確定する。
+#
+# パースが途中で失敗したとき（413/415、壊れた本文、切断）は、それまでのパートが
+# request.files に入らない。作ったパートはすべてリクエストで覚えておき、
+# Request.close() で確定していないものを消す。
+import errno
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.exceptions import UnsupportedMediaType
+
+
+class UploadPart:
+    """temp_folder の一時ファイルに書き込み、commit() で folder に移すファイルパート。"""
+
+    def __init__(self, folder, max_size=None, temp_folder=None):
+        fd, self.path = tempfile.mkstemp(dir=temp_folder or folder, prefix='.upload-', suffix='.part')
+        self._file = os.fdopen(fd, 'w+b')
+        self.folder = folder
+        self.max_size = max_size
+        self.size = 0
+        self.committed = False
+        # 内容アドレス保存用に受信しながらハッシュを計算しておく
+        self._hash = hashlib.sha256()
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            # 上限を超えたら書きかけのファイルは即座に捨てる
+            self.close()
+            raise RequestEntityTooLarge()
+        self._hash.update(data)
+        return self._file.write(data)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+    def commit(self, filename):
+        # 同じファイルシステム上の rename なのでコピーせずに確定できる
+        dst = os.path.join(self.folder, filename)
+        self._file.flush()
+        try:
+            os.replace(self.path, dst)
+        except OSError as e:
+            # 一時ディレクトリが別のファイルシステムに置かれていた場合だけコピーになる
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(self.path, dst)
+        self.committed = True
+        return dst
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        if not self.committed:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    def __getattr__(self, name):
+        # read / seek / tell などは実ファイルに委譲する
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+
+class SkippedPart(io.BytesIO):
+    """ファイル名のないファイルパート（何も選ばれていないファイル入力）。
+
+    ブラウザは空のファイル入力も filename="" のパートとして送る。拡張子の検査で
+    415 にせず、内容は保存せずに読み捨てる（ビューは filename が空なら無視する）。
+    """
+
+    def write(self, data):
+        return len(data)
+
+
+class UploadRequest(Request):
+    """ファイルパートを UploadPart に直接ストリーミングする Request。"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        from flask import current_app
+
+        if not filename:
+            return SkippedPart()
+
+        config = current_app.config
+        allowed = config.get('UPLOAD_ALLOWED_EXTENSIONS')
+        if allowed is not None:
+            ext = filename.rsplit('.', 1)[1].lower() if filename and '.' in filename else ''
+            if ext not in allowed:
+                raise UnsupportedMediaType()
+
+        max_size = config.get('UPLOAD_MAX_PART_SIZE')
+        # パート自身が Content-Length を申告していれば書き込む前に弾く
+        if max_size is not None and content_length and content_length > max_size:
+            raise RequestEntityTooLarge()
+
+        part = UploadPart(config['UPLOAD_FOLDER'], max_size, config['UPLOAD_TEMP_FOLDER'])
+        self._upload_parts.append(part)
+        return part
+
+    @property
+    def _upload_parts(self):
+        parts = self.__dict__.get('_upload_parts_list')
+        if parts is None:
+            parts = self.__dict__['_upload_parts_list'] = []
+        return parts
+
+    def make_form_data_parser(self):
+        parser = super().make_form_data_parser()
+        parser.zero_copy = True
+        return parser
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            # パース失敗で request.files に入らなかったパートも含めて消す
+            for part in self._upload_parts:
+                part.close()
+
+
+def init_uploads(app, max_part_size, allowed_extensions):
+    app.config.setdefault('UPLOAD_MAX_PART_SIZE', max_part_size)
+    app.config.setdefault('UPLOAD_ALLOWED_EXTENSIONS', allowed_extensions)
+    # 受信中のパートは static/ の外に置き、書きかけのファイルを配信しない
+    app.config.setdefault('UPLOAD_TEMP_FOLDER', os.path.join(app.instance_path, 'upload-tmp'))
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    os.makedirs(app.config['UPLOAD_TEMP_FOLDER'], exist_ok=True)
+    app.request_class = UploadRequest
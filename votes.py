@@ -0,0 +1,386 @@
+# 投票の書き込み集約（write-behind）
+#
+# /api/bills/<id>/vote のたびに bill 行を UPDATE すると、話題の法案1行の
+# 行ロックに全ワーカーが並んでしまう。ここではプロセス内で増分を集計し、
+# 一定間隔または一定件数ごとに
+#   UPDATE bill SET support = support + :n, against = against + :m WHERE id = :id
+# をまとめて実行する。
+#
+# クラッシュ時に失う票は最大でも「flush_interval 秒 または flush_threshold 票」
+# まで。journal_dir を指定すると未反映の票を追記ログに残し、生きている
+# ワーカーが死んだプロセスの分を再適用する。
+#
+# ジャーナルのファイル名（journal_dir 内）:
+#   votes-<pid>.log                          書き込み中
+#   votes-<pid>.<id>.batch                   flush 中（id はバッチごとに一意）
+#   votes-<pid>.<id>.batch.<rpid>.recovering rpid のワーカーが回収中
+# バッチの id は UPDATE と同じトランザクションで vote_batch テーブルに入れる。
+# コミット後・ファイル削除前に落ちても、回収時に適用済みと分かるので二重に
+# 数えない。
+import atexit
+import logging
+import os
+import threading
+import time
+import uuid
+
+import sqlalchemy as sa
+
+logger = logging.getLogger(__name__)
+
+VOTE_KINDS = ('support', 'against')
+
+
+class VoteAggregator:
+    def __init__(self, app=None, db=None, model=None):
+        self.db = db
+        self.model = model
+        self.app = None
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pending_count = 0
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._journal_fd = None
+        self._flush_callbacks = []
+        self._last_prune = 0.0
+        self.batches = None
+
+        if app is not None:
+            self.init_app(app, db, model)
+
+    def init_app(self, app, db=None, model=None):
+        if db is not None:
+            self.db = db
+        if model is not None:
+            self.model = model
+
+        app.config.setdefault('VOTE_FLUSH_INTERVAL', 1.0)
+        app.config.setdefault('VOTE_FLUSH_THRESHOLD', 500)
+        app.config.setdefault('VOTE_JOURNAL_DIR', None)
+        # 適用済みバッチ id を残す秒数（これより古いジャーナルは回収時に二重適用を判定できない）
+        app.config.setdefault('VOTE_BATCH_RETENTION', 24 * 3600)
+
+        self.app = app
+        self.flush_interval = app.config['VOTE_FLUSH_INTERVAL']
+        self.flush_threshold = app.config['VOTE_FLUSH_THRESHOLD']
+        self.journal_dir = app.config['VOTE_JOURNAL_DIR']
+        self.batch_retention = app.config['VOTE_BATCH_RETENTION']
+
+        if self.journal_dir:
+            os.makedirs(self.journal_dir, mode=0o700, exist_ok=True)
+
+        if self.batches is None:
+            self.batches = self.db.metadata.tables.get('vote_batch')
+        if self.batches is None:
+            self.batches = self.db.Table(
+                'vote_batch',
+                sa.Column('id', sa.String(32), primary_key=True),
+                sa.Column('applied_at', sa.Integer, nullable=False, index=True),
+            )
+
+        app.extensions['votes'] = self
+        atexit.register(self.close)
+
+    # 票を1つ記録する（DBには触らない）
+    def record(self, bill_id, kind):
+        if kind not in VOTE_KINDS:
+            raise ValueError(f"Unknown vote type: {kind!r}")
+
+        self._ensure_started()
+        index = VOTE_KINDS.index(kind)
+
+        with self._lock:
+            deltas = self._pending.get(bill_id)
+            if deltas is None:
+                deltas = self._pending[bill_id] = [0, 0]
+            deltas[index] += 1
+            self._pending_count += 1
+            self._journal_write(f"{bill_id} {index}\n")
+            should_flush = self._pending_count >= self.flush_threshold
+
+        if should_flush:
+            self.flush()
+
+    # まだDBに反映されていない増分（read-your-writes用）
+    def pending(self, bill_id):
+        with self._lock:
+            support, against = self._pending.get(bill_id, (0, 0))
+        return {'support': support, 'against': against}
+
+    # DBへの反映後に呼ぶ関数を登録する（func(bill_ids)）
+    def on_flush(self, func):
+        self._flush_callbacks.append(func)
+        return func
+
+    def flush(self):
+        # 同時に複数スレッドが flush しても UPDATE は1本にまとめる
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch = self._pending
+                self._pending = {}
+                self._pending_count = 0
+                journal = self._journal_rotate()
+
+            try:
+                self._apply(batch, [journal[1]] if journal is not None else ())
+            except Exception:
+                logger.exception("Vote flush failed; keeping %d bills pending", len(batch))
+                self._merge_back(batch, journal)
+                return 0
+
+            if journal is not None:
+                os.unlink(journal[0])
+
+            return len(batch)
+
+    def close(self):
+        self._stop.set()
+
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(self.flush_interval * 2)
+
+        if self._pid == os.getpid():
+            self.flush()
+
+            if self._journal_fd is not None:
+                os.close(self._journal_fd)
+                self._journal_fd = None
+
+    # batch_ids は適用済みとして記録するジャーナルの id（UPDATE と同じトランザクション）
+    def _apply(self, batch, batch_ids=()):
+        table = self.model.__table__
+        stmt = (
+            sa.update(table)
+            .where(table.c.id == sa.bindparam('b_id'))
+            .values(
+                support=table.c.support + sa.bindparam('d_support'),
+                against=table.c.against + sa.bindparam('d_against'),
+            )
+        )
+        # id順に並べてワーカー間のデッドロックを避ける
+        params = [
+            {'b_id': bill_id, 'd_support': support, 'd_against': against}
+            for bill_id, (support, against) in sorted(batch.items())
+        ]
+
+        now = int(time.time())
+        with self.app.app_context():
+            with self.db.engine.begin() as conn:
+                if batch_ids:
+                    conn.execute(
+                        sa.insert(self.batches),
+                        [{'id': batch_id, 'applied_at': now} for batch_id in batch_ids],
+                    )
+                if params:
+                    conn.execute(stmt, params)
+                # 古い id は時々まとめて消す
+                if batch_ids and now - self._last_prune >= 60:
+                    conn.execute(
+                        sa.delete(self.batches)
+                        .where(self.batches.c.applied_at < now - self.batch_retention)
+                    )
+                    self._last_prune = now
+
+        for func in self._flush_callbacks:
+            try:
+                func(list(batch))
+            except Exception:
+                logger.exception("Vote flush callback failed")
+
+    def _merge_back(self, batch, journal):
+        with self._lock:
+            for bill_id, (support, against) in batch.items():
+                deltas = self._pending.setdefault(bill_id, [0, 0])
+                deltas[0] += support
+                deltas[1] += against
+                self._pending_count += support + against
+
+                if journal is not None:
+                    self._journal_write(f"{bill_id} 0\n" * support)
+                    self._journal_write(f"{bill_id} 1\n" * against)
+
+        if journal is not None:
+            os.unlink(journal[0])
+
+    def _ensure_started(self):
+        pid = os.getpid()
+
+        if self._pid == pid:
+            return
+
+        with self._lock:
+            if self._pid == pid:
+                return
+
+            # fork 後の子プロセスは親の未反映分を引き継がない
+            self._pending = {}
+            self._pending_count = 0
+            self._journal_fd = None
+            self._stop = threading.Event()
+            self._pid = pid
+
+            if self.journal_dir:
+                # 前に同じ pid だったプロセスの残りは開く前に自分の回収分にする。
+                # DB への適用は投票を止めないよう flusher スレッドで行う
+                self._claim_own_journals()
+                self._journal_fd = os.open(
+                    self._journal_path(pid),
+                    os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+                    0o600,
+                )
+
+            self._thread = threading.Thread(
+                target=self._run, name='vote-flusher', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        # 回収に失敗したら（DB が落ちているなど）次の間隔でやり直す
+        recovered = not self.journal_dir
+        while True:
+            if not recovered:
+                recovered = self._recover_journals()
+            if self._stop.wait(self.flush_interval):
+                return
+            self.flush()
+
+    # --- ジャーナル -------------------------------------------------------
+
+    def _journal_path(self, pid):
+        return os.path.join(self.journal_dir, f"votes-{pid}.log")
+
+    def _journal_write(self, data):
+        if self._journal_fd is not None and data:
+            os.write(self._journal_fd, data.encode('ascii'))
+
+    def _journal_rotate(self):
+        if self._journal_fd is None:
+            return None
+
+        batch_id = uuid.uuid4().hex
+        path = os.path.join(self.journal_dir, f"votes-{self._pid}.{batch_id}.batch")
+        os.close(self._journal_fd)
+        os.replace(self._journal_path(self._pid), path)
+        self._journal_fd = os.open(
+            self._journal_path(self._pid), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600
+        )
+        return path, batch_id
+
+    # name を自分の回収中の名前に rename して (path, batch_id) を返す（他に取られたら None）
+    def _claim(self, name, pid, batch_id):
+        if batch_id is None:
+            batch_id = uuid.uuid4().hex
+        path = os.path.join(
+            self.journal_dir, f"votes-{pid}.{batch_id}.batch.{os.getpid()}.recovering"
+        )
+        try:
+            os.rename(os.path.join(self.journal_dir, name), path)
+        except FileNotFoundError:
+            return None
+        return path, batch_id
+
+    def _claim_own_journals(self):
+        pid = os.getpid()
+        for name in os.listdir(self.journal_dir):
+            parsed = _parse_journal_name(name)
+            if parsed is not None and parsed[0] == pid and parsed[2] is None:
+                self._claim(name, pid, parsed[1])
+
+    def _recover_journals(self):
+        """死んだプロセスのジャーナルを回収して適用する。成功したら True。"""
+        try:
+            claimed = []
+            me = os.getpid()
+            for name in sorted(os.listdir(self.journal_dir)):
+                parsed = _parse_journal_name(name)
+                if parsed is None:
+                    continue
+
+                pid, batch_id, recovering_pid = parsed
+                if recovering_pid == me:
+                    claimed.append((os.path.join(self.journal_dir, name), batch_id))
+                    continue
+                if recovering_pid is not None:
+                    # 回収中のワーカーが死んでいれば引き継ぐ
+                    if _pid_alive(recovering_pid):
+                        continue
+                elif pid == me or _pid_alive(pid):
+                    continue
+
+                # 他のワーカーと同じジャーナルを二重に適用しないよう rename で確保する
+                entry = self._claim(name, pid, batch_id)
+                if entry is not None:
+                    claimed.append(entry)
+
+            if not claimed:
+                return True
+
+            with self.app.app_context():
+                with self.db.engine.connect() as conn:
+                    applied = set(conn.execute(
+                        sa.select(self.batches.c.id)
+                        .where(self.batches.c.id.in_([batch_id for _, batch_id in claimed]))
+                    ).scalars())
+
+            batch = {}
+            batch_ids = []
+            for path, batch_id in claimed:
+                # コミット後・削除前に落ちたバッチは適用済み
+                if batch_id in applied:
+                    continue
+                batch_ids.append(batch_id)
+                with open(path, encoding='ascii') as f:
+                    for line in f:
+                        try:
+                            bill_id, index = line.split()
+                            deltas = batch.setdefault(int(bill_id), [0, 0])
+                            deltas[int(index)] += 1
+                        except (ValueError, IndexError):
+                            # 書き込み途中で落ちた最終行は捨てる
+                            continue
+
+            if batch_ids:
+                self._apply(batch, batch_ids)
+                logger.info("Recovered votes for %d bills from %d journals", len(batch), len(batch_ids))
+
+            for path, _ in claimed:
+                os.unlink(path)
+            return True
+        except Exception:
+            # 確保したファイルは自分の回収中のまま残す（次の間隔で再試行し、
+            # このプロセスが死ねば他のワーカーが引き継ぐ）
+            logger.exception("Vote journal recovery failed; will retry")
+            return False
+
+
+def _parse_journal_name(name):
+    """ジャーナルのファイル名を (pid, batch_id, 回収中のpid) にする。ジャーナルでなければ None。"""
+    if not name.startswith('votes-'):
+        return None
+
+    parts = name[6:].split('.')
+    try:
+        if len(parts) == 2 and parts[1] == 'log':
+            return int(parts[0]), None, None
+        if len(parts) == 3 and parts[2] == 'batch':
+            return int(parts[0]), parts[1], None
+        if len(parts) == 5 and parts[2] == 'batch' and parts[4] == 'recovering':
+            return int(parts[0]), parts[1], int(parts[3])
+    except ValueError:
+        pass
+    return None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True